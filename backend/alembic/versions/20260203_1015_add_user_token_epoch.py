@@ -0,0 +1,30 @@
+"""Add token_epoch to users for self-contained JWT revocation
+
+Revision ID: c3a91f0d7e21
+Revises: b45198b26479
+Create Date: 2026-02-03 10:15:42.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3a91f0d7e21'
+down_revision: Union[str, None] = 'b45198b26479'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('token_epoch', sa.Integer(), nullable=False, server_default='0'))
+    # The in-memory epoch table only loads "notable" users (revoked or inactive)
+    op.create_index('ix_users_token_epoch_notable', 'users', ['id'],
+                    postgresql_where=sa.text('token_epoch > 0 OR is_active IS NOT TRUE'))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_users_token_epoch_notable', table_name='users')
+    op.drop_column('users', 'token_epoch')
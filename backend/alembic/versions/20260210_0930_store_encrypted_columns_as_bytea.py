@@ -0,0 +1,47 @@
+"""Store encrypted columns as bytea (versioned envelope format)
+
+Revision ID: d7e2b5c40a18
+Revises: c3a91f0d7e21
+Create Date: 2026-02-10 09:30:11.402355
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7e2b5c40a18'
+down_revision: Union[str, None] = 'c3a91f0d7e21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ENCRYPTED_COLUMNS = [
+    ('patients', 'first_name'),
+    ('patients', 'last_name'),
+    ('notes', 'content'),
+    ('note_history', 'previous_content'),
+]
+
+
+def upgrade() -> None:
+    # Existing Fernet tokens are ASCII; keep their bytes as-is. The app still reads them
+    # and rewrites rows in the new envelope format when they are next written.
+    for table, column in ENCRYPTED_COLUMNS:
+        op.alter_column(table, column,
+                   existing_type=sa.Text(),
+                   type_=sa.LargeBinary(),
+                   existing_nullable=False,
+                   postgresql_using=f"convert_to({column}, 'UTF8')")
+
+
+def downgrade() -> None:
+    # Only possible while every row is still a legacy Fernet token: run the app with
+    # ENCRYPTION_FORMAT=fernet and re-encrypt all rows first, otherwise this fails.
+    for table, column in ENCRYPTED_COLUMNS:
+        op.alter_column(table, column,
+                   existing_type=sa.LargeBinary(),
+                   type_=sa.Text(),
+                   existing_nullable=False,
+                   postgresql_using=f"convert_from({column}, 'UTF8')")
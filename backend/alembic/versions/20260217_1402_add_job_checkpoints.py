@@ -0,0 +1,35 @@
+"""Add job_checkpoints for resumable batch jobs
+
+Revision ID: e15c8a3f92b4
+Revises: d7e2b5c40a18
+Create Date: 2026-02-17 14:02:37.550961
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e15c8a3f92b4'
+down_revision: Union[str, None] = 'd7e2b5c40a18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('job_checkpoints',
+    sa.Column('job_name', sa.String(), nullable=False),
+    sa.Column('table_name', sa.String(), nullable=False),
+    sa.Column('last_id', sa.UUID(), nullable=True),
+    sa.Column('rows_processed', sa.BigInteger(), nullable=False, server_default='0'),
+    sa.Column('rows_rewritten', sa.BigInteger(), nullable=False, server_default='0'),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('completed_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('job_name', 'table_name')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('job_checkpoints')
@@ -0,0 +1,44 @@
+"""Add note_term_sets: compact per-note keyword index (bigint[] + GIN)
+
+Revision ID: f4b81d06c3e9
+Revises: e15c8a3f92b4
+Create Date: 2026-02-24 11:30:12.408115
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4b81d06c3e9'
+down_revision: Union[str, None] = 'e15c8a3f92b4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('note_term_sets',
+    sa.Column('note_id', sa.UUID(), nullable=False),
+    sa.Column('term_keys', postgresql.ARRAY(sa.BigInteger()), nullable=False),
+    sa.ForeignKeyConstraint(['note_id'], ['notes.id'], ),
+    sa.PrimaryKeyConstraint('note_id')
+    )
+
+    # Backfill from blind_indexes; must match search_service.term_key()
+    op.execute("""
+        INSERT INTO note_term_sets (note_id, term_keys)
+        SELECT note_id, array_agg(DISTINCT ('x' || substr(term_hash, 1, 16))::bit(64)::bigint)
+        FROM blind_indexes
+        GROUP BY note_id
+    """)
+
+    # Built after the backfill: one bulk GIN build instead of per-row pending-list inserts
+    op.create_index('ix_note_term_sets_term_keys', 'note_term_sets', ['term_keys'], postgresql_using='gin')
+
+
+def downgrade() -> None:
+    op.drop_index('ix_note_term_sets_term_keys', table_name='note_term_sets')
+    op.drop_table('note_term_sets')
@@ -0,0 +1,75 @@
+"""Add term frequencies and per-office term statistics for ranked keyword search
+
+Revision ID: 0a6c2e97d513
+Revises: f4b81d06c3e9
+Create Date: 2026-03-03 09:45:51.220734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0a6c2e97d513'
+down_revision: Union[str, None] = 'f4b81d06c3e9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing rows predate counting: tf = 1 until the note is edited or reindexed
+    op.add_column('blind_indexes', sa.Column('term_freq', sa.Integer(), nullable=False, server_default='1'))
+    op.add_column('note_term_sets', sa.Column('term_freqs', postgresql.ARRAY(sa.SmallInteger()), nullable=True))
+    op.execute("UPDATE note_term_sets SET term_freqs = array_fill(1::smallint, ARRAY[cardinality(term_keys)])")
+    op.alter_column('note_term_sets', 'term_freqs', nullable=False)
+
+    op.create_table('search_term_stats',
+    sa.Column('office_id', sa.UUID(), nullable=False),
+    sa.Column('term_key', sa.BigInteger(), nullable=False),
+    sa.Column('doc_freq', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['office_id'], ['offices.id'], ),
+    sa.PrimaryKeyConstraint('office_id', 'term_key')
+    )
+    op.create_table('search_office_stats',
+    sa.Column('office_id', sa.UUID(), nullable=False),
+    sa.Column('doc_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['office_id'], ['offices.id'], ),
+    sa.PrimaryKeyConstraint('office_id')
+    )
+
+    # Backfill from whichever layout holds each note's terms (both, for notes indexed before
+    # note_term_sets existed; UNION removes the duplicates)
+    op.execute("""
+        WITH terms AS (
+            SELECT note_id, ('x' || substr(term_hash, 1, 16))::bit(64)::bigint AS term_key FROM blind_indexes
+            UNION
+            SELECT note_id, unnest(term_keys) FROM note_term_sets
+        )
+        INSERT INTO search_term_stats (office_id, term_key, doc_freq)
+        SELECT n.office_id, t.term_key, count(*)
+        FROM terms t JOIN notes n ON n.id = t.note_id
+        WHERE n.office_id IS NOT NULL
+        GROUP BY n.office_id, t.term_key
+    """)
+    op.execute("""
+        WITH indexed AS (
+            SELECT note_id FROM blind_indexes
+            UNION
+            SELECT note_id FROM note_term_sets WHERE cardinality(term_keys) > 0
+        )
+        INSERT INTO search_office_stats (office_id, doc_count)
+        SELECT n.office_id, count(*)
+        FROM indexed i JOIN notes n ON n.id = i.note_id
+        WHERE n.office_id IS NOT NULL
+        GROUP BY n.office_id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('search_office_stats')
+    op.drop_table('search_term_stats')
+    op.drop_column('note_term_sets', 'term_freqs')
+    op.drop_column('blind_indexes', 'term_freq')
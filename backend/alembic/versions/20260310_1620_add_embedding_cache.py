@@ -0,0 +1,36 @@
+"""Add embedding_cache and note_embeddings.content_key
+
+Revision ID: 1b7d4f20a8c6
+Revises: 0a6c2e97d513
+Create Date: 2026-03-10 16:20:44.918302
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from pgvector.sqlalchemy import Vector
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1b7d4f20a8c6'
+down_revision: Union[str, None] = '0a6c2e97d513'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('embedding_cache',
+    sa.Column('key', sa.LargeBinary(), nullable=False),
+    sa.Column('model', sa.String(), nullable=False),
+    sa.Column('vector', Vector(1536), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('key')
+    )
+    # NULL for existing rows: their next index_note re-embeds once (through the cache)
+    op.add_column('note_embeddings', sa.Column('content_key', sa.LargeBinary(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('note_embeddings', 'content_key')
+    op.drop_table('embedding_cache')
@@ -0,0 +1,37 @@
+"""Add search_index_jobs outbox
+
+Revision ID: 2c90e5b7f14d
+Revises: 1b7d4f20a8c6
+Create Date: 2026-03-17 11:05:27.603318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2c90e5b7f14d'
+down_revision: Union[str, None] = '1b7d4f20a8c6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('search_index_jobs',
+    sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+    sa.Column('note_id', sa.UUID(), nullable=False),
+    sa.Column('attempts', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('available_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('last_error', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['note_id'], ['notes.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_search_index_jobs_available_at', 'search_index_jobs', ['available_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_search_index_jobs_available_at', table_name='search_index_jobs')
+    op.drop_table('search_index_jobs')
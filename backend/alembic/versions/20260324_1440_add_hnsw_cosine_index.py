@@ -0,0 +1,38 @@
+"""Add HNSW cosine index on note_embeddings.vector
+
+Revision ID: 3e1a7c59d2f0
+Revises: 2c90e5b7f14d
+Create Date: 2026-03-24 14:40:09.117352
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+from app.core.config import settings
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3e1a7c59d2f0'
+down_revision: Union[str, None] = '2c90e5b7f14d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # vector_cosine_ops: must match the <=> (cosine_distance) operator used by search_notes,
+    # an index built with another opclass (e.g. vector_l2_ops) is never used for it.
+    # Built CONCURRENTLY (outside the migration transaction) so note writes are not blocked.
+    # Memory for the build: SEARCH_HNSW_BUILD_MAINTENANCE_WORK_MEM.
+    with op.get_context().autocommit_block():
+        op.execute(f"SET maintenance_work_mem = '{settings.SEARCH_HNSW_BUILD_MAINTENANCE_WORK_MEM}'")
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_note_embeddings_vector_hnsw "
+            "ON note_embeddings USING hnsw (vector vector_cosine_ops) WITH (m = 16, ef_construction = 64)"
+        )
+        op.execute("RESET maintenance_work_mem")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_note_embeddings_vector_hnsw")
@@ -0,0 +1,64 @@
+"""Copy office_id onto the search tables, with per-office composite indexes
+
+Revision ID: 4f2d8b61c0a7
+Revises: 3e1a7c59d2f0
+Create Date: 2026-03-31 10:10:27.593018
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4f2d8b61c0a7'
+down_revision: Union[str, None] = '3e1a7c59d2f0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ('note_embeddings', 'blind_indexes', 'note_term_sets')
+
+
+def upgrade() -> None:
+    for table in TABLES:
+        op.add_column(table, sa.Column('office_id', sa.UUID(), nullable=True))
+        op.create_foreign_key(f'{table}_office_id_fkey', table, 'offices', ['office_id'], ['id'])
+
+    # Backfill before the indexes are built (one bulk build each, no per-row index updates)
+    for table in TABLES:
+        op.execute(f"""
+            UPDATE {table} t SET office_id = n.office_id
+            FROM notes n
+            WHERE n.id = t.note_id AND n.office_id IS NOT NULL
+        """)
+
+    # Keyword search reads one (office_id, term_hash) range per term; note_id and term_freq
+    # are included for index-only scans. Replaces the office-agnostic term_hash index.
+    op.create_index('ix_blind_indexes_office_term', 'blind_indexes', ['office_id', 'term_hash'],
+                    postgresql_include=['note_id', 'term_freq'])
+    op.drop_index('ix_blind_indexes_term_hash', table_name='blind_indexes')
+
+    # GIN over (office_id, term_keys); btree_gin provides the uuid operator class
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gin")
+    op.create_index('ix_note_term_sets_office_term_keys', 'note_term_sets', ['office_id', 'term_keys'],
+                    postgresql_using='gin')
+    op.drop_index('ix_note_term_sets_term_keys', table_name='note_term_sets')
+
+    # The HNSW index stays global (filtered by iterative scans); small offices are
+    # cheaper to scan exactly through this one
+    op.create_index('ix_note_embeddings_office_id', 'note_embeddings', ['office_id'])
+
+    for table in TABLES:
+        op.execute(f"ANALYZE {table}")
+
+
+def downgrade() -> None:
+    op.drop_index('ix_note_embeddings_office_id', table_name='note_embeddings')
+    op.create_index('ix_note_term_sets_term_keys', 'note_term_sets', ['term_keys'], postgresql_using='gin')
+    op.drop_index('ix_note_term_sets_office_term_keys', table_name='note_term_sets')
+    op.create_index('ix_blind_indexes_term_hash', 'blind_indexes', ['term_hash'])
+    op.drop_index('ix_blind_indexes_office_term', table_name='blind_indexes')
+    for table in TABLES:
+        op.drop_constraint(f'{table}_office_id_fkey', table, type_='foreignkey')
+        op.drop_column(table, 'office_id')
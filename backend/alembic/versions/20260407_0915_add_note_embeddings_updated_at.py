@@ -0,0 +1,33 @@
+"""Add note_embeddings.updated_at for incremental reads of the in-process vector index
+
+Revision ID: 5a9e3c17b4d2
+Revises: 4f2d8b61c0a7
+Create Date: 2026-04-07 09:15:42.806131
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5a9e3c17b4d2'
+down_revision: Union[str, None] = '4f2d8b61c0a7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Constant default: no table rewrite (existing rows read as "now")
+    op.add_column('note_embeddings', sa.Column('updated_at', sa.DateTime(timezone=True),
+                                               server_default=sa.text('now()'), nullable=False))
+    # (office_id, updated_at) serves the office filter as well as the changed-since reads
+    op.create_index('ix_note_embeddings_office_updated', 'note_embeddings', ['office_id', 'updated_at'])
+    op.drop_index('ix_note_embeddings_office_id', table_name='note_embeddings')
+
+
+def downgrade() -> None:
+    op.create_index('ix_note_embeddings_office_id', 'note_embeddings', ['office_id'])
+    op.drop_index('ix_note_embeddings_office_updated', table_name='note_embeddings')
+    op.drop_column('note_embeddings', 'updated_at')
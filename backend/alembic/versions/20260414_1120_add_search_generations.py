@@ -0,0 +1,33 @@
+"""Add search_generations (per-office write counter validating cached search results)
+
+Revision ID: 6b0d4f28e9a3
+Revises: 5a9e3c17b4d2
+Create Date: 2026-04-14 11:20:08.314275
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6b0d4f28e9a3'
+down_revision: Union[str, None] = '5a9e3c17b4d2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Rows are created by the first index write of each office (missing row = generation 0)
+    op.create_table('search_generations',
+        sa.Column('office_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('generation', sa.BigInteger(), nullable=False),
+        sa.ForeignKeyConstraint(['office_id'], ['offices.id'], ),
+        sa.PrimaryKeyConstraint('office_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('search_generations')
@@ -0,0 +1,32 @@
+"""Unique (note_id, term_hash) index on blind_indexes
+
+Revision ID: 7c1e5a39f0b4
+Revises: 6b0d4f28e9a3
+Create Date: 2026-04-21 09:30:51.207684
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c1e5a39f0b4'
+down_revision: Union[str, None] = '6b0d4f28e9a3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Concurrent indexing of the same note could insert a term twice: keep one row each.
+    # (The office term statistics counted those twice too: rebuild them with app.jobs.reindex.)
+    op.execute("""
+        DELETE FROM blind_indexes a USING blind_indexes b
+        WHERE a.note_id = b.note_id AND a.term_hash = b.term_hash AND a.ctid < b.ctid
+    """)
+    # Serves the per-note reads / deletes / updates of the diff path, which otherwise scan the table
+    op.create_index('ux_blind_indexes_note_term', 'blind_indexes', ['note_id', 'term_hash'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ux_blind_indexes_note_term', table_name='blind_indexes')
@@ -0,0 +1,26 @@
+"""Index note_embeddings.content_key
+
+Revision ID: 8d2f6b40a1c5
+Revises: 7c1e5a39f0b4
+Create Date: 2026-04-28 10:15:37.402816
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d2f6b40a1c5'
+down_revision: Union[str, None] = '7c1e5a39f0b4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # app.jobs.purge_embedding_cache probes it for every embedding_cache key
+    op.create_index('ix_note_embeddings_content_key', 'note_embeddings', ['content_key'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_note_embeddings_content_key', table_name='note_embeddings')
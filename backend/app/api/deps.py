@@ -1,4 +1,7 @@
+import hashlib
+import time
 from typing import Generator, Optional, Union
+from uuid import UUID
 from fastapi import Depends, HTTPException, status, Security
 from fastapi.security import OAuth2PasswordBearer, APIKeyHeader
 from jose import jwt, JWTError
@@ -8,57 +11,149 @@ from sqlalchemy.future import select
 
 from app.core import security
 from app.core.config import settings
+from app.core.principal_cache import Principal, principal_cache
+from app.core.token_epochs import token_epochs
 from app.db.session import get_db
 from app.models import User, ApiKey
 from app.models.office import Office
 
+# auto_error=False: X-Office-Key callers send no bearer token; the dependencies below decide
 reusable_oauth2 = OAuth2PasswordBearer(
-    tokenUrl=f"{settings.API_V1_STR}/auth/login"
+    tokenUrl=f"{settings.API_V1_STR}/auth/login",
+    auto_error=False
 )
 # We accept X-Office-Key provided mechanism
 api_key_header = APIKeyHeader(name="X-Office-Key", auto_error=False)
 
-async def get_current_tenant_id(
+def _token_cache_key(token: str) -> str:
+    return "jwt:" + hashlib.sha256(token.encode()).hexdigest()
+
+async def _resolve_api_key(db: AsyncSession, x_office_key: str) -> Optional[Principal]:
+    """Resolve X-Office-Key to a Principal (cached by key hash)"""
+    api_key_hash = security.get_api_key_hash(x_office_key)
+    cache_key = "key:" + api_key_hash
+    principal = principal_cache.get(cache_key)
+    if principal is None:
+        # Verify Key in DB
+        result = await db.execute(select(ApiKey).filter(ApiKey.key_hash == api_key_hash))
+        api_key_obj = result.scalars().first()
+        if not api_key_obj:
+            return None
+        principal = Principal.from_api_key(api_key_obj)
+        principal_cache.set(cache_key, principal)
+    return principal
+
+async def _principal_from_claims(db: AsyncSession, payload: dict) -> Principal:
+    """Self-contained token: no users query, only the periodically refreshed epoch table"""
+    user_id = payload.get("sub")
+    if user_id is None:
+        raise JWTError("Missing subject")
+    await token_epochs.ensure_fresh(db)
+    is_active = not token_epochs.is_revoked(user_id, payload.get("epoch", 0))
+    return Principal(
+        "user", UUID(user_id), UUID(payload["office_id"]), is_active,
+        payload.get("role"), payload.get("email")
+    )
+
+async def _resolve_token(db: AsyncSession, token: str) -> Optional[Principal]:
+    """
+    Resolve a JWT to a Principal (cached by token hash, never beyond token expiry).
+    Raises JWTError for invalid tokens, returns None if the user does not exist.
+    """
+    if settings.JWT_SELF_CONTAINED_CLAIMS:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[security.ALGORITHM])
+        if "office_id" in payload:
+            return await _principal_from_claims(db, payload)
+        # Token issued before claims mode was enabled: fall through to the DB path
+
+    cache_key = _token_cache_key(token)
+    principal = principal_cache.get(cache_key)
+    if principal is not None:
+        # Invalidation is per process: a bumped epoch means another worker changed the user
+        await token_epochs.ensure_fresh(db)
+        if not token_epochs.is_revoked(principal.id, principal.epoch):
+            return principal
+        principal_cache.invalidate_principal(principal.id)
+
+    payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[security.ALGORITHM])
+    user_id = payload.get("sub")
+    if user_id is None:
+        raise JWTError("Missing subject")
+
+    result = await db.execute(select(User).filter(User.id == user_id))
+    user = result.scalars().first()
+    if not user:
+        return None
+
+    principal = Principal.from_user(user)
+    max_age = payload["exp"] - time.time() if "exp" in payload else None
+    principal_cache.set(cache_key, principal, max_age=max_age)
+    return principal
+
+class AuthContext:
+    """
+    Request-scoped caller resolution.
+    FastAPI caches dependency results per request, so every dependency reading from
+    get_auth_context shares one instance: the JWT is decoded and the caller looked up
+    at most once per request, however many auth dependencies an endpoint declares.
+    """
+
+    def __init__(self, db: AsyncSession, token: Optional[str], x_office_key: Optional[str]):
+        self.db = db
+        self.token = token
+        self.x_office_key = x_office_key
+        self._resolved = {}
+
+    async def api_key_principal(self) -> Optional[Principal]:
+        if "api_key" not in self._resolved:
+            self._resolved["api_key"] = await _resolve_api_key(self.db, self.x_office_key)
+        return self._resolved["api_key"]
+
+    async def user_principal(self) -> Optional[Principal]:
+        """Raises JWTError for an invalid token (the failure is memoized too)"""
+        if "user" not in self._resolved:
+            try:
+                self._resolved["user"] = await _resolve_token(self.db, self.token)
+            except (JWTError, ValidationError) as e:
+                self._resolved["user"] = e
+        result = self._resolved["user"]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+async def get_auth_context(
     db: AsyncSession = Depends(get_db),
-    token: str = Depends(reusable_oauth2),
-    x_office_key: str = Security(api_key_header)
+    token: Optional[str] = Depends(reusable_oauth2),
+    x_office_key: Optional[str] = Security(api_key_header)
+) -> AuthContext:
+    return AuthContext(db, token, x_office_key)
+
+async def get_current_tenant_id(
+    auth: AuthContext = Depends(get_auth_context)
 ) -> str:
     """
     Returns the office_id (UUID) for the current request.
     Prioritizes X-Office-Key (System) -> JWT (User).
     """
     # 1. Check API Key first (System/Office Access)
-    if x_office_key:
-        api_key_hash = security.get_api_key_hash(x_office_key)
-        # Verify Key in DB
-        result = await db.execute(select(ApiKey).filter(ApiKey.key_hash == api_key_hash))
-        api_key_obj = result.scalars().first()
-        
-        if api_key_obj and api_key_obj.is_active:
-            return api_key_obj.office_id
+    if auth.x_office_key:
+        principal = await auth.api_key_principal()
+        if principal and principal.is_active:
+            return principal.office_id
         # If key provided but invalid, we might want to fail fast, but let's fall through
         # implementation detail: if key is wrong, request is unauthorized regardless of JWT?
         # For now, if key is wrong, we return 401.
         raise HTTPException(status_code=401, detail="Invalid Office Key")
     
     # 2. Check JWT (User Access)
-    if token:
+    if auth.token:
         try:
-            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[security.ALGORITHM])
-            user_id: str = payload.get("sub")
-            if user_id is None:
-                raise HTTPException(status_code=403, detail="Could not validate credentials")
-            
-            # Fetch User to get Office ID
-            result = await db.execute(select(User).filter(User.id == user_id))
-            user = result.scalars().first()
-            if not user or not user.is_active:
-                 raise HTTPException(status_code=403, detail="User not found or inactive")
-            
-            return user.office_id
-            
+            principal = await auth.user_principal()
         except (JWTError, ValidationError):
-             raise HTTPException(status_code=403, detail="Could not validate credentials")
+            raise HTTPException(status_code=403, detail="Could not validate credentials")
+        if not principal or not principal.is_active:
+            raise HTTPException(status_code=403, detail="User not found or inactive")
+        return principal.office_id
 
     # 3. Fail if neither
     raise HTTPException(
@@ -67,27 +162,36 @@ async def get_current_tenant_id(
     )
 
 async def get_current_user(
-    db: AsyncSession = Depends(get_db),
-    token: str = Depends(reusable_oauth2)
-) -> User:
+    auth: AuthContext = Depends(get_auth_context)
+) -> Principal:
     """
     Extracts User from JWT. Used for endpoints requiring specific user role (Author).
+    Returns the cached Principal (id, email, office_id, role), not an ORM object.
     """
+    # X-Office-Key callers have no user identity; fail without a lookup
+    if not auth.token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[security.ALGORITHM])
-        user_id = payload.get("sub")
-        if user_id is None:
-             raise HTTPException(status_code=403, detail="Could not validate credentials")
+        principal = await auth.user_principal()
     except (JWTError, ValidationError):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Could not validate credentials",
         )
-        
-    result = await db.execute(select(User).filter(User.id == user_id))
-    user = result.scalars().first()
-    if not user:
+    if not principal:
         raise HTTPException(status_code=404, detail="User not found")
-    if not user.is_active:
+    if not principal.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
-    return user
+    return principal
+
+async def get_current_admin(
+    current_user: Principal = Depends(get_current_user)
+) -> Principal:
+    """Office admin (role ADMIN). Used for operational endpoints such as /metrics."""
+    if current_user.role != "ADMIN":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return current_user
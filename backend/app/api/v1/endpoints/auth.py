@@ -1,5 +1,6 @@
 from datetime import timedelta
 from typing import Any, List
+from uuid import UUID
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
@@ -9,12 +10,20 @@ import secrets
 from app.db.session import get_db
 from app.core import security
 from app.core.config import settings
+from app.core.principal_cache import Principal
 from app.models import User, Office, ApiKey
 from app.schemas import auth as schemas
 from app.api import deps
 
 router = APIRouter()
 
+def _login_busy() -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="Too many concurrent logins, please retry",
+        headers={"Retry-After": "1"},
+    )
+
 @router.post("/register", response_model=schemas.Token)
 async def register(
     data: schemas.RegisterRequest, 
@@ -28,7 +37,13 @@ async def register(
             detail="The user with this email already exists in the system.",
         )
     
-    # 2. Create Office
+    # 2. Hash password off the event loop (before creating anything)
+    try:
+        hashed_password = await security.get_password_hash_async(data.user.password)
+    except security.HashingPoolBusy:
+        raise _login_busy()
+
+    # 3. Create Office
     office = Office(
         name=data.office.name,
         address=data.office.address
@@ -37,24 +52,26 @@ async def register(
     await db.commit() # Commit to generate ID
     await db.refresh(office)
     
-    # 3. Create User (Admin)
+    # 4. Create User (Admin)
     user = User(
         email=data.user.email,
-        hashed_password=security.get_password_hash(data.user.password),
+        hashed_password=hashed_password,
         full_name=data.user.full_name,
         role="ADMIN",
-        office_id=office.id
+        office_id=office.id,
+        token_epoch=0
     )
     db.add(user)
     
-    # 4. Create Default API Key? (Optional, let's skip automatic key for now, they can generate one)
+    # 5. Create Default API Key? (Optional, let's skip automatic key for now, they can generate one)
     
     await db.commit()
     
-    # 5. Generate Token
+    # 6. Generate Token
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = security.create_access_token(
-        subject=user.id, expires_delta=access_token_expires
+        subject=user.id, expires_delta=access_token_expires,
+        claims=security.user_token_claims(user)
     )
     
     return {
@@ -72,7 +89,13 @@ async def login(
     user = result.scalars().first()
     
     # 2. Validate
-    if not user or not security.verify_password(login_data.password, user.hashed_password):
+    if not user:
+        raise HTTPException(status_code=400, detail="Incorrect email or password")
+    try:
+        password_ok = await security.verify_password_async(login_data.password, user.hashed_password)
+    except security.HashingPoolBusy:
+        raise _login_busy()
+    if not password_ok:
         raise HTTPException(status_code=400, detail="Incorrect email or password")
     if not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
@@ -80,7 +103,8 @@ async def login(
     # 3. Generate Token
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = security.create_access_token(
-        subject=user.id, expires_delta=access_token_expires
+        subject=user.id, expires_delta=access_token_expires,
+        claims=security.user_token_claims(user)
     )
     
     return {
@@ -91,7 +115,7 @@ async def login(
 @router.post("/keys", response_model=schemas.ApiKeyResponse)
 async def create_api_key(
     key_data: schemas.ApiKeyCreate,
-    current_user: User = Depends(deps.get_current_user),
+    current_user: Principal = Depends(deps.get_current_user),
     db: AsyncSession = Depends(get_db)
 ) -> Any:
     # 1. Generate Key
@@ -120,9 +144,46 @@ async def create_api_key(
 
 @router.get("/keys", response_model=List[schemas.ApiKeyResponse])
 async def list_api_keys(
-    current_user: User = Depends(deps.get_current_user),
+    current_user: Principal = Depends(deps.get_current_user),
     db: AsyncSession = Depends(get_db)
 ) -> Any:
     result = await db.execute(select(ApiKey).filter(ApiKey.office_id == current_user.office_id))
     keys = result.scalars().all()
     return keys
+
+@router.delete("/keys/{key_id}", status_code=204)
+async def revoke_api_key(
+    key_id: UUID,
+    current_user: Principal = Depends(deps.get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Revoke an office API key. Cached lookups for it are dropped on commit."""
+    result = await db.execute(select(ApiKey).filter(ApiKey.id == key_id, ApiKey.office_id == current_user.office_id))
+    api_key = result.scalars().first()
+    if not api_key:
+        raise HTTPException(status_code=404, detail="API key not found")
+
+    api_key.is_active = False
+    await db.commit()
+    return
+
+@router.post("/users/{user_id}/deactivate", status_code=204)
+async def deactivate_user(
+    user_id: UUID,
+    current_user: Principal = Depends(deps.get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Deactivate a user of the caller's office (ADMIN only). Takes effect immediately."""
+    if current_user.role != "ADMIN":
+        raise HTTPException(status_code=403, detail="Only office admins can deactivate users")
+
+    result = await db.execute(select(User).filter(User.id == user_id, User.office_id == current_user.office_id))
+    user = result.scalars().first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    # Bump the epoch so self-contained tokens already issued are rejected too
+    user.is_active = False
+    user.token_epoch = (user.token_epoch or 0) + 1
+    await db.commit() # The principal_cache hooks apply the new epoch to this process
+    return
@@ -5,10 +5,13 @@ from typing import List
 from uuid import UUID
 
 from app.db.session import get_db
-from app.models import Note, NoteHistory, User
+from app.models import Note, NoteHistory
 from app.schemas import visit_note as schemas
-from app.core.security import encrypt_data, decrypt_data
+from app.db.encrypted import decrypt_attributes
 from app.api.deps import get_current_tenant_id, get_current_user
+from app.core.principal_cache import Principal
+from app.services.search_service import enqueue_index
+from app.jobs.index_worker import index_worker
 
 router = APIRouter()
 
@@ -17,14 +20,12 @@ async def create_note(
     note: schemas.NoteCreate, 
     db: AsyncSession = Depends(get_db),
     tenant_id: str = Depends(get_current_tenant_id),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
-    encrypted_content = encrypt_data(note.content)
-    
     db_note = Note(
         patient_id=note.patient_id,
         visit_id=note.visit_id,
-        content=encrypted_content,
+        content=note.content, # Encrypted on flush
         area_of_oral_cavity=note.area_of_oral_cavity,
         tooth_number=note.tooth_number,
         surface_ids=note.surface_ids,
@@ -33,15 +34,14 @@ async def create_note(
         office_id=tenant_id
     )
     db.add(db_note)
+    await db.flush()
+    
+    # Index Note for Search (outbox: committed with the note, indexed by the worker)
+    enqueue_index(db, db_note.id)
     await db.commit()
     await db.refresh(db_note)
+    index_worker.notify()
     
-    # Index Note for Search
-    from app.services.search_service import SearchService
-    search_service = SearchService(db)
-    await search_service.index_note(db_note.id, note.content)
-    
-    db_note.content = note.content # Return decrypted
     return db_note
 
 @router.put("/{note_id}", response_model=schemas.NoteResponse)
@@ -50,7 +50,7 @@ async def update_note(
     note_update: schemas.NoteUpdate, 
     db: AsyncSession = Depends(get_db),
     tenant_id: str = Depends(get_current_tenant_id),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     result = await db.execute(select(Note).filter(Note.id == note_id, Note.office_id == tenant_id))
     db_note = result.scalars().first()
@@ -60,7 +60,7 @@ async def update_note(
     # 1. Create History Record with OLD content
     history_record = NoteHistory(
         note_id=db_note.id,
-        previous_content=db_note.content, # Already encrypted
+        previous_content=Note.content.ciphertext(db_note), # Copied encrypted, no decrypt
         area_of_oral_cavity=db_note.area_of_oral_cavity,
         tooth_number=db_note.tooth_number,
         surface_ids=db_note.surface_ids,
@@ -72,7 +72,7 @@ async def update_note(
     db.add(history_record)
     
     # 2. Update Note with NEW content
-    db_note.content = encrypt_data(note_update.content)
+    db_note.content = note_update.content
     db_note.area_of_oral_cavity = note_update.area_of_oral_cavity
     db_note.tooth_number = note_update.tooth_number
     db_note.surface_ids = note_update.surface_ids
@@ -84,15 +84,13 @@ async def update_note(
     # We won't change `author_id` here unless business req says so. 
     # But for now, let's leave author_id as creator.
     
-    # Index Update for Search
-    from app.services.search_service import SearchService
-    search_service = SearchService(db)
-    await search_service.index_note(db_note.id, note_update.content)
+    # Index Update for Search (outbox, same transaction)
+    enqueue_index(db, db_note.id)
     
     await db.commit()
     await db.refresh(db_note)
+    index_worker.notify()
     
-    db_note.content = note_update.content # Return decrypted
     return db_note
 
 @router.get("/patient/{patient_id}", response_model=List[schemas.NoteResponse])
@@ -104,7 +102,20 @@ async def read_patient_notes(
     result = await db.execute(select(Note).filter(Note.patient_id == patient_id, Note.office_id == tenant_id))
     notes = result.scalars().all()
     
-    for n in notes:
-        n.content = decrypt_data(n.content)
-        
+    await decrypt_attributes(notes, "content")
     return notes
+
+@router.get("/{note_id}", response_model=schemas.NoteResponse)
+async def read_note(
+    note_id: UUID,
+    db: AsyncSession = Depends(get_db),
+    tenant_id: str = Depends(get_current_tenant_id)
+):
+    # Full content of one note (search results in snippet view carry only a window)
+    result = await db.execute(select(Note).filter(Note.id == note_id, Note.office_id == tenant_id))
+    db_note = result.scalars().first()
+    if not db_note:
+        raise HTTPException(status_code=404, detail="Note not found")
+
+    await decrypt_attributes([db_note], "content")
+    return db_note
@@ -7,7 +7,8 @@ from uuid import UUID
 from app.db.session import get_db
 from app.models import Patient
 from app.schemas import patient as schemas
-from app.core.security import encrypt_data, decrypt_data, get_blind_index
+from app.core.security import get_blind_index
+from app.db.encrypted import decrypt_attributes
 from app.api.deps import get_current_tenant_id
 
 router = APIRouter()
@@ -18,14 +19,12 @@ async def create_patient(
     db: AsyncSession = Depends(get_db),
     tenant_id: str = Depends(get_current_tenant_id)
 ):
-    # Encrypt sensitive fields
-    encrypted_first = encrypt_data(patient.first_name)
-    encrypted_last = encrypt_data(patient.last_name)
+    # Names are encrypted on flush (EncryptedText)
     blind_index = get_blind_index(patient.last_name)
     
     db_patient = Patient(
-        first_name=encrypted_first,
-        last_name=encrypted_last,
+        first_name=patient.first_name,
+        last_name=patient.last_name,
         last_name_hash=blind_index,
         dob=patient.dob,
         contact_info=patient.contact_info.model_dump() if patient.contact_info else None,
@@ -37,10 +36,6 @@ async def create_patient(
     await db.commit()
     await db.refresh(db_patient)
     
-    # Decrypt for response
-    db_patient.first_name = patient.first_name
-    db_patient.last_name = patient.last_name
-    
     return db_patient
 
 @router.put("/{patient_id}", response_model=schemas.PatientResponse)
@@ -56,9 +51,9 @@ async def update_patient(
         raise HTTPException(status_code=404, detail="Patient not found")
 
     if patient_update.first_name:
-        db_patient.first_name = encrypt_data(patient_update.first_name)
+        db_patient.first_name = patient_update.first_name
     if patient_update.last_name:
-        db_patient.last_name = encrypt_data(patient_update.last_name)
+        db_patient.last_name = patient_update.last_name
         db_patient.last_name_hash = get_blind_index(patient_update.last_name)
     if patient_update.dob:
         db_patient.dob = patient_update.dob
@@ -70,10 +65,6 @@ async def update_patient(
     await db.commit()
     await db.refresh(db_patient)
 
-    # Decrypt for response
-    db_patient.first_name = decrypt_data(db_patient.first_name)
-    db_patient.last_name = decrypt_data(db_patient.last_name)
-
     return db_patient
 
 @router.get("/{patient_id}", response_model=schemas.PatientResponse)
@@ -87,9 +78,7 @@ async def read_patient(
     if not patient or not patient.is_active:
         raise HTTPException(status_code=404, detail="Patient not found")
     
-    # Decrypt
-    patient.first_name = decrypt_data(patient.first_name)
-    patient.last_name = decrypt_data(patient.last_name)
+    # Names decrypt lazily when the response is serialized
     return patient
 
 @router.delete("/{patient_id}", status_code=204)
@@ -122,9 +111,6 @@ async def search_patients(
     )
     patients = result.scalars().all()
     
-    # Decrypt all
-    for p in patients:
-        p.first_name = decrypt_data(p.first_name)
-        p.last_name = decrypt_data(p.last_name)
-        
+    # Decrypt all (one batch for both name columns)
+    await decrypt_attributes(patients, "first_name", "last_name")
     return patients
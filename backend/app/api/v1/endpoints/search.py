@@ -1,45 +1,125 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List, Optional
-from pydantic import BaseModel
+from sqlalchemy.dialects.postgresql import ARRAY, UUID as PG_UUID
+from typing import AsyncIterator, List, Literal, Optional, Tuple, Union
+from pydantic import BaseModel, Field
 from uuid import UUID
 
+from app.core.config import settings
 from app.db.session import get_db
-from app.services.search_service import SearchService
+from app.services.search_service import SearchHit, SearchService
+from app.services.search_cursor import decode_cursor, encode_cursor
+from app.services.snippets import query_terms, snippet_batch
 from app.models import Note
 from app.schemas import visit_note as schemas
-from app.core.security import decrypt_data
-from sqlalchemy import select
+from app.db.encrypted import decrypt_attributes
+from sqlalchemy import select, func, literal
 from app.api.deps import get_current_tenant_id
 
 router = APIRouter()
 
+CURSOR_HEADER = "X-Next-Cursor" # Set when more results follow; send it back as `cursor`
+STREAM_BATCH_SIZE = 5 # Notes decrypted per NDJSON write
+
 class SearchQuery(BaseModel):
     query: str
-    limit: Optional[int] = 10
+    limit: Optional[int] = Field(10, ge=1, le=100) # Results per page
+    mode: Literal["or", "and"] = "or" # Keyword terms: any / all must match
+    include_scores: bool = False
+    # "snippet": metadata + a highlighted window per note instead of the full content
+    view: Literal["full", "snippet"] = "full"
+    snippet_chars: int = Field(160, ge=40, le=settings.SEARCH_SNIPPET_MAX_CHARS)
+    cursor: Optional[str] = None # X-Next-Cursor of the previous page (same query and mode)
+
+SearchResult = Union[schemas.SearchSnippetResponse, schemas.SearchNoteResponse]
+
+async def _ranked_page(query: SearchQuery, db: AsyncSession, tenant_id) -> Tuple[List[SearchHit], List[Note], Optional[str]]:
+    """Hits of the requested page, their notes in rank order, and the cursor for the next page"""
+    limit = query.limit or 10
+    if query.cursor:
+        resumed = decode_cursor(query.cursor, tenant_id, query.query, query.mode)
+        if resumed is None:
+            raise HTTPException(status_code=400, detail="Invalid or expired cursor")
+        ranked, expires = resumed
+    else:
+        # Rank several pages at once: the cursor carries the rest
+        window = max(limit, min(limit * settings.SEARCH_CURSOR_PAGES, settings.SEARCH_CURSOR_MAX_RESULTS))
+        service = SearchService(db)
+        ranked = await service.search_notes(query.query, tenant_id=tenant_id, limit=window, mode=query.mode)
+        expires = None
+    hits, rest = ranked[:limit], ranked[limit:]
+    next_cursor = encode_cursor(rest, tenant_id, query.query, query.mode, expires) if rest else None
+
+    if not hits:
+        return [], [], None
+    # Fetch exactly the ranked notes, in rank order, in one query
+    # Also enforce tenant filter here just in case, though search service should have handled it.
+    note_ids = [hit.note_id for hit in hits]
+    stmt = (
+        select(Note)
+        .filter(Note.id.in_(note_ids), Note.office_id == tenant_id)
+        .order_by(func.array_position(literal(note_ids, ARRAY(PG_UUID(as_uuid=True))), Note.id))
+    )
+    result = await db.execute(stmt)
+    return hits, result.scalars().all(), next_cursor
 
-@router.post("", response_model=List[schemas.NoteResponse])
+async def _results(query: SearchQuery, hits: List[SearchHit], notes: List[Note], batch_size: int) -> AsyncIterator[List[SearchResult]]:
+    """Response models for the notes, batch_size notes (decrypted together) at a time"""
+    scores = {hit.note_id: hit.score for hit in hits} if query.include_scores else {}
+    if query.view == "snippet":
+        # Only the window is decoded; semantic-only hits (no keyword match) get the note's lead
+        terms = query_terms(query.query)
+        keyword_hits = {hit.note_id for hit in hits if hit.keyword_rank is not None}
+    for i in range(0, len(notes), batch_size):
+        batch = notes[i:i + batch_size]
+        if query.view == "snippet":
+            snippets = await snippet_batch([
+                (Note.content.ciphertext(note), terms if note.id in keyword_hits else set(), query.snippet_chars)
+                for note in batch
+            ])
+            yield [
+                schemas.SearchSnippetResponse.model_validate(note).model_copy(update={
+                    "score": scores.get(note.id),
+                    "snippet": snippet.text,
+                    "snippet_start": snippet.start,
+                    "highlights": snippet.highlights,
+                    "truncated": snippet.truncated,
+                })
+                for note, snippet in zip(batch, snippets)
+            ]
+        else:
+            await decrypt_attributes(batch, "content")
+            yield [
+                schemas.SearchNoteResponse.model_validate(note).model_copy(update={"score": scores.get(note.id)})
+                for note in batch
+            ]
+
+@router.post("", response_model=List[SearchResult])
 async def search_notes(
     query: SearchQuery, 
+    response: Response,
     db: AsyncSession = Depends(get_db),
     tenant_id: str = Depends(get_current_tenant_id)
 ):
-    service = SearchService(db)
-    note_ids = await service.search_notes(query.query, tenant_id=tenant_id, limit=query.limit)
-    
-    if not note_ids:
-        return []
-        
-    # Fetch full notes
-    # We must decrypt them before returning
-    # Also enforce tenant filter here just in case, though search service should have handled it.
-    stmt = select(Note).filter(Note.id.in_(note_ids), Note.office_id == tenant_id)
-    result = await db.execute(stmt)
-    notes = result.scalars().all()
-    
-    # Decrypt
-    # TODO: In future, return snippet highlighting instead of full content?
-    for n in notes:
-        n.content = decrypt_data(n.content)
-        
-    return notes
+    hits, notes, next_cursor = await _ranked_page(query, db, tenant_id)
+    if next_cursor:
+        response.headers[CURSOR_HEADER] = next_cursor
+    return [result async for batch in _results(query, hits, notes, max(len(notes), 1)) for result in batch]
+
+@router.post("/stream")
+async def stream_search_notes(
+    query: SearchQuery,
+    db: AsyncSession = Depends(get_db),
+    tenant_id: str = Depends(get_current_tenant_id)
+):
+    """POST /search as NDJSON (one result per line), written as each batch of notes is decrypted"""
+    hits, notes, next_cursor = await _ranked_page(query, db, tenant_id)
+
+    # Notes are loaded up front: the body only decrypts, it does not need the session
+    async def lines():
+        async for batch in _results(query, hits, notes, STREAM_BATCH_SIZE):
+            yield "".join(result.model_dump_json() + "\n" for result in batch)
+
+    headers = {CURSOR_HEADER: next_cursor} if next_cursor else None
+    return StreamingResponse(lines(), media_type="application/x-ndjson", headers=headers)
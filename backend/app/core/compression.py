@@ -0,0 +1,91 @@
+import zlib
+from typing import Iterator, Optional, Tuple
+
+# Compression for clinical note bodies before encryption (ciphertext does not compress).
+# zlib with a preset dictionary: notes are short and share a lot of vocabulary, which a
+# plain compressor cannot exploit on a single small record. The dictionary id is stored
+# in the envelope flags, so the dictionary can be revised without breaking old rows:
+# never edit a shipped dictionary, add a new id instead.
+# Compressed length leaks some information about content; we only compress note bodies,
+# whose stored size an outside party cannot observe while injecting chosen text.
+
+CODEC_NONE = 0
+CODEC_ZLIB = 1
+
+# zlib favours matches near the end of the dictionary: most common phrases go last.
+DENTAL_DICTIONARY_V1 = (
+    "mesial distal occlusal buccal lingual facial incisal palatal MOD MO DO OL DL "
+    "maxillary mandibular anterior posterior quadrant UR UL LR LL upper right upper left lower right lower left "
+    "periapical radiograph bitewing panoramic PA BWX FMX CBCT radiolucency radiopacity widened PDL "
+    "amalgam composite resin glass ionomer porcelain zirconia PFM e.max lithium disilicate "
+    "crown prep buildup core post temporary crown final impression digital scan shade A2 A3 B1 "
+    "root canal therapy RCT pulpotomy pulpectomy access opening working length obturation gutta percha "
+    "irreversible pulpitis reversible pulpitis necrotic pulp symptomatic apical periodontitis abscess "
+    "scaling and root planing SRP prophylaxis prophy debridement probing depths bleeding on probing BOP "
+    "gingivitis periodontitis generalized localized moderate severe bone loss recession furcation mobility "
+    "extraction surgical extraction sectioned elevated forceps socket preservation bone graft membrane "
+    "implant placement healing abutment osseointegration torque Ncm sutures 4-0 chromic gut "
+    "lidocaine 2% with 1:100,000 epinephrine articaine 4% carpule infiltration inferior alveolar nerve block IANB "
+    "amoxicillin 500mg ibuprofen 600mg acetaminophen chlorhexidine rinse post-op instructions given "
+    "medical history reviewed no changes allergies NKDA penicillin latex hypertension diabetes "
+    "blood pressure BP pulse vitals within normal limits WNL "
+    "chief complaint CC pt reports pain sensitivity to cold sensitivity to hot lingering pain biting pain "
+    "percussion palpation cold test EPT positive negative tender to percussion "
+    "caries decay recurrent decay fractured cusp cracked tooth syndrome open contact food impaction "
+    "occlusal adjustment night guard bruxism TMJ limited opening "
+    "treatment plan discussed risks benefits alternatives informed consent signed "
+    "pt tolerated procedure well no complications return to clinic RTC next visit follow up in 2 weeks "
+    "Patient presents with Patient reports Patient tolerated procedure well. "
+    "tooth #"
+).encode()
+
+DICTIONARIES = {1: DENTAL_DICTIONARY_V1}
+CURRENT_DICTIONARY_ID = 1
+
+
+def compress(data: bytes, min_size: int) -> Tuple[bytes, int, int]:
+    """
+    Returns (payload, codec, dictionary_id).
+    Small payloads, and payloads that do not shrink, are stored raw.
+    """
+    if len(data) < min_size:
+        return data, CODEC_NONE, 0
+    compressor = zlib.compressobj(level=6, wbits=-15, zdict=DICTIONARIES[CURRENT_DICTIONARY_ID])
+    compressed = compressor.compress(data) + compressor.flush()
+    if len(compressed) >= len(data):
+        return data, CODEC_NONE, 0
+    return compressed, CODEC_ZLIB, CURRENT_DICTIONARY_ID
+
+
+def _decompressor(codec: int, dictionary_id: int):
+    if codec != CODEC_ZLIB:
+        raise ValueError(f"Unknown compression codec {codec}")
+    zdict: Optional[bytes] = DICTIONARIES.get(dictionary_id) if dictionary_id else None
+    if dictionary_id and zdict is None:
+        raise ValueError(f"Unknown compression dictionary {dictionary_id}")
+    return zlib.decompressobj(wbits=-15, zdict=zdict) if zdict else zlib.decompressobj(wbits=-15)
+
+
+def decompress(payload: bytes, codec: int, dictionary_id: int) -> bytes:
+    if codec == CODEC_NONE:
+        return payload
+    decompressor = _decompressor(codec, dictionary_id)
+    return decompressor.decompress(payload) + decompressor.flush()
+
+
+def decompress_chunks(payload: bytes, codec: int, dictionary_id: int, chunk_size: int) -> Iterator[bytes]:
+    """decompress() in pieces of at most chunk_size bytes (the last one may be larger), lazily"""
+    if codec == CODEC_NONE:
+        for i in range(0, len(payload), chunk_size):
+            yield payload[i:i + chunk_size]
+        return
+    decompressor = _decompressor(codec, dictionary_id)
+    data = payload
+    while data:
+        chunk = decompressor.decompress(data, chunk_size)
+        if chunk:
+            yield chunk
+        data = decompressor.unconsumed_tail
+    rest = decompressor.flush()
+    if rest:
+        yield rest
@@ -15,7 +15,103 @@ class Settings(BaseSettings):
     # JWT Settings
     SECRET_KEY: str = os.getenv("SECRET_KEY", "your-super-secret-key-change-it")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 8 # 8 days
-    
+    # Opt-in: tokens carry office_id/role/email + revocation epoch, verified without a users query.
+    # Revocation (deactivation) reaches other workers within TOKEN_EPOCH_REFRESH_SECONDS.
+    JWT_SELF_CONTAINED_CLAIMS: bool = os.getenv("JWT_SELF_CONTAINED_CLAIMS", "false").lower() == "true"
+    TOKEN_EPOCH_REFRESH_SECONDS: float = float(os.getenv("TOKEN_EPOCH_REFRESH_SECONDS", 30))
+
+    # Write format for encrypted columns: "aesgcm" (versioned envelope) or "fernet" (legacy,
+    # e.g. while older instances that cannot read the envelope are still serving). Reads accept both.
+    ENCRYPTION_FORMAT: str = os.getenv("ENCRYPTION_FORMAT", "aesgcm")
+    # Compressed columns (note bodies) skip compression below this many bytes
+    COMPRESSION_MIN_BYTES: int = int(os.getenv("COMPRESSION_MIN_BYTES", 128))
+
+    # Batch decryption: work is moved to CRYPTO_WORKERS threads above this many ciphertext bytes
+    CRYPTO_WORKERS: int = int(os.getenv("CRYPTO_WORKERS", 4))
+    DECRYPT_BATCH_INLINE_MAX_BYTES: int = int(os.getenv("DECRYPT_BATCH_INLINE_MAX_BYTES", 64 * 1024))
+
+    # Embeddings: "openai" or "hash" (deterministic, offline; for load tests and local dev).
+    # EMBEDDING_DIMENSIONS must match note_embeddings.vector (1536).
+    EMBEDDING_PROVIDER: str = os.getenv("EMBEDDING_PROVIDER", "openai")
+    EMBEDDING_MODEL: str = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
+    EMBEDDING_DIMENSIONS: int = int(os.getenv("EMBEDDING_DIMENSIONS", 1536))
+    EMBEDDING_TIMEOUT_SECONDS: float = float(os.getenv("EMBEDDING_TIMEOUT_SECONDS", 10))
+    EMBEDDING_MAX_RETRIES: int = int(os.getenv("EMBEDDING_MAX_RETRIES", 2))
+    EMBEDDING_MAX_CONNECTIONS: int = int(os.getenv("EMBEDDING_MAX_CONNECTIONS", 20))
+    EMBEDDING_BATCH_SIZE: int = int(os.getenv("EMBEDDING_BATCH_SIZE", 256)) # Inputs per API request
+    # In-process LRU of query embeddings (~6 KB per entry at 1536 dimensions)
+    EMBEDDING_QUERY_CACHE_MAX_ENTRIES: int = int(os.getenv("EMBEDDING_QUERY_CACHE_MAX_ENTRIES", 2048))
+    # embedding_cache rows no note uses any more (edited / re-embedded content) are purged by
+    # app.jobs.purge_embedding_cache once older than this; the vectors derive from note text
+    EMBEDDING_CACHE_RETENTION_DAYS: int = int(os.getenv("EMBEDDING_CACHE_RETENTION_DAYS", 30))
+
+    # Search indexing outbox: note writes enqueue a job, a worker indexes in batches.
+    # The worker runs inside each app process unless disabled (then run app.jobs.index_worker).
+    SEARCH_INDEX_WORKER_ENABLED: bool = os.getenv("SEARCH_INDEX_WORKER_ENABLED", "true").lower() == "true"
+    SEARCH_INDEX_BATCH_SIZE: int = int(os.getenv("SEARCH_INDEX_BATCH_SIZE", 64))
+    SEARCH_INDEX_POLL_SECONDS: float = float(os.getenv("SEARCH_INDEX_POLL_SECONDS", 1))
+    SEARCH_INDEX_MAX_ATTEMPTS: int = int(os.getenv("SEARCH_INDEX_MAX_ATTEMPTS", 8))
+
+    # Semantic search (HNSW, vector_cosine_ops). ef_search: candidates kept during the
+    # graph walk, recall vs latency (raised to the requested candidate count if lower).
+    # Iterative scan ("relaxed_order", "strict_order", or "off" for pgvector < 0.8) keeps
+    # the office filter from starving results; max_scan_tuples bounds that extra work.
+    SEARCH_HNSW_EF_SEARCH: int = int(os.getenv("SEARCH_HNSW_EF_SEARCH", 100))
+    SEARCH_HNSW_ITERATIVE_SCAN: str = os.getenv("SEARCH_HNSW_ITERATIVE_SCAN", "relaxed_order")
+    SEARCH_HNSW_MAX_SCAN_TUPLES: int = int(os.getenv("SEARCH_HNSW_MAX_SCAN_TUPLES", 20000))
+
+    # Precision of the ANN candidate search (the index is what has to stay in memory):
+    # "full" (float32), "halfvec" (float16, 1/2 the index), "subvector" (first
+    # SEARCH_VECTOR_SUBVECTOR_DIMS Matryoshka dimensions) or "binary" (1 bit per dimension,
+    # 1/32). Non-full modes fetch limit * SEARCH_VECTOR_RERANK_FACTOR candidates and re-rank
+    # them exactly on the stored float32 vectors. The mode's index must exist first:
+    # python -m app.jobs.vector_index --storage <mode>  (pgvector >= 0.7)
+    SEARCH_VECTOR_STORAGE: str = os.getenv("SEARCH_VECTOR_STORAGE", "full")
+    SEARCH_VECTOR_RERANK_FACTOR: int = int(os.getenv("SEARCH_VECTOR_RERANK_FACTOR", 4))
+    SEARCH_VECTOR_SUBVECTOR_DIMS: int = int(os.getenv("SEARCH_VECTOR_SUBVECTOR_DIMS", 512))
+    # maintenance_work_mem of HNSW index builds (HNSW migration, app.jobs.vector_index):
+    # much faster when the graph fits, but must stay within the database host's free memory
+    SEARCH_HNSW_BUILD_MAINTENANCE_WORK_MEM: str = os.getenv("SEARCH_HNSW_BUILD_MAINTENANCE_WORK_MEM", "1GB")
+
+    # Semantic search backend: "pgvector" (HNSW above) or "memory" (each office's vectors as
+    # a float32 matrix in this process, exact dot-product scan; offices with more than
+    # SEARCH_MEMORY_INDEX_MAX_NOTES notes stay on pgvector). Loaded offices are kept LRU
+    # within SEARCH_MEMORY_INDEX_MAX_BYTES and pick up other processes' writes every
+    # SEARCH_MEMORY_INDEX_SYNC_SECONDS. SEARCH_MEMORY_INDEX_DIR (optional, local disk):
+    # matrices are snapshotted there and memory-mapped back instead of re-read from Postgres.
+    SEARCH_VECTOR_BACKEND: str = os.getenv("SEARCH_VECTOR_BACKEND", "pgvector")
+    SEARCH_MEMORY_INDEX_MAX_NOTES: int = int(os.getenv("SEARCH_MEMORY_INDEX_MAX_NOTES", 50000))
+    SEARCH_MEMORY_INDEX_MAX_BYTES: int = int(os.getenv("SEARCH_MEMORY_INDEX_MAX_BYTES", 1024 * 1024 * 1024))
+    SEARCH_MEMORY_INDEX_SYNC_SECONDS: float = float(os.getenv("SEARCH_MEMORY_INDEX_SYNC_SECONDS", 5))
+    SEARCH_MEMORY_INDEX_DIR: Optional[str] = os.getenv("SEARCH_MEMORY_INDEX_DIR")
+
+    # Fused search results per office + normalised query, validated against the office's
+    # write generation (never stale). Capped by entries and approximate bytes; 0 disables.
+    SEARCH_RESULT_CACHE_MAX_ENTRIES: int = int(os.getenv("SEARCH_RESULT_CACHE_MAX_ENTRIES", 10000))
+    SEARCH_RESULT_CACHE_MAX_BYTES: int = int(os.getenv("SEARCH_RESULT_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+
+    # Search paging: the first request ranks up to SEARCH_CURSOR_PAGES pages (at most
+    # SEARCH_CURSOR_MAX_RESULTS results) and hands the rest back as a signed cursor
+    # (X-Next-Cursor), valid for SEARCH_CURSOR_TTL_SECONDS; later pages skip the search.
+    SEARCH_CURSOR_PAGES: int = int(os.getenv("SEARCH_CURSOR_PAGES", 5))
+    SEARCH_CURSOR_MAX_RESULTS: int = int(os.getenv("SEARCH_CURSOR_MAX_RESULTS", 100))
+    SEARCH_CURSOR_TTL_SECONDS: int = int(os.getenv("SEARCH_CURSOR_TTL_SECONDS", 900))
+
+    # Search results with view="snippet": window size requested per result is capped here
+    SEARCH_SNIPPET_MAX_CHARS: int = int(os.getenv("SEARCH_SNIPPET_MAX_CHARS", 400))
+
+    # Keyword index layout: "rows" (blind_indexes, one row per note/term) or "array"
+    # (note_term_sets, one row per note with a GIN-indexed bigint[] of truncated hashes).
+    # Both reads and writes follow this; switching back to "rows" needs a reindex.
+    SEARCH_KEYWORD_LAYOUT: str = os.getenv("SEARCH_KEYWORD_LAYOUT", "rows")
+
+    # Password hashing (bcrypt) runs off the event loop on a bounded pool
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", 2))
+    PASSWORD_HASH_QUEUE_LIMIT: int = int(os.getenv("PASSWORD_HASH_QUEUE_LIMIT", 32))
+
+    # Principal Cache (resolved JWT / X-Office-Key -> office_id, role, is_active)
+    PRINCIPAL_CACHE_TTL_SECONDS: float = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", 60))
+    PRINCIPAL_CACHE_MAX_ENTRIES: int = int(os.getenv("PRINCIPAL_CACHE_MAX_ENTRIES", 10000))
     
     # Allow DB_* env vars to override defaults (Cloud Run style)
     POSTGRES_SERVER: str = os.getenv("DB_HOST", "localhost")
@@ -0,0 +1,12 @@
+from typing import Callable, Dict
+
+# Lightweight in-process metrics registry.
+# Components register a callable returning a dict of counters; /metrics reports them all.
+_providers: Dict[str, Callable[[], dict]] = {}
+
+def register(name: str, provider: Callable[[], dict]) -> None:
+    _providers[name] = provider
+
+def snapshot() -> dict:
+    """Collect current counters from every registered component"""
+    return {name: provider() for name, provider in _providers.items()}
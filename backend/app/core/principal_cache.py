@@ -0,0 +1,191 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Set
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app.core import metrics
+from app.core.config import settings
+from app.core.token_epochs import token_epochs
+from app.models import User, ApiKey
+
+
+class Principal:
+    """
+    Resolved caller identity (a user via JWT, or an office via X-Office-Key).
+    Plain object so it can be cached and shared between requests safely.
+    """
+    __slots__ = ("kind", "id", "office_id", "is_active", "role", "email", "full_name", "epoch")
+
+    def __init__(self, kind: str, id, office_id, is_active: bool, role: Optional[str] = None,
+                 email: Optional[str] = None, full_name: Optional[str] = None, epoch: int = 0):
+        self.kind = kind # "user" or "api_key"
+        self.id = id
+        self.office_id = office_id
+        self.is_active = is_active
+        self.role = role
+        self.email = email
+        self.full_name = full_name
+        self.epoch = epoch # User token_epoch when resolved (checked against the epoch table)
+
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        return cls(
+            "user", user.id, user.office_id, bool(user.is_active), user.role, user.email, user.full_name,
+            user.token_epoch or 0,
+        )
+
+    @classmethod
+    def from_api_key(cls, api_key: ApiKey) -> "Principal":
+        return cls("api_key", api_key.id, api_key.office_id, bool(api_key.is_active))
+
+
+class PrincipalCache:
+    """
+    Bounded TTL + LRU cache of resolved principals, keyed by token / API key hash.
+    Entries are indexed by principal id so a deactivated user or revoked key
+    can be dropped immediately, whatever token it was cached under.
+
+    The cache is per process and invalidate_principal() only reaches this process.
+    Cached users are re-checked against the token epoch table on every hit, so a
+    deactivation or role / office change in another worker applies within
+    TOKEN_EPOCH_REFRESH_SECONDS. API keys have no epoch: other workers pick up a
+    revoked key within `ttl_seconds`.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict() # key -> (principal, expires_at)
+        self._by_principal: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: str) -> Optional[Principal]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            principal, expires_at = entry
+            if expires_at <= now:
+                self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return principal
+
+    def set(self, key: str, principal: Principal, max_age: Optional[float] = None) -> None:
+        """Cache principal under key. `max_age` caps the TTL (e.g. remaining JWT lifetime)."""
+        if self.max_entries <= 0:
+            return
+        ttl = self.ttl_seconds if max_age is None else min(self.ttl_seconds, max_age)
+        if ttl <= 0:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (principal, time.monotonic() + ttl)
+            self._by_principal.setdefault(str(principal.id), set()).add(key)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.evictions += 1
+
+    def invalidate_principal(self, principal_id) -> None:
+        """Drop every cached entry for a user or API key id"""
+        with self._lock:
+            keys = self._by_principal.pop(str(principal_id), None)
+            if not keys:
+                return
+            for key in keys:
+                self._entries.pop(key, None)
+            self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_principal.clear()
+
+    def _drop(self, key: str) -> None:
+        # Caller holds the lock
+        principal, _ = self._entries.pop(key)
+        keys = self._by_principal.get(str(principal.id))
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_principal[str(principal.id)]
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = len(self._entries)
+        lookups = self.hits + self.misses
+        return {
+            "size": size,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+principal_cache = PrincipalCache(
+    max_entries=settings.PRINCIPAL_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+)
+metrics.register("principal_cache", principal_cache.stats)
+
+
+# --- Invalidation ---
+# Any change to the cached fields of a User / ApiKey, through any code path using the ORM,
+# drops the cached principal. We invalidate after commit (not on flush) so a concurrent
+# request cannot re-populate the cache from the not-yet-committed row.
+# Note: bulk `update()` statements bypass the ORM and are NOT covered.
+# This only reaches the committing process; other workers rely on the epoch check
+# in deps._resolve_token (users) or the TTL (API keys).
+_WATCHED_FIELDS = {
+    User: ("is_active", "role", "office_id", "email"),
+    ApiKey: ("is_active", "office_id"),
+}
+
+# Fields carried as claims in self-contained JWTs: changing one bumps token_epoch so
+# tokens issued with the old values are rejected (and cached principals re-resolved).
+_CLAIM_FIELDS = ("role", "office_id", "email")
+
+@event.listens_for(Session, "before_flush")
+def _collect_principal_changes(session, flush_context, instances):
+    for obj in list(session.dirty) + list(session.deleted):
+        fields = _WATCHED_FIELDS.get(type(obj))
+        if not fields or obj.id is None:
+            continue
+        state = inspect(obj)
+        if obj in session.deleted or any(state.attrs[f].history.has_changes() for f in fields):
+            session.info.setdefault("principal_invalidations", set()).add(obj.id)
+        if isinstance(obj, User) and obj not in session.deleted:
+            if (any(state.attrs[f].history.has_changes() for f in _CLAIM_FIELDS)
+                    and not state.attrs.token_epoch.history.has_changes()):
+                obj.token_epoch = (obj.token_epoch or 0) + 1
+            if state.attrs.token_epoch.history.has_changes():
+                # Values captured now: the instance is expired by the time after_commit runs
+                session.info.setdefault("token_epoch_updates", {})[obj.id] = (obj.token_epoch, obj.is_active)
+
+@event.listens_for(Session, "after_commit")
+def _apply_principal_invalidations(session):
+    for principal_id in session.info.pop("principal_invalidations", ()):
+        principal_cache.invalidate_principal(principal_id)
+    for user_id, (epoch, is_active) in session.info.pop("token_epoch_updates", {}).items():
+        token_epochs.update_local(user_id, epoch, is_active)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_principal_invalidations(session):
+    session.info.pop("principal_invalidations", None)
+    session.info.pop("token_epoch_updates", None)
@@ -1,29 +1,174 @@
 from datetime import datetime, timedelta
-from typing import Optional, Union, Any
+from typing import Optional, Union, Any, Callable, Iterator, List, Sequence, Tuple
 from jose import jwt
 from passlib.context import CryptContext
-from cryptography.fernet import Fernet
+from cryptography.fernet import Fernet, MultiFernet
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import base64
+import codecs
 import hashlib
+import hmac
 import os
+import threading
+from app.core import compression, metrics
 from app.core.config import settings
 
-# --- Data Encryption (Fernet) ---
+# --- Data Encryption ---
+# Stored format (bytea), versioned envelope:
+#   v1: 0x01 | flags (1) | key_id (4) | nonce (12) | AES-256-GCM ciphertext + tag (16)
+#   flags: compression codec (bits 0-3) and dictionary id (bits 4-7), 0 = plain
+# Legacy Fernet tokens ("gAAAAA..." as ASCII bytes, or str) are still accepted on read,
+# and rows are upgraded lazily whenever they are written again.
 DEV_KEY = os.getenv("ENCRYPTION_KEY", "mNDwH60iN1a1xkB6-oJR4lHJ5-dxc-mQII86XXdQC90=")
-fernet = Fernet(DEV_KEY)
 
-def encrypt_data(data: str) -> str:
-    if not data: return data
-    return fernet.encrypt(data.encode()).decode()
+# Keyring (MultiFernet-style): ENCRYPTION_KEYS="new,old,...". The first key encrypts,
+# every key decrypts, so reads keep working while `app.jobs.reencrypt` rotates rows.
+ENCRYPTION_KEYS = [k.strip() for k in os.getenv("ENCRYPTION_KEYS", "").split(",") if k.strip()] or [DEV_KEY]
+fernet = MultiFernet([Fernet(k) for k in ENCRYPTION_KEYS])
 
-def decrypt_data(data: str) -> str:
-    if not data: return data
-    return fernet.decrypt(data.encode()).decode()
+ENVELOPE_V1 = 0x01
+_FERNET_PREFIX = b"gAAAAA" # base64 of Fernet's 0x80 version byte
+
+def _derive_aes_key(fernet_key: str) -> bytes:
+    # Separate key for AES-GCM, derived from the configured key (never reuse raw key material across algorithms)
+    return HKDF(algorithm=hashes.SHA256(), length=32, salt=None, info=b"dental-notes/aes-gcm/v1").derive(
+        base64.urlsafe_b64decode(fernet_key)
+    )
+
+def _key_id(aes_key: bytes) -> bytes:
+    return hashlib.sha256(aes_key).digest()[:4]
+
+_aes_keys = [_derive_aes_key(k) for k in ENCRYPTION_KEYS]
+AES_KEY_ID = _key_id(_aes_keys[0]) # Primary (write) key
+aesgcm = AESGCM(_aes_keys[0])
+_aesgcm_by_key_id = {_key_id(k): AESGCM(k) for k in _aes_keys}
+
+def encrypt_data(data: str, compress: bool = False) -> bytes:
+    """
+    compress=True compresses before encrypting (for long clinical text, see core.compression).
+    Codec and dictionary id go in the flags byte: codec in bits 0-3, dictionary id in bits 4-7.
+    """
+    if data is None: return None
+    if not data: return b""
+    if settings.ENCRYPTION_FORMAT == "fernet":
+        return fernet.encrypt(data.encode())
+    payload, codec, dictionary_id = data.encode(), compression.CODEC_NONE, 0
+    if compress:
+        payload, codec, dictionary_id = compression.compress(payload, settings.COMPRESSION_MIN_BYTES)
+    nonce = os.urandom(12)
+    header = bytes((ENVELOPE_V1, codec | (dictionary_id << 4))) + AES_KEY_ID
+    # Header is authenticated as associated data, so version/flags/key id cannot be tampered with
+    return header + nonce + aesgcm.encrypt(nonce, payload, header)
+
+def _open_envelope(data: bytes) -> Tuple[bytes, int]:
+    """Authenticated decryption of a v1 envelope: (possibly compressed payload, flags)"""
+    if data[0] != ENVELOPE_V1:
+        raise ValueError(f"Unknown ciphertext version {data[0]}")
+    header, nonce, body = data[:6], data[6:18], data[18:]
+    key = _aesgcm_by_key_id.get(header[2:6])
+    if key is None:
+        raise ValueError("Ciphertext encrypted with an unknown key id")
+    return key.decrypt(nonce, body, header), header[1]
+
+def decrypt_data(data: Union[bytes, str]) -> str:
+    if data is None: return None
+    if not data: return ""
+    if isinstance(data, str):
+        data = data.encode()
+    if data.startswith(_FERNET_PREFIX):
+        return fernet.decrypt(data).decode()
+    payload, flags = _open_envelope(data)
+    return compression.decompress(payload, flags & 0x0F, flags >> 4).decode()
+
+def decrypt_chunks(data: Union[bytes, str], chunk_size: int = 4096) -> Iterator[str]:
+    """
+    decrypt_data() as successive pieces of text. The ciphertext is still authenticated and
+    decrypted as a whole (nothing is released before the tag is verified), but decompression
+    and decoding are lazy: a reader that stops early skips most of a long note's work.
+    """
+    if not data:
+        return
+    if isinstance(data, str):
+        data = data.encode()
+    if data.startswith(_FERNET_PREFIX):
+        yield fernet.decrypt(data).decode()
+        return
+    payload, flags = _open_envelope(data)
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    for chunk in compression.decompress_chunks(payload, flags & 0x0F, flags >> 4, chunk_size):
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    rest = decoder.decode(b"", final=True)
+    if rest:
+        yield rest
+
+def needs_reencryption(data: Union[bytes, str]) -> bool:
+    """True if a stored value is not in the current write format"""
+    if not data:
+        return False
+    if isinstance(data, str):
+        data = data.encode()
+    if settings.ENCRYPTION_FORMAT == "fernet":
+        # Fernet tokens carry no key id: with an old key in the ring, rewrite them all
+        return not data.startswith(_FERNET_PREFIX) or len(ENCRYPTION_KEYS) > 1
+    return data.startswith(_FERNET_PREFIX) or data[2:6] != AES_KEY_ID
+
+# --- Batch Decryption ---
+# AES-GCM / Fernet release the GIL inside OpenSSL, so large batches spread across threads
+# keep the event loop free. Small batches stay inline: pool hand-off costs more than it saves.
+_crypto_executor = ThreadPoolExecutor(max_workers=settings.CRYPTO_WORKERS, thread_name_prefix="crypto")
+
+def decrypt_many(values: Sequence[Union[bytes, str]]) -> List[str]:
+    return [decrypt_data(v) for v in values]
+
+async def decrypt_batch(values: Sequence[Union[bytes, str]]) -> List[str]:
+    """Decrypt many values, preserving order. Inline below DECRYPT_BATCH_INLINE_MAX_BYTES."""
+    values = list(values)
+    return await run_crypto_batch(decrypt_many, values, sum(len(v) for v in values if v))
+
+async def run_crypto_batch(fn: Callable[[list], list], items: list, total_bytes: int) -> list:
+    """
+    fn(items) (a list -> list function doing decryption work, order-preserving), split
+    across the crypto pool when total_bytes of ciphertext exceed DECRYPT_BATCH_INLINE_MAX_BYTES
+    """
+    if total_bytes <= settings.DECRYPT_BATCH_INLINE_MAX_BYTES or len(items) < 2:
+        return fn(items)
+
+    loop = asyncio.get_running_loop()
+    chunk_size = -(-len(items) // settings.CRYPTO_WORKERS) # ceil division
+    chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+    results = await asyncio.gather(*(loop.run_in_executor(_crypto_executor, fn, c) for c in chunks))
+    return [out for chunk in results for out in chunk]
 
 def get_blind_index(data: str) -> str:
     """Deterministic hash for searching"""
     if not data: return None
     return hashlib.sha256(data.lower().encode()).hexdigest()
 
+# Keyed hash for content-addressed caches (embeddings): equal inputs share an entry, but a
+# stored key cannot be checked against guessed plaintext without the encryption key.
+# Derived from the primary key, so a key rotation simply starts the caches afresh.
+_cache_hmac_key = HKDF(algorithm=hashes.SHA256(), length=32, salt=None, info=b"dental-notes/cache-key/v1").derive(
+    base64.urlsafe_b64decode(ENCRYPTION_KEYS[0])
+)
+
+def get_cache_key(data: str) -> bytes:
+    return hmac.new(_cache_hmac_key, data.encode(), hashlib.sha256).digest()
+
+# MAC for opaque tokens handed to clients (search cursors). Derived from SECRET_KEY like
+# JWTs: rotating it invalidates outstanding tokens, which only costs a re-run of the search.
+_token_mac_key = HKDF(algorithm=hashes.SHA256(), length=32, salt=None, info=b"dental-notes/token-mac/v1").derive(
+    settings.SECRET_KEY.encode()
+)
+
+def get_token_mac(data: bytes) -> bytes:
+    return hmac.new(_token_mac_key, data, hashlib.sha256).digest()[:16]
+
 # --- Password & API Key Hashing ---
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -33,6 +178,51 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+class HashingPoolBusy(Exception):
+    """Raised when the password hashing queue is full (caller should answer 503)"""
+
+class PasswordHashPool:
+    """
+    Runs bcrypt on a small dedicated thread pool so it never blocks the event loop
+    (bcrypt releases the GIL). At most `max_workers + max_queue` calls may be in
+    flight; beyond that we shed load instead of queueing unboundedly.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int):
+        self.max_in_flight = max_workers + max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pwhash")
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.rejected = 0
+
+    async def run(self, fn, *args):
+        with self._lock:
+            if self._in_flight >= self.max_in_flight:
+                self.rejected += 1
+                raise HashingPoolBusy()
+            self._in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, fn, *args)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    def stats(self) -> dict:
+        return {"in_flight": self._in_flight, "max_in_flight": self.max_in_flight, "rejected": self.rejected}
+
+password_hash_pool = PasswordHashPool(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_QUEUE_LIMIT,
+)
+metrics.register("password_hash_pool", password_hash_pool.stats)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await password_hash_pool.run(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    return await password_hash_pool.run(get_password_hash, password)
+
 def get_api_key_hash(api_key: str) -> str:
     """Hash API key for storage/comparison (using SHA256)"""
     return hashlib.sha256(api_key.encode()).hexdigest()
@@ -40,13 +230,26 @@ def get_api_key_hash(api_key: str) -> str:
 # --- JWT Token ---
 ALGORITHM = "HS256"
 
-def create_access_token(subject: Union[str, Any], expires_delta: timedelta = None) -> str:
+def create_access_token(subject: Union[str, Any], expires_delta: timedelta = None, claims: Optional[dict] = None) -> str:
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     
     to_encode = {"exp": expire, "sub": str(subject)}
+    if claims:
+        to_encode.update(claims)
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+
+def user_token_claims(user) -> Optional[dict]:
+    """Extra claims for self-contained tokens (JWT_SELF_CONTAINED_CLAIMS), else None"""
+    if not settings.JWT_SELF_CONTAINED_CLAIMS:
+        return None
+    return {
+        "office_id": str(user.office_id),
+        "role": user.role,
+        "email": user.email,
+        "epoch": user.token_epoch or 0,
+    }
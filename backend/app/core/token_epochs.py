@@ -0,0 +1,67 @@
+import asyncio
+import time
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core import metrics
+from app.core.config import settings
+from app.models import User
+
+
+class TokenEpochTable:
+    """
+    In-memory revocation table for self-contained JWTs.
+    Only "notable" users are held (token_epoch > 0 or inactive), so the refresh query
+    stays small. A token is rejected if its `epoch` claim is older than the user's
+    current epoch, or the user is inactive. Refreshed at most every `refresh_seconds`,
+    which bounds how long a deactivation takes to reach other workers.
+    """
+
+    def __init__(self, refresh_seconds: float):
+        self.refresh_seconds = refresh_seconds
+        self._epochs: Dict[str, Tuple[int, bool]] = {} # user_id -> (epoch, is_active)
+        self._loaded_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+        self.refreshes = 0
+
+    def is_stale(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at >= self.refresh_seconds
+
+    async def ensure_fresh(self, db: AsyncSession) -> None:
+        if not self.is_stale():
+            return
+        async with self._lock:
+            if not self.is_stale(): # Another request refreshed while we waited
+                return
+            result = await db.execute(
+                select(User.id, User.token_epoch, User.is_active)
+                .filter(or_(User.token_epoch > 0, User.is_active.isnot(True)))
+            )
+            self._epochs = {str(uid): (epoch or 0, bool(active)) for uid, epoch, active in result.all()}
+            self._loaded_at = time.monotonic()
+            self.refreshes += 1
+
+    def is_revoked(self, user_id: str, token_epoch: int) -> bool:
+        entry = self._epochs.get(str(user_id))
+        if entry is None:
+            return False
+        epoch, is_active = entry
+        return not is_active or token_epoch < epoch
+
+    def update_local(self, user_id, epoch: int, is_active: bool) -> None:
+        """Apply a committed change in this process immediately (others catch up on refresh)"""
+        self._epochs[str(user_id)] = (epoch or 0, bool(is_active))
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._epochs),
+            "refreshes": self.refreshes,
+            "age_seconds": round(time.monotonic() - self._loaded_at, 1) if self._loaded_at else None,
+        }
+
+
+token_epochs = TokenEpochTable(refresh_seconds=settings.TOKEN_EPOCH_REFRESH_SECONDS)
+metrics.register("token_epochs", token_epochs.stats)
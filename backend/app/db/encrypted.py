@@ -0,0 +1,101 @@
+from typing import Iterable
+
+from sqlalchemy import LargeBinary
+from sqlalchemy.types import TypeDecorator
+
+from app.core.security import encrypt_data, decrypt_data, decrypt_batch
+
+
+class Ciphertext(bytes):
+    """A value exactly as stored in an encrypted column. Copied as-is, never re-encrypted."""
+
+
+class EncryptedText(TypeDecorator):
+    """
+    str value encrypted at rest, stored as bytea (see security.encrypt_data for the format).
+    Binding a plain str encrypts it; binding bytes (Ciphertext) stores them unchanged.
+    Loaded values come back as Ciphertext and are only decrypted by EncryptedAttribute.
+    """
+    impl = LargeBinary
+    cache_ok = True
+
+    def __init__(self, compress: bool = False):
+        super().__init__()
+        self.compress = compress # Compress before encrypting (long, repetitive text)
+
+    def process_bind_param(self, value, dialect):
+        if value is None or isinstance(value, bytes): # Ciphertext / already encrypted
+            return value
+        return encrypt_data(value, compress=self.compress)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return Ciphertext(value)
+
+
+class EncryptedAttribute:
+    """
+    Plaintext view of a mapped EncryptedText attribute.
+
+        _content = Column("content", EncryptedText, nullable=False)
+        content = EncryptedAttribute("_content")
+
+    Reading decrypts lazily and caches the plaintext on the instance (keyed on the stored
+    value, so a refresh from the DB is picked up). Assigning plaintext sets the mapped
+    attribute; encryption happens when the row is flushed. Nothing is decrypted unless read,
+    and plaintext is never written back to the mapped attribute by a read.
+    """
+
+    def __init__(self, mapped_attr: str):
+        self.mapped_attr = mapped_attr
+
+    def __set_name__(self, owner, name):
+        self.cache_key = f"_{name}_plaintext"
+
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return self
+        stored = getattr(obj, self.mapped_attr)
+        if not isinstance(stored, bytes):
+            return stored # None, or plaintext pending flush
+        cached = obj.__dict__.get(self.cache_key)
+        if cached is not None and cached[0] is stored:
+            return cached[1]
+        plaintext = decrypt_data(stored)
+        obj.__dict__[self.cache_key] = (stored, plaintext)
+        return plaintext
+
+    def __set__(self, obj, value):
+        setattr(obj, self.mapped_attr, value)
+
+    def ciphertext(self, obj):
+        """Stored value without decrypting (Ciphertext once loaded, plaintext if pending)"""
+        return getattr(obj, self.mapped_attr)
+
+    def is_decrypted(self, obj) -> bool:
+        stored = getattr(obj, self.mapped_attr)
+        cached = obj.__dict__.get(self.cache_key)
+        return not isinstance(stored, bytes) or (cached is not None and cached[0] is stored)
+
+    def prime(self, obj, plaintext: str) -> None:
+        stored = getattr(obj, self.mapped_attr)
+        obj.__dict__[self.cache_key] = (stored, plaintext)
+
+
+async def decrypt_attributes(objs: Iterable, *names: str) -> None:
+    """
+    Decrypt the given encrypted attributes of many instances in one decrypt_batch call
+    (thread pool for large batches), so serialization afterwards does no crypto work.
+    """
+    pending = []
+    for obj in objs:
+        for name in names:
+            attr = getattr(type(obj), name)
+            if not attr.is_decrypted(obj):
+                pending.append((obj, attr))
+    if not pending:
+        return
+    plaintexts = await decrypt_batch([attr.ciphertext(obj) for obj, attr in pending])
+    for (obj, attr), plaintext in zip(pending, plaintexts):
+        attr.prime(obj, plaintext)
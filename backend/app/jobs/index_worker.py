@@ -0,0 +1,166 @@
+"""
+Search indexing worker: drains the search_index_jobs outbox.
+
+Note writes only enqueue a job (same transaction as the note), so a note is never left
+unsearchable by a crash between two commits. Each worker claims a batch of jobs with
+FOR UPDATE SKIP LOCKED (any number of workers / app processes can run side by side),
+embeds the whole batch in one provider call, writes vectors and term hashes in bulk, and
+deletes the jobs in the same transaction. Two jobs for the same note (created, then
+edited) can be claimed by different workers: per-note advisory locks
+(SearchService.lock_notes) make the second wait and then read the note afresh. A failed batch is rolled back and its jobs are
+retried one at a time with exponential backoff, so a single bad note cannot keep failing
+its neighbours; after SEARCH_INDEX_MAX_ATTEMPTS a job is left in place for inspection.
+
+Runs inside the app (SEARCH_INDEX_WORKER_ENABLED) or standalone:
+    python -m app.jobs.index_worker
+    python -m app.jobs.index_worker --once   # drain the queue and exit
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from sqlalchemy import delete, func, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core import metrics
+from app.core.config import settings
+from app.db.encrypted import decrypt_attributes
+from app.db.session import SessionLocal
+from app.models import Note, SearchIndexJob
+from app.services.embeddings import close_embedding_provider
+from app.services.search_service import SearchService
+
+MAX_BACKOFF_SECONDS = 600
+
+
+class IndexWorker:
+    def __init__(self, batch_size: int = None, poll_seconds: float = None, max_attempts: int = None):
+        self.batch_size = batch_size or settings.SEARCH_INDEX_BATCH_SIZE
+        self.poll_seconds = poll_seconds or settings.SEARCH_INDEX_POLL_SECONDS
+        self.max_attempts = max_attempts or settings.SEARCH_INDEX_MAX_ATTEMPTS
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+        self.batches = 0
+        self.notes_indexed = 0
+        self.failures = 0
+        self.last_batch_seconds = 0.0
+
+    def notify(self) -> None:
+        """Wake the worker now instead of at the next poll (called after a note commit)"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def stop(self) -> None:
+        self._stopping = True
+        self.notify()
+
+    async def _claim(self, db: AsyncSession, retries: bool) -> List[SearchIndexJob]:
+        # Fresh jobs are batched; retried jobs are taken one at a time
+        stmt = (
+            select(SearchIndexJob)
+            .filter(SearchIndexJob.available_at <= func.now(), SearchIndexJob.attempts < self.max_attempts)
+            .filter(SearchIndexJob.attempts > 0 if retries else SearchIndexJob.attempts == 0)
+            .order_by(SearchIndexJob.id)
+            .limit(1 if retries else self.batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        result = await db.execute(stmt)
+        return result.scalars().all()
+
+    async def run_once(self) -> int:
+        """Claim and process one batch; returns the number of jobs handled (0 = queue empty)"""
+        async with SessionLocal() as db:
+            jobs = await self._claim(db, retries=False) or await self._claim(db, retries=True)
+            if not jobs:
+                await db.rollback()
+                return 0
+            job_ids = [job.id for job in jobs]
+            attempts = {job.id: job.attempts for job in jobs}
+            started = time.monotonic()
+            try:
+                # 1. Current content (decrypted in bulk); deleted notes just drop their jobs.
+                # Read under the notes' locks: another worker (or reindex) holding a job for the
+                # same note finishes first, and this batch then diffs against its result.
+                note_ids = list({job.note_id for job in jobs})
+                service = SearchService(db)
+                await service.lock_notes(note_ids)
+                result = await db.execute(select(Note).filter(Note.id.in_(note_ids)))
+                notes = result.scalars().all()
+                await decrypt_attributes(notes, "content")
+
+                # 2. One embedding call + bulk writes, then remove the jobs, in one transaction
+                await service.index_notes([(n.id, n.content, n.office_id) for n in notes], strict=True)
+                await db.execute(delete(SearchIndexJob).where(SearchIndexJob.id.in_(job_ids)))
+                await db.commit()
+                service.after_commit()
+            except Exception as e:
+                await db.rollback()
+                self.failures += 1
+                print(f"Search indexing failed for {len(job_ids)} job(s): {e}")
+                await self._reschedule(db, attempts, repr(e))
+                return len(job_ids)
+
+            self.batches += 1
+            self.notes_indexed += len(notes)
+            self.last_batch_seconds = round(time.monotonic() - started, 3)
+            return len(job_ids)
+
+    async def _reschedule(self, db: AsyncSession, attempts: dict, error: str) -> None:
+        now = datetime.now(timezone.utc)
+        for job_id, n in attempts.items():
+            delay = min(MAX_BACKOFF_SECONDS, 5 * 2 ** n)
+            await db.execute(
+                update(SearchIndexJob)
+                .where(SearchIndexJob.id == job_id)
+                .values(attempts=n + 1, last_error=error[:1000], available_at=now + timedelta(seconds=delay))
+            )
+        await db.commit()
+
+    async def run(self, once: bool = False) -> None:
+        self._wakeup = asyncio.Event()
+        while not self._stopping:
+            try:
+                handled = await self.run_once()
+            except Exception as e:
+                # DB unavailable etc.: keep the loop alive
+                print(f"Search index worker error: {e}")
+                handled = 0
+            if handled:
+                continue
+            if once:
+                return
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "notes_indexed": self.notes_indexed,
+            "failures": self.failures,
+            "last_batch_seconds": self.last_batch_seconds,
+        }
+
+
+index_worker = IndexWorker()
+metrics.register("search_index_worker", index_worker.stats)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--once", action="store_true", help="drain the queue and exit")
+    args = parser.parse_args()
+
+    async def main():
+        try:
+            await IndexWorker(batch_size=args.batch_size).run(once=args.once)
+        finally:
+            await close_embedding_provider()
+
+    asyncio.run(main())
@@ -0,0 +1,76 @@
+"""
+Purge embedding_cache rows that no note uses any more.
+
+Every edit of a note embeds its new text, so without this the table keeps a vector for
+every version of every note ever written (and for content of deleted notes). A row is
+removed once no note_embeddings.content_key refers to it and it is older than
+--retention-days, which leaves recent entries alone: those a reindex has prefetched but
+not written yet, and the previous version of a just-edited note.
+
+    python -m app.jobs.purge_embedding_cache --dry-run
+    python -m app.jobs.purge_embedding_cache            # e.g. daily, from cron
+
+The table is walked in key order in small batches, each deleted in its own transaction.
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, exists, func
+from sqlalchemy.future import select
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models import EmbeddingCacheEntry, NoteEmbedding
+
+
+def unused_entries(keys, cutoff: datetime):
+    """Condition: one of `keys`, created before cutoff, referenced by no note"""
+    return (
+        EmbeddingCacheEntry.key.in_(keys),
+        EmbeddingCacheEntry.created_at < cutoff,
+        ~exists().where(NoteEmbedding.content_key == EmbeddingCacheEntry.key),
+    )
+
+
+async def run(args):
+    cutoff = datetime.now(timezone.utc) - timedelta(days=args.retention_days)
+    started = time.monotonic()
+    scanned = purged = 0
+    last_key = None
+    async with SessionLocal() as db:
+        while True:
+            query = select(EmbeddingCacheEntry.key).order_by(EmbeddingCacheEntry.key).limit(args.batch_size)
+            if last_key is not None:
+                query = query.where(EmbeddingCacheEntry.key > last_key)
+            keys = (await db.execute(query)).scalars().all()
+            if not keys:
+                break
+            last_key = keys[-1]
+            scanned += len(keys)
+
+            if args.dry_run:
+                purged += (await db.execute(
+                    select(func.count()).select_from(EmbeddingCacheEntry).where(*unused_entries(keys, cutoff))
+                )).scalar()
+                await db.rollback() # Don't hold one snapshot open for the whole scan
+            else:
+                result = await db.execute(
+                    delete(EmbeddingCacheEntry).where(*unused_entries(keys, cutoff))
+                    .execution_options(synchronize_session=False)
+                )
+                purged += result.rowcount
+                await db.commit()
+
+    print(f"Scanned {scanned} embedding_cache rows, {'would purge' if args.dry_run else 'purged'} {purged} "
+          f"(unused, created before {cutoff:%Y-%m-%d %H:%M} UTC) in {time.monotonic() - started:.0f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--retention-days", type=float, default=settings.EMBEDDING_CACHE_RETENTION_DAYS,
+                        help="keep unused rows younger than this")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--dry-run", action="store_true", help="count the rows that would be purged")
+    asyncio.run(run(parser.parse_args()))
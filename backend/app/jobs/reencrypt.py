@@ -0,0 +1,172 @@
+"""
+Streaming, resumable re-encryption of encrypted columns (key rotation / format upgrade).
+
+Rotation procedure:
+  1. Deploy with ENCRYPTION_KEYS="<new>,<old>" (new key writes, both keys read).
+  2. Run this job until every table reports done:
+         python -m app.jobs.reencrypt --job-name rotate-2026-10 --rows-per-sec 2000
+  3. Drop the old key from ENCRYPTION_KEYS.
+
+Rows are walked in id order (keyset pagination) in small batches, each committed in its
+own short transaction together with the checkpoint, so the job can be stopped and resumed
+at any point without holding long locks. An UPDATE only applies if the row still holds the
+ciphertext we read, so a concurrent edit by the app (already written with the new key) wins.
+"""
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List, Tuple
+
+from sqlalchemy import and_, bindparam, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core.security import decrypt_data, encrypt_data, needs_reencryption
+from app.db.session import SessionLocal
+from app.models import JobCheckpoint, Note, NoteHistory, Patient
+
+# table name -> (model, encrypted column names)
+ENCRYPTED_TABLES = {
+    "patients": (Patient, ["first_name", "last_name"]),
+    "notes": (Note, ["content"]),
+    "note_history": (NoteHistory, ["previous_content"]),
+}
+
+
+def _reencrypt_rows(rows: List[Tuple], columns: List, dry_run: bool) -> List[Dict]:
+    """CPU part (runs on worker threads): returns UPDATE params for rows that need rewriting"""
+    params = []
+    for row in rows:
+        row_id, values = row[0], row[1:]
+        if not any(needs_reencryption(v) for v in values):
+            continue
+        if dry_run:
+            params.append({"b_id": row_id})
+            continue
+        param = {"b_id": row_id}
+        for column, value in zip(columns, values):
+            param[f"b_old_{column.name}"] = value
+            if needs_reencryption(value):
+                compress = getattr(column.type, "compress", False)
+                param[f"b_new_{column.name}"] = encrypt_data(decrypt_data(value), compress=compress)
+            else:
+                param[f"b_new_{column.name}"] = value
+        params.append(param)
+    return params
+
+
+async def _get_checkpoint(db: AsyncSession, job_name: str, table_name: str) -> JobCheckpoint:
+    result = await db.execute(select(JobCheckpoint).filter(
+        JobCheckpoint.job_name == job_name, JobCheckpoint.table_name == table_name
+    ))
+    checkpoint = result.scalars().first()
+    if not checkpoint:
+        checkpoint = JobCheckpoint(job_name=job_name, table_name=table_name, rows_processed=0, rows_rewritten=0)
+        db.add(checkpoint)
+        await db.commit()
+    return checkpoint
+
+
+async def reencrypt_table(table_name: str, args, executor: ThreadPoolExecutor) -> None:
+    model, column_names = ENCRYPTED_TABLES[table_name]
+    table = model.__table__
+    columns = [table.c[name] for name in column_names]
+
+    new_values = {c.name: bindparam(f"b_new_{c.name}") for c in columns}
+    if "updated_at" in table.c:
+        new_values["updated_at"] = table.c.updated_at # Re-encryption is not an edit: suppress onupdate
+    stmt = (
+        update(table)
+        .where(and_(table.c.id == bindparam("b_id"), *[c == bindparam(f"b_old_{c.name}") for c in columns]))
+        .values(new_values)
+    )
+
+    async with SessionLocal() as db:
+        if args.dry_run:
+            # Never persisted: a dry run must not move the real checkpoint
+            checkpoint = JobCheckpoint(job_name=args.job_name, table_name=table_name, rows_processed=0, rows_rewritten=0)
+        else:
+            checkpoint = await _get_checkpoint(db, args.job_name, table_name)
+        if checkpoint.completed_at and not args.restart:
+            print(f"[{table_name}] already completed at {checkpoint.completed_at}, skipping")
+            return
+        if args.restart and not args.dry_run:
+            checkpoint.last_id, checkpoint.rows_processed, checkpoint.rows_rewritten = None, 0, 0
+            checkpoint.completed_at = None
+            await db.commit()
+
+        # Planner estimate is free and good enough for progress reporting
+        estimate = (await db.execute(
+            text("SELECT reltuples::bigint FROM pg_class WHERE relname = :t"), {"t": table_name}
+        )).scalar() or 0
+        started = time.monotonic()
+        processed_this_run = 0
+        loop = asyncio.get_running_loop()
+
+        while True:
+            # 1. Next page (keyset)
+            query = select(table.c.id, *columns).order_by(table.c.id).limit(args.batch_size)
+            if checkpoint.last_id is not None:
+                query = query.where(table.c.id > checkpoint.last_id)
+            rows = (await db.execute(query)).all()
+            if not rows:
+                break
+
+            # 2. Decrypt / re-encrypt on worker threads
+            chunk = -(-len(rows) // args.workers)
+            results = await asyncio.gather(*(
+                loop.run_in_executor(executor, _reencrypt_rows, rows[i:i + chunk], columns, args.dry_run)
+                for i in range(0, len(rows), chunk)
+            ))
+            params = [p for part in results for p in part]
+
+            # 3. Write + checkpoint in one short transaction
+            if params and not args.dry_run:
+                await db.execute(stmt, params)
+            checkpoint.last_id = rows[-1][0]
+            checkpoint.rows_processed += len(rows)
+            checkpoint.rows_rewritten += len(params)
+            if args.dry_run:
+                await db.rollback() # Don't hold one snapshot open for the whole scan
+            else:
+                await db.commit()
+
+            # 4. Progress + throttle
+            processed_this_run += len(rows)
+            elapsed = time.monotonic() - started
+            rate = processed_this_run / elapsed if elapsed else 0.0
+            pct = f"{100 * checkpoint.rows_processed / estimate:.1f}%" if estimate > 0 else "?"
+            print(f"[{table_name}] processed={checkpoint.rows_processed} ({pct}) "
+                  f"{'would rewrite' if args.dry_run else 'rewritten'}={checkpoint.rows_rewritten} rate={rate:.0f} rows/s")
+            if args.rows_per_sec:
+                ahead = processed_this_run / args.rows_per_sec - elapsed
+                if ahead > 0:
+                    await asyncio.sleep(ahead)
+
+        if not args.dry_run:
+            checkpoint.completed_at = datetime.now(timezone.utc)
+            await db.commit()
+        print(f"[{table_name}] done: processed={checkpoint.rows_processed} rewritten={checkpoint.rows_rewritten}")
+
+
+async def main(args) -> None:
+    executor = ThreadPoolExecutor(max_workers=args.workers, thread_name_prefix="reencrypt")
+    try:
+        for table_name in args.tables.split(","):
+            await reencrypt_table(table_name.strip(), args, executor)
+    finally:
+        executor.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--job-name", required=True, help="checkpoint key; reuse it to resume")
+    parser.add_argument("--tables", default=",".join(ENCRYPTED_TABLES))
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=4, help="decrypt/encrypt threads")
+    parser.add_argument("--rows-per-sec", type=float, default=0, help="throttle (0 = unthrottled)")
+    parser.add_argument("--dry-run", action="store_true", help="count rows needing rewrite, write nothing")
+    parser.add_argument("--restart", action="store_true", help="ignore the saved checkpoint")
+    asyncio.run(main(parser.parse_args()))
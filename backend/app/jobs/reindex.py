@@ -0,0 +1,293 @@
+"""
+Bulk rebuild of the search indexes (note_embeddings, keyword index, term statistics).
+
+Use after changing the tokenizer or embedding model, or when onboarding an office:
+    python -m app.jobs.reindex --job-name reindex-2026-03 --office <uuid>
+    python -m app.jobs.reindex --job-name model-v2 --shadow          # rebuild everything, swap at the end
+    python -m app.jobs.reindex --job-name check --dry-run            # count work, write nothing
+
+Notes are streamed per office through a server-side cursor, decrypted on the crypto
+thread pool, embedded through the embedding cache with up to --embed-concurrency
+provider calls in flight, and written in bulk by SearchService.index_notes. Progress is
+checkpointed per office after every batch (job_checkpoints), so the job resumes where it
+stopped when run again with the same --job-name.
+
+In place (default) the usual diffs apply: unchanged notes cost a read and nothing else.
+With --shadow the tables are built from empty in the search_build schema (same table,
+constraint and index names), then swapped with the live ones in one short transaction;
+notes edited during the build are queued to the index worker as part of the swap.
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from sqlalchemy import func, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core.config import settings
+from app.core.security import decrypt_batch
+from app.db.session import SessionLocal, engine
+from app.jobs.reencrypt import _get_checkpoint
+from app.models import JobCheckpoint, Note
+from app.services.embedding_cache import prefetch_note_embeddings
+from app.services.embeddings import close_embedding_provider, get_embedding_provider
+from app.services.search_service import SearchService
+
+BUILD_SCHEMA = "search_build"
+OLD_SCHEMA = "search_old" # Where the removed --keep-old option left the replaced tables
+
+
+def search_tables(parts: List[str]) -> List[str]:
+    tables = []
+    if "vectors" in parts:
+        tables.append("note_embeddings")
+    if "keywords" in parts:
+        keyword_table = "note_term_sets" if settings.SEARCH_KEYWORD_LAYOUT == "array" else "blind_indexes"
+        tables += [keyword_table, "search_term_stats", "search_office_stats"]
+    return tables
+
+
+# --- Shadow tables ---
+
+async def prepare_shadow(db: AsyncSession, tables: List[str]) -> None:
+    """Empty copies of the live tables in BUILD_SCHEMA, with the same constraint names"""
+    await db.execute(text(f"DROP SCHEMA IF EXISTS {BUILD_SCHEMA} CASCADE"))
+    await db.execute(text(f"CREATE SCHEMA {BUILD_SCHEMA}"))
+    for table in tables:
+        await db.execute(text(
+            f"CREATE TABLE {BUILD_SCHEMA}.{table} (LIKE public.{table} INCLUDING DEFAULTS INCLUDING IDENTITY)"
+        ))
+        # PK / unique constraints are needed during the load (ON CONFLICT), FKs keep it consistent
+        result = await db.execute(text(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = CAST(:t AS regclass) AND contype IN ('p', 'u', 'f', 'c')"
+        ), {"t": f"public.{table}"})
+        for name, definition in result.all():
+            await db.execute(text(f'ALTER TABLE {BUILD_SCHEMA}.{table} ADD CONSTRAINT "{name}" {definition}'))
+    await db.commit()
+
+
+async def build_shadow_indexes(db: AsyncSession, tables: List[str]) -> None:
+    """Secondary indexes, built once after the load (faster than maintaining them per row)"""
+    for table in tables:
+        result = await db.execute(text(
+            "SELECT i.indexname, i.indexdef FROM pg_indexes i "
+            "WHERE i.schemaname = 'public' AND i.tablename = :t "
+            "AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conname = i.indexname "
+            "                AND c.conrelid = CAST(:qualified AS regclass))"
+        ), {"t": table, "qualified": f"public.{table}"})
+        for name, definition in result.all():
+            definition = definition.replace(f" ON public.{table} ", f" ON {BUILD_SCHEMA}.{table} ", 1)
+            print(f"[shadow] building index {name}")
+            await db.execute(text(definition))
+        await db.execute(text(f"ANALYZE {BUILD_SCHEMA}.{table}"))
+        await db.commit()
+
+
+async def swap_shadow(db: AsyncSession, tables: List[str], started_at: datetime) -> None:
+    """
+    Atomically replace the live tables with the shadow ones.
+    The replaced tables are dropped in the same transaction: they hold note-derived data
+    (vectors, term hashes) that nothing would ever clean up.
+    """
+    qualified = ", ".join(f"public.{t}" for t in tables)
+    await db.execute(text(f"LOCK TABLE {qualified} IN ACCESS EXCLUSIVE MODE"))
+    # Left behind by earlier builds run with --keep-old
+    await db.execute(text(f"DROP SCHEMA IF EXISTS {OLD_SCHEMA} CASCADE"))
+    for table in tables:
+        # Dropped first: the shadow table's index names are only free once it is gone
+        await db.execute(text(f"DROP TABLE public.{table}"))
+        await db.execute(text(f"ALTER TABLE {BUILD_SCHEMA}.{table} SET SCHEMA public"))
+    # Edits made while building went to the old tables: have the worker redo those notes
+    queued = await db.execute(text(
+        "INSERT INTO search_index_jobs (note_id) SELECT id FROM notes WHERE updated_at >= :started"
+    ), {"started": started_at})
+    # Every office's results may change with the new tables: invalidate cached searches
+    await db.execute(text("UPDATE search_generations SET generation = generation + 1"))
+    await db.commit()
+    print(f"[shadow] swapped {', '.join(tables)}; {queued.rowcount} notes edited during the build queued for reindexing")
+    await db.execute(text(f"DROP SCHEMA {BUILD_SCHEMA} CASCADE"))
+    await db.commit()
+
+
+async def shadow_exists(db: AsyncSession) -> bool:
+    result = await db.execute(text("SELECT 1 FROM pg_namespace WHERE nspname = :s"), {"s": BUILD_SCHEMA})
+    return result.scalar() is not None
+
+
+# --- Reindexing ---
+
+async def current_contents(db: AsyncSession, service: SearchService, rows, contents: List[str]) -> List[tuple]:
+    """
+    (note_id, content) to index for a streamed batch, read again under the notes' locks
+    (SearchService.lock_notes): a note rewritten since the stream read it is decrypted
+    afresh, so an older version never overwrites what the index worker wrote meanwhile.
+    Deleted notes are dropped.
+    """
+    note_ids = [row[0] for row in rows]
+    await service.lock_notes(note_ids)
+    result = await db.execute(select(Note.id, Note._content).filter(Note.id.in_(note_ids)))
+    stored = dict(result.all())
+    changed = [nid for nid, ciphertext in zip(note_ids, (row[1] for row in rows)) if nid in stored and stored[nid] != ciphertext]
+    fresh = dict(zip(changed, await decrypt_batch([stored[nid] for nid in changed]))) if changed else {}
+    return [(nid, fresh.get(nid, content)) for nid, content in zip(note_ids, contents) if nid in stored]
+
+class Progress:
+    def __init__(self):
+        self.started = time.monotonic()
+        self.notes = 0
+        self.embedded = 0
+        self.cache_hits = 0
+        self.terms = 0
+
+    def line(self) -> str:
+        elapsed = time.monotonic() - self.started
+        rate = self.notes / elapsed if elapsed else 0.0
+        return (f"notes={self.notes} rate={rate:.0f} notes/s embedded={self.embedded} "
+                f"cache_hits={self.cache_hits} terms={self.terms} elapsed={elapsed:.0f}s")
+
+
+async def _begin(db: AsyncSession, args) -> None:
+    # Shadow build: unqualified search tables resolve to BUILD_SCHEMA, everything else to public
+    if args.shadow:
+        await db.execute(text(f"SET LOCAL search_path TO {BUILD_SCHEMA}, public"))
+
+
+async def reindex_office(office_id: Optional[str], total: int, args, parts: List[str], progress: Progress) -> None:
+    label = str(office_id) if office_id else "none"
+    embedder = get_embedding_provider() if "vectors" in parts else None
+
+    async with SessionLocal() as db:
+        service = SearchService(db, embedder=embedder)
+        if args.dry_run:
+            # Never persisted: a dry run must not move the real checkpoint
+            checkpoint = JobCheckpoint(job_name=args.job_name, table_name=f"notes/{label}", rows_processed=0, rows_rewritten=0)
+        else:
+            checkpoint = await _get_checkpoint(db, args.job_name, f"notes/{label}")
+        if checkpoint.completed_at and not args.restart:
+            print(f"[{label}] already completed at {checkpoint.completed_at}, skipping")
+            return
+        if args.restart and not args.dry_run:
+            checkpoint.last_id, checkpoint.rows_processed, checkpoint.rows_rewritten = None, 0, 0
+            checkpoint.completed_at = None
+        await db.commit() # Don't carry the checkpoint read into the first window's decryption
+
+        query = select(Note.id, Note._content).order_by(Note.id)
+        query = query.where(Note.office_id == office_id) if office_id else query.where(Note.office_id.is_(None))
+        if checkpoint.last_id is not None:
+            query = query.where(Note.id > checkpoint.last_id)
+        processed_this_run = 0
+        started = time.monotonic()
+
+        async def process(window):
+            nonlocal processed_this_run
+            # 1. Decrypt every batch of the window on the crypto threads
+            contents = await asyncio.gather(*(decrypt_batch([row[1] for row in rows]) for rows in window))
+
+            # 2. Embed cache misses for the whole window, several provider calls in flight
+            #    (committed by the prefetch itself: no transaction is open during the calls)
+            if embedder is not None:
+                hits, embedded = await prefetch_note_embeddings(
+                    db, embedder, [c for batch in contents for c in batch],
+                    concurrency=args.embed_concurrency, batch_size=settings.EMBEDDING_BATCH_SIZE, dry_run=args.dry_run
+                )
+                progress.cache_hits += hits
+                progress.embedded += embedded
+
+            # 3. Bulk writes + checkpoint, one short transaction per batch
+            for rows, batch in zip(window, contents):
+                if args.dry_run:
+                    progress.terms += sum(len(service._term_frequencies(c)) for c in batch)
+                else:
+                    await _begin(db, args)
+                    current = await current_contents(db, service, rows, batch)
+                    await service.index_notes(
+                        [(nid, content, office_id) for nid, content in current], strict=True,
+                        with_vectors="vectors" in parts, with_keywords="keywords" in parts
+                    )
+                checkpoint.last_id = rows[-1][0]
+                checkpoint.rows_processed += len(rows)
+                checkpoint.rows_rewritten += 0 if args.dry_run else len(rows)
+                if args.dry_run:
+                    await db.rollback()
+                else:
+                    await db.commit()
+                    service.after_commit()
+                processed_this_run += len(rows)
+                progress.notes += len(rows)
+
+            pct = f"{100 * checkpoint.rows_processed / total:.1f}%" if total else "?"
+            print(f"[{label}] processed={checkpoint.rows_processed}/{total} ({pct}) {progress.line()}")
+            # Sleeps between transactions, like the provider calls above
+            if args.rows_per_sec:
+                ahead = processed_this_run / args.rows_per_sec - (time.monotonic() - started)
+                if ahead > 0:
+                    await asyncio.sleep(ahead)
+
+        # Server-side cursor on its own connection; writes go through `db`
+        async with engine.connect() as conn:
+            result = await conn.stream(query.execution_options(yield_per=args.batch_size))
+            window = []
+            async for rows in result.partitions(args.batch_size):
+                window.append(rows)
+                if len(window) >= args.embed_concurrency:
+                    await process(window)
+                    window = []
+            if window:
+                await process(window)
+
+        await db.rollback()
+        if not args.dry_run:
+            checkpoint.completed_at = datetime.now(timezone.utc)
+            await db.commit()
+        print(f"[{label}] done: processed={checkpoint.rows_processed}")
+
+
+async def main(args) -> None:
+    parts = [p.strip() for p in args.parts.split(",")]
+    tables = search_tables(parts)
+    started_at = datetime.now(timezone.utc).replace(tzinfo=None) # notes.updated_at is naive UTC
+    progress = Progress()
+    try:
+        async with SessionLocal() as db:
+            # One scan for the office list and per-office totals (progress reporting)
+            result = await db.execute(select(Note.office_id, func.count()).group_by(Note.office_id))
+            totals = {office_id: count for office_id, count in result.all()}
+            if args.office:
+                wanted = set(args.office.split(","))
+                totals = {o: n for o, n in totals.items() if str(o) in wanted}
+            if args.shadow and not args.dry_run and (args.restart or not await shadow_exists(db)):
+                print(f"[shadow] creating {BUILD_SCHEMA} tables: {', '.join(tables)}")
+                await prepare_shadow(db, tables)
+                args.restart = True # Empty shadow: checkpoints from an earlier build no longer apply
+
+        for office_id in sorted(totals, key=lambda o: (o is None, str(o))):
+            await reindex_office(office_id, totals[office_id], args, parts, progress)
+        print(f"total: {progress.line()}")
+
+        if args.shadow and not args.dry_run:
+            async with SessionLocal() as db:
+                await build_shadow_indexes(db, tables)
+                await swap_shadow(db, tables, started_at)
+    finally:
+        await close_embedding_provider()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--job-name", required=True, help="checkpoint key; reuse it to resume")
+    parser.add_argument("--office", help="comma-separated office ids (default: all)")
+    parser.add_argument("--parts", default="keywords,vectors", help="keywords, vectors or both")
+    parser.add_argument("--batch-size", type=int, default=256, help="notes per write transaction")
+    parser.add_argument("--embed-concurrency", type=int, default=4, help="embedding requests in flight")
+    parser.add_argument("--rows-per-sec", type=float, default=0, help="throttle (0 = unthrottled)")
+    parser.add_argument("--dry-run", action="store_true", help="read, decrypt and count work, write nothing")
+    parser.add_argument("--restart", action="store_true", help="ignore saved checkpoints")
+    parser.add_argument("--shadow", action="store_true", help="build into shadow tables and swap them in")
+    args = parser.parse_args()
+    if args.shadow and args.office:
+        parser.error("--shadow rebuilds whole tables; it cannot be limited to --office")
+    asyncio.run(main(args))
@@ -0,0 +1,84 @@
+"""
+Build / drop the HNSW index of a vector storage mode (SEARCH_VECTOR_STORAGE).
+
+Switching modes, without downtime:
+  1. Build the new mode's index next to the current one (CONCURRENTLY, writes continue):
+         python -m app.jobs.vector_index --storage halfvec
+  2. Deploy with SEARCH_VECTOR_STORAGE=halfvec.
+  3. Drop the indexes no longer used (the float32 column itself is kept, for re-ranking):
+         python -m app.jobs.vector_index --storage halfvec --drop-unused
+
+    python -m app.jobs.vector_index --status   # index sizes, valid or not
+An interrupted concurrent build leaves an INVALID index behind; running the job again
+drops and rebuilds it.
+"""
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.db.session import engine
+from app.models import NoteEmbedding
+from app.services.search_service import VECTOR_INDEXES
+
+HNSW_OPTIONS = "WITH (m = 16, ef_construction = 64)" # Same as ix_note_embeddings_vector_hnsw
+
+
+def index_definition(storage: str) -> str:
+    name, expression = VECTOR_INDEXES[storage]
+    expression = expression.format(dims=NoteEmbedding.vector.type.dim, sub=settings.SEARCH_VECTOR_SUBVECTOR_DIMS)
+    return f"CREATE INDEX CONCURRENTLY {name} ON note_embeddings USING hnsw ({expression}) {HNSW_OPTIONS}"
+
+
+async def index_status(conn) -> dict:
+    """index name -> (valid, size in bytes) for the vector indexes that exist"""
+    result = await conn.execute(text(
+        "SELECT c.relname, i.indisvalid, pg_relation_size(c.oid) FROM pg_index i "
+        "JOIN pg_class c ON c.oid = i.indexrelid WHERE c.relname = ANY(:names)"
+    ), {"names": [name for name, _ in VECTOR_INDEXES.values()]})
+    return {name: (valid, size) for name, valid, size in result.all()}
+
+
+async def run(args):
+    # CREATE / DROP INDEX CONCURRENTLY cannot run inside a transaction block
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        status = await index_status(conn)
+        if args.status:
+            for storage, (name, _) in VECTOR_INDEXES.items():
+                valid, size = status.get(name, (None, 0))
+                state = "missing" if valid is None else ("valid" if valid else "INVALID")
+                print(f"{storage:>10} {name:<36} {state:>8} {size / 1e6:>10.1f} MB")
+            return
+
+        name, _ = VECTOR_INDEXES[args.storage]
+        if name in status and not status[name][0]:
+            print(f"Dropping invalid index {name} (interrupted build)")
+            await conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+            del status[name]
+        if name not in status:
+            print(f"Building {name} ...")
+            started = time.monotonic()
+            await conn.execute(text(f"SET maintenance_work_mem = '{args.maintenance_work_mem}'"))
+            await conn.execute(text(index_definition(args.storage)))
+            print(f"Built {name} in {time.monotonic() - started:.0f}s")
+        else:
+            print(f"{name} already exists")
+
+        if args.drop_unused:
+            for storage, (other, _) in VECTOR_INDEXES.items():
+                if storage != args.storage and other in status:
+                    print(f"Dropping {other}")
+                    await conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {other}"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--storage", choices=list(VECTOR_INDEXES), default=settings.SEARCH_VECTOR_STORAGE)
+    parser.add_argument("--drop-unused", action="store_true", help="drop the other modes' indexes")
+    parser.add_argument("--status", action="store_true", help="show the vector indexes and exit")
+    parser.add_argument("--maintenance-work-mem", default=settings.SEARCH_HNSW_BUILD_MAINTENANCE_WORK_MEM,
+                        help="HNSW builds are much faster when the graph fits")
+    asyncio.run(run(parser.parse_args()))
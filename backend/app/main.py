@@ -1,10 +1,31 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from app.api import deps
 from app.core.config import settings
+from app.core import metrics
+from app.services.embeddings import close_embedding_provider
+from app.jobs.index_worker import index_worker
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    worker_task = asyncio.create_task(index_worker.run()) if settings.SEARCH_INDEX_WORKER_ENABLED else None
+    yield
+    if worker_task:
+        # Let the current batch finish (its transaction commits or rolls back as a unit)
+        index_worker.stop()
+        try:
+            await asyncio.wait_for(worker_task, timeout=30)
+        except asyncio.TimeoutError:
+            worker_task.cancel()
+    # Drain the embedding client's connection pool
+    await close_embedding_provider()
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan
 )
 
 from app.api.v1.router import api_router
@@ -18,8 +39,14 @@ if settings.BACKEND_CORS_ORIGINS:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["X-Next-Cursor"], # Search paging
     )
 
 @app.get("/health")
 def health_check():
     return {"status": "ok"}
+
+@app.get("/metrics", dependencies=[Depends(deps.get_current_admin)])
+def read_metrics():
+    """In-process cache counters (no PHI). Admin only: they reveal traffic and tenant activity."""
+    return metrics.snapshot()
@@ -6,7 +6,8 @@ from uuid import UUID
 # Import internal app components
 from app.db.session import SessionLocal
 from app.models import Patient, Visit, Note, Bill
-from app.core.security import get_blind_index, decrypt_data, encrypt_data
+from app.core.security import get_blind_index
+from app.db.encrypted import decrypt_attributes
 
 # Initialize FastMCP Server
 mcp = FastMCP("DentalNotesBackend")
@@ -26,12 +27,13 @@ async def search_patients(last_name: str) -> list[dict]:
             result = await db.execute(select(Patient).filter(Patient.last_name_hash == blind_index))
             patients = result.scalars().all()
             
+            await decrypt_attributes(patients, "first_name", "last_name")
             output = []
             for p in patients:
                 output.append({
                     "id": str(p.id),
-                    "first_name": decrypt_data(p.first_name),
-                    "last_name": decrypt_data(p.last_name),
+                    "first_name": p.first_name,
+                    "last_name": p.last_name,
                     "dob": str(p.dob)
                 })
             return output
@@ -56,14 +58,15 @@ async def get_patient_history(patient_id: str) -> dict:
         if not patient:
             return {"error": "Patient not found"}
             
+        await decrypt_attributes(patient.notes, "content")
         history = {
             "patient": {
                 "id": str(patient.id),
-                "first_name": decrypt_data(patient.first_name),
-                "last_name": decrypt_data(patient.last_name),
+                "first_name": patient.first_name,
+                "last_name": patient.last_name,
             },
             "visits": [{"date": str(v.visit_date), "reason": v.reason} for v in patient.visits],
-            "notes": [{"date": str(n.created_at), "content": decrypt_data(n.content)} for n in patient.notes],
+            "notes": [{"date": str(n.created_at), "content": n.content} for n in patient.notes],
             "bills": [{"amount": str(b.amount), "status": b.status} for b in patient.bills]
         }
         return history
@@ -91,7 +94,7 @@ async def add_clinical_note(patient_id: str, content: str, author_id: str, visit
         note = Note(
             patient_id=UUID(patient_id),
             visit_id=UUID(visit_id) if visit_id else None,
-            content=encrypt_data(content),
+            content=content, # Encrypted on flush
             author_id=author_id
         )
         db.add(note)
@@ -4,7 +4,8 @@ from .note import Note, NoteHistory
 from .bill import Bill, CdtCode
 from .task import Task
 from .quick_phrase import QuickPhrase
-from .search import NoteEmbedding, BlindIndex
+from .search import NoteEmbedding, BlindIndex, NoteTermSet, SearchTermStat, SearchOfficeStat, SearchGeneration, EmbeddingCacheEntry
 from .office import Office
 from .user import User
 from .api_key import ApiKey
+from .job import JobCheckpoint, SearchIndexJob
@@ -0,0 +1,38 @@
+from sqlalchemy import Column, String, DateTime, BigInteger, Integer, ForeignKey, Index, func
+from sqlalchemy.dialects.postgresql import UUID
+from datetime import datetime, timezone
+
+from app.db.base_class import Base
+
+class JobCheckpoint(Base):
+    """
+    Progress of a resumable batch job (re-encryption, reindexing) per (job, table).
+    `last_id` is the keyset position: the job resumes with rows where id > last_id.
+    """
+    __tablename__ = "job_checkpoints"
+
+    job_name = Column(String, primary_key=True)
+    table_name = Column(String, primary_key=True)
+    last_id = Column(UUID(as_uuid=True), nullable=True)
+    rows_processed = Column(BigInteger, nullable=False, default=0)
+    rows_rewritten = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
+    completed_at = Column(DateTime(timezone=True), nullable=True)
+
+class SearchIndexJob(Base):
+    """
+    Outbox entry: note needs (re)indexing for search.
+    Written in the same transaction as the note change; app.jobs.index_worker consumes it.
+    """
+    __tablename__ = "search_index_jobs"
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    note_id = Column(UUID(as_uuid=True), ForeignKey("notes.id", ondelete="CASCADE"), nullable=False)
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    available_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now()) # Retry backoff
+    last_error = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_search_index_jobs_available_at", "available_at"),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, ForeignKey, Text
+from sqlalchemy import Column, String, DateTime, ForeignKey
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
@@ -6,6 +6,7 @@ import uuid
 from datetime import datetime, timezone
 
 from app.db.base_class import Base
+from app.db.encrypted import EncryptedText, EncryptedAttribute
 
 class Note(Base):
     __tablename__ = "notes"
@@ -13,7 +14,8 @@ class Note(Base):
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
     patient_id = Column(UUID(as_uuid=True), ForeignKey("patients.id"), nullable=False)
     visit_id = Column(UUID(as_uuid=True), ForeignKey("visits.id"), nullable=True) # Optional
-    content = Column(Text, nullable=False) # Encrypted
+    _content = Column("content", EncryptedText(compress=True), nullable=False) # Compressed + encrypted at rest
+    content = EncryptedAttribute("_content") # Plaintext, decrypted lazily on access
     area_of_oral_cavity = Column(String, nullable=True)
     tooth_number = Column(String, nullable=True)
     surface_ids = Column(String, nullable=True)
@@ -34,7 +36,8 @@ class NoteHistory(Base):
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
     note_id = Column(UUID(as_uuid=True), ForeignKey("notes.id"), nullable=False)
-    previous_content = Column(Text, nullable=False) # Encrypted
+    _previous_content = Column("previous_content", EncryptedText(compress=True), nullable=False) # Compressed + encrypted at rest
+    previous_content = EncryptedAttribute("_previous_content")
     area_of_oral_cavity = Column(String, nullable=True)
     tooth_number = Column(String, nullable=True)
     surface_ids = Column(String, nullable=True)
@@ -6,13 +6,16 @@ import uuid
 from datetime import datetime, timezone
 
 from app.db.base_class import Base
+from app.db.encrypted import EncryptedText, EncryptedAttribute
 
 class Patient(Base):
     __tablename__ = "patients"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
-    first_name = Column(String, nullable=False) # Encrypted in app
-    last_name = Column(String, nullable=False)  # Encrypted in app
+    _first_name = Column("first_name", EncryptedText, nullable=False) # Encrypted at rest
+    _last_name = Column("last_name", EncryptedText, nullable=False)  # Encrypted at rest
+    first_name = EncryptedAttribute("_first_name") # Plaintext, decrypted lazily on access
+    last_name = EncryptedAttribute("_last_name")
     last_name_hash = Column(String, index=True, nullable=False) # Blind Index for search
     dob = Column(Date, nullable=False)
     contact_info = Column(JSONB, nullable=True) # Encrypted JSON
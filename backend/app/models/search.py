@@ -1,5 +1,5 @@
-from sqlalchemy import Column, String, ForeignKey
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, String, ForeignKey, BigInteger, Integer, SmallInteger, Index, LargeBinary, DateTime, func
+from sqlalchemy.dialects.postgresql import UUID, ARRAY
 from sqlalchemy.orm import relationship
 from pgvector.sqlalchemy import Vector
 import uuid
@@ -11,10 +11,25 @@ class NoteEmbedding(Base):
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
     note_id = Column(UUID(as_uuid=True), ForeignKey("notes.id"), nullable=False, unique=True)
+    office_id = Column(UUID(as_uuid=True), ForeignKey("offices.id"), nullable=True) # Copy of notes.office_id: search filters without a join
     vector = Column(Vector(1536)) # OpenAI dimension
-    
-    # We treat the vector index creation in Alembic migration manually usually, or here.
-    # For now, just definition.
+    content_key = Column(LargeBinary, nullable=True) # embedding_key() of the embedded text: skip re-embedding unchanged notes
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now()) # Set on every upsert: delta reads of the in-process index
+
+    # ANN index for cosine_distance (<=>); created CONCURRENTLY by its migration
+    __table_args__ = (
+        Index(
+            "ix_note_embeddings_vector_hnsw", "vector",
+            postgresql_using="hnsw",
+            postgresql_with={"m": 16, "ef_construction": 64},
+            postgresql_ops={"vector": "vector_cosine_ops"},
+        ),
+        # Exact scan of a small office (the planner picks it over the HNSW walk when cheaper),
+        # and the changed-since reads of app.services.vector_memory
+        Index("ix_note_embeddings_office_updated", "office_id", "updated_at"),
+        # Reference check of app.jobs.purge_embedding_cache
+        Index("ix_note_embeddings_content_key", "content_key"),
+    )
 
 class BlindIndex(Base):
     """
@@ -25,4 +40,78 @@ class BlindIndex(Base):
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
     note_id = Column(UUID(as_uuid=True), ForeignKey("notes.id"), nullable=False)
-    term_hash = Column(String, index=True, nullable=False) # HMAC-SHA256 of the word
+    office_id = Column(UUID(as_uuid=True), ForeignKey("offices.id"), nullable=True) # Copy of notes.office_id
+    term_hash = Column(String, nullable=False) # HMAC-SHA256 of the word
+    term_freq = Column(Integer, nullable=False, default=1, server_default="1") # Occurrences in the note
+
+    # One index range per (office, term); note_id and term_freq are included so the
+    # keyword search is answered from the index alone (index-only scan)
+    __table_args__ = (
+        Index(
+            "ix_blind_indexes_office_term", "office_id", "term_hash",
+            postgresql_include=["note_id", "term_freq"],
+        ),
+        # Per-note reads and diffs of SearchService._update_blind_indexes; one row per term
+        Index("ux_blind_indexes_note_term", "note_id", "term_hash", unique=True),
+    )
+
+
+class NoteTermSet(Base):
+    """
+    Compact keyword index: one row per note holding its term hashes truncated to
+    64 bits (first 16 hex chars of term_hash, as a signed bigint), GIN-indexed.
+    Alternative to BlindIndex's row-per-term layout, see SEARCH_KEYWORD_LAYOUT.
+    """
+    __tablename__ = "note_term_sets"
+
+    note_id = Column(UUID(as_uuid=True), ForeignKey("notes.id"), primary_key=True)
+    office_id = Column(UUID(as_uuid=True), ForeignKey("offices.id"), nullable=True) # Copy of notes.office_id
+    term_keys = Column(ARRAY(BigInteger), nullable=False)
+    term_freqs = Column(ARRAY(SmallInteger), nullable=False) # Parallel to term_keys
+
+    __table_args__ = (
+        # Multi-column GIN (btree_gin extension for the uuid column): office and term
+        # conditions are intersected inside one index scan
+        Index("ix_note_term_sets_office_term_keys", "office_id", "term_keys", postgresql_using="gin"),
+    )
+
+
+class SearchTermStat(Base):
+    """Per-office document frequency of a term (number of notes containing it), for ranking"""
+    __tablename__ = "search_term_stats"
+
+    office_id = Column(UUID(as_uuid=True), ForeignKey("offices.id"), primary_key=True)
+    term_key = Column(BigInteger, primary_key=True) # term_key() of the term hash
+    doc_freq = Column(Integer, nullable=False, default=0)
+
+class SearchOfficeStat(Base):
+    """Per-office number of indexed notes (the N in idf)"""
+    __tablename__ = "search_office_stats"
+
+    office_id = Column(UUID(as_uuid=True), ForeignKey("offices.id"), primary_key=True)
+    doc_count = Column(Integer, nullable=False, default=0)
+
+
+class SearchGeneration(Base):
+    """
+    Per-office write counter: bumped in the same transaction as every index write for the
+    office, so cached search results computed at an older generation are never served
+    """
+    __tablename__ = "search_generations"
+
+    office_id = Column(UUID(as_uuid=True), ForeignKey("offices.id"), primary_key=True)
+    generation = Column(BigInteger, nullable=False, default=0)
+
+
+class EmbeddingCacheEntry(Base):
+    """
+    Content-addressed note embeddings, shared across notes and offices.
+    Keyed by an HMAC of the normalised text and model (see app.services.embedding_cache);
+    holds no plaintext.
+    """
+    __tablename__ = "embedding_cache"
+
+    key = Column(LargeBinary, primary_key=True)
+    model = Column(String, nullable=False)
+    vector = Column(Vector(1536), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
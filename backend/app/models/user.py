@@ -1,5 +1,5 @@
 import uuid
-from sqlalchemy import Column, String, Boolean, ForeignKey, DateTime
+from sqlalchemy import Column, String, Boolean, ForeignKey, DateTime, Integer
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from datetime import datetime, timezone
@@ -14,6 +14,7 @@ class User(Base):
     full_name = Column(String, nullable=True)
     role = Column(String, default="DENTIST") # ADMIN, DENTIST, HYGIENIST, STAFF
     is_active = Column(Boolean, default=True)
+    token_epoch = Column(Integer, default=0, server_default="0", nullable=False) # Bump to revoke issued JWTs
     
     office_id = Column(UUID(as_uuid=True), ForeignKey("offices.id"), nullable=False)
     created_at = Column(DateTime(timezone=True), default=datetime.now(timezone.utc))
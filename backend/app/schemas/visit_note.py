@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional, Tuple
 from datetime import datetime
 from uuid import UUID
 from enum import Enum
@@ -62,3 +62,27 @@ class NoteResponse(NoteBase):
 
     class Config:
         from_attributes = True
+
+class SearchNoteResponse(NoteResponse):
+    score: Optional[float] = None # Fused relevance score, only when requested
+
+class SearchSnippetResponse(BaseModel):
+    # Note metadata without content (GET /notes/{id} for the full note)
+    id: UUID
+    patient_id: UUID
+    visit_id: Optional[UUID] = None
+    area_of_oral_cavity: Optional[str] = None
+    tooth_number: Optional[str] = None
+    surface_ids: Optional[str] = None
+    note_type: str = "GENERAL"
+    author_id: str
+    created_at: datetime
+    updated_at: datetime
+    score: Optional[float] = None # Fused relevance score, only when requested
+    snippet: str = "" # Window of the note around the first matched term, whitespace collapsed
+    snippet_start: int = 0 # Offset of the window in the note (> 0: text precedes it)
+    highlights: List[Tuple[int, int]] = [] # [start, end) of query terms within snippet
+    truncated: bool = False # The note continues after the snippet
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,194 @@
+import asyncio
+import threading
+import unicodedata
+from array import array
+from collections import OrderedDict
+from typing import List, Optional, Sequence, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import metrics
+from app.core.config import settings
+from app.core.security import get_cache_key
+from app.models import EmbeddingCacheEntry
+from app.services.embeddings import EmbeddingProvider
+
+# Content-addressed embedding cache.
+# Key = HMAC(normalised text + model), so identical text (template notes, popular queries)
+# is embedded once per model, across notes and offices, and no plaintext is stored:
+#   queries -> in-process LRU (hot, small, recomputed cheaply after a restart)
+#   notes   -> embedding_cache table (shared by all workers, survives deploys)
+# Table rows no longer referenced by note_embeddings.content_key are removed after
+# EMBEDDING_CACHE_RETENTION_DAYS by app.jobs.purge_embedding_cache.
+
+def normalize_text(text: str) -> str:
+    """Unicode NFC, whitespace runs collapsed: formatting-only edits keep the same key"""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+def normalize_query(text: str) -> str:
+    return normalize_text(text).lower()
+
+def embedding_key(normalized_text: str, model: str) -> bytes:
+    return get_cache_key(f"{model}\0{normalized_text}")
+
+
+class QueryEmbeddingCache:
+    """
+    Bounded LRU of query embeddings. Vectors are kept as float32 arrays
+    (~6 KB each at 1536 dimensions, vs ~50 KB as a list of Python floats).
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[bytes, array]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: bytes) -> Optional[List[float]]:
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return vector.tolist()
+
+    def set(self, key: bytes, vector: List[float]) -> None:
+        if self.max_entries <= 0 or not vector:
+            return
+        with self._lock:
+            self._entries[key] = array("f", vector)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = len(self._entries)
+        lookups = self.hits + self.misses
+        return {
+            "size": size,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+        }
+
+
+class NoteEmbeddingStats:
+    """Counters for note embeddings: unchanged content, table hits, provider calls"""
+
+    def __init__(self):
+        self.unchanged = 0
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "unchanged_skipped": self.unchanged,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+query_embedding_cache = QueryEmbeddingCache(settings.EMBEDDING_QUERY_CACHE_MAX_ENTRIES)
+metrics.register("embedding_query_cache", query_embedding_cache.stats)
+note_embedding_stats = NoteEmbeddingStats()
+metrics.register("embedding_note_cache", note_embedding_stats.stats)
+
+
+async def embed_query(embedder: EmbeddingProvider, query: str) -> List[float]:
+    text = normalize_query(query)
+    if not text:
+        return []
+    key = embedding_key(text, embedder.model)
+    vector = query_embedding_cache.get(key)
+    if vector is None:
+        vector = (await embedder.embed([text]))[0]
+        query_embedding_cache.set(key, vector)
+    return vector
+
+async def embed_notes(db: AsyncSession, embedder: EmbeddingProvider, texts: Sequence[str]) -> List[Tuple[Optional[bytes], List[float]]]:
+    """
+    (content key, vector) per text; the provider is called once, for cache misses only.
+    New vectors are added to the table in the caller's transaction.
+    """
+    normalized = [normalize_text(t) if t else "" for t in texts]
+    keys = [embedding_key(t, embedder.model) if t else None for t in normalized]
+    wanted = list({k for k in keys if k is not None})
+    if not wanted:
+        return [(None, []) for _ in texts]
+
+    result = await db.execute(
+        select(EmbeddingCacheEntry.key, EmbeddingCacheEntry.vector).filter(EmbeddingCacheEntry.key.in_(wanted))
+    )
+    found = {key: list(vector) for key, vector in result.all()}
+    note_embedding_stats.hits += len(found)
+
+    missing = [k for k in wanted if k not in found]
+    if missing:
+        note_embedding_stats.misses += len(missing)
+        text_by_key = {k: t for k, t in zip(keys, normalized) if k is not None}
+        vectors = await embedder.embed([text_by_key[k] for k in missing])
+        rows = [{"key": k, "model": embedder.model, "vector": v} for k, v in zip(missing, vectors) if v]
+        if rows:
+            # Sorted: concurrent writers insert overlapping keys in the same order
+            rows.sort(key=lambda r: r["key"])
+            await db.execute(pg_insert(EmbeddingCacheEntry).values(rows).on_conflict_do_nothing())
+        found.update(zip(missing, vectors))
+
+    return [(k, found.get(k, [])) if k is not None else (None, []) for k in keys]
+
+async def prefetch_note_embeddings(db: AsyncSession, embedder: EmbeddingProvider, texts: Sequence[str],
+                                   concurrency: int, batch_size: int, dry_run: bool = False) -> Tuple[int, int]:
+    """
+    Bulk path (reindex): make sure embedding_cache holds a vector for every text, embedding
+    the misses in up to `concurrency` provider calls of `batch_size` texts running at once.
+    Returns (cache hits, texts embedded); with dry_run only the misses are counted.
+    Commits on its own (the rows are valid whatever happens to the caller's batch), and
+    holds no transaction open while the provider calls run.
+    """
+    text_by_key = {}
+    for t in texts:
+        normalized = normalize_text(t) if t else ""
+        if normalized:
+            text_by_key[embedding_key(normalized, embedder.model)] = normalized
+    if not text_by_key:
+        return 0, 0
+    result = await db.execute(select(EmbeddingCacheEntry.key).filter(EmbeddingCacheEntry.key.in_(list(text_by_key))))
+    cached = set(result.scalars().all())
+    await db.commit() # End the read: the provider calls can take seconds
+    missing = [k for k in text_by_key if k not in cached]
+    if dry_run or not missing:
+        return len(cached), len(missing)
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def embed_chunk(keys: List[bytes]) -> List[List[float]]:
+        async with semaphore:
+            return await embedder.embed([text_by_key[k] for k in keys])
+
+    chunks = [missing[i:i + batch_size] for i in range(0, len(missing), batch_size)]
+    results = await asyncio.gather(*(embed_chunk(c) for c in chunks))
+    rows = [
+        {"key": k, "model": embedder.model, "vector": v}
+        for chunk, vectors in zip(chunks, results) for k, v in zip(chunk, vectors) if v
+    ]
+    rows.sort(key=lambda r: r["key"])
+    for i in range(0, len(rows), 1000):
+        await db.execute(pg_insert(EmbeddingCacheEntry).values(rows[i:i + 1000]).on_conflict_do_nothing())
+    await db.commit()
+    return len(cached), len(missing)
@@ -0,0 +1,115 @@
+import hashlib
+import math
+from abc import ABC, abstractmethod
+from typing import List, Optional
+
+import httpx
+from openai import AsyncOpenAI
+
+from app.core.config import settings
+
+# Embedding providers. Selected by EMBEDDING_PROVIDER:
+#   "openai" - OpenAI embeddings API over a pooled async HTTP client (timeouts + retries
+#              with backoff on 429/5xx/connection errors are handled by the SDK)
+#   "hash"   - deterministic feature hashing, no network; for load tests and offline dev
+# Vectors must have settings.EMBEDDING_DIMENSIONS entries to fit note_embeddings.vector.
+
+class EmbeddingProvider(ABC):
+    """Interface: embed a batch of texts; an empty input text yields an empty vector"""
+    model: str
+    dimensions: int
+
+    @abstractmethod
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        ...
+
+    async def aclose(self) -> None:
+        pass
+
+class OpenAIEmbeddingProvider(EmbeddingProvider):
+    def __init__(self, api_key: Optional[str], model: str, dimensions: int, timeout: float,
+                 max_retries: int, max_connections: int, batch_size: int):
+        self.model = model
+        self.dimensions = dimensions
+        self.batch_size = batch_size
+        self._http = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            timeout=timeout,
+        )
+        self._client = AsyncOpenAI(api_key=api_key, timeout=timeout, max_retries=max_retries, http_client=self._http)
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        vectors: List[List[float]] = [[] for _ in texts]
+        todo = [i for i, t in enumerate(texts) if t]
+        for start in range(0, len(todo), self.batch_size):
+            batch = todo[start:start + self.batch_size]
+            kwargs = {}
+            if self.model.startswith("text-embedding-3"):
+                kwargs["dimensions"] = self.dimensions # Only v3 models accept a target size
+            response = await self._client.embeddings.create(
+                input=[texts[i] for i in batch], model=self.model, **kwargs
+            )
+            for item in response.data:
+                vectors[batch[item.index]] = item.embedding
+        return vectors
+
+    async def aclose(self) -> None:
+        await self._client.close()
+
+class HashEmbeddingProvider(EmbeddingProvider):
+    """
+    Signed feature hashing of words and word bigrams into `dimensions` buckets, L2-normalised.
+    Same text -> same vector on every machine; texts sharing vocabulary get high cosine
+    similarity, which is enough to exercise indexing and ranking end to end.
+    """
+    BIGRAM_WEIGHT = 0.5
+
+    def __init__(self, dimensions: int):
+        self.dimensions = dimensions
+        self.model = f"hash-v1-{dimensions}"
+
+    def _embed_one(self, text: str) -> List[float]:
+        words = ["".join(c for c in w if c.isalnum()) for w in text.lower().split()]
+        words = [w for w in words if w]
+        if not words:
+            return []
+        vector = [0.0] * self.dimensions
+        features = [(w, 1.0) for w in words] + [(f"{a} {b}", self.BIGRAM_WEIGHT) for a, b in zip(words, words[1:])]
+        for feature, weight in features:
+            digest = int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "big")
+            vector[digest % self.dimensions] += weight if digest >> 63 else -weight
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed_one(t) if t else [] for t in texts]
+
+def create_embedding_provider() -> EmbeddingProvider:
+    if settings.EMBEDDING_PROVIDER == "hash":
+        return HashEmbeddingProvider(settings.EMBEDDING_DIMENSIONS)
+    if settings.EMBEDDING_PROVIDER == "openai":
+        return OpenAIEmbeddingProvider(
+            api_key=settings.OPENAI_API_KEY,
+            model=settings.EMBEDDING_MODEL,
+            dimensions=settings.EMBEDDING_DIMENSIONS,
+            timeout=settings.EMBEDDING_TIMEOUT_SECONDS,
+            max_retries=settings.EMBEDDING_MAX_RETRIES,
+            max_connections=settings.EMBEDDING_MAX_CONNECTIONS,
+            batch_size=settings.EMBEDDING_BATCH_SIZE,
+        )
+    raise ValueError(f"Unknown EMBEDDING_PROVIDER {settings.EMBEDDING_PROVIDER!r}")
+
+_provider: Optional[EmbeddingProvider] = None
+
+def get_embedding_provider() -> EmbeddingProvider:
+    """Process-wide provider (one connection pool shared by all requests)"""
+    global _provider
+    if _provider is None:
+        _provider = create_embedding_provider()
+    return _provider
+
+async def close_embedding_provider() -> None:
+    global _provider
+    if _provider is not None:
+        await _provider.aclose()
+        _provider = None
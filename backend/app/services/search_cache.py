@@ -0,0 +1,114 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Set, Tuple
+from uuid import UUID
+
+from app.core import metrics
+from app.core.config import settings
+from app.core.security import get_cache_key
+from app.services.embedding_cache import normalize_query
+
+# Approximate resident size of a cached result list (accounting only, for the byte cap)
+ENTRY_BYTES = 400 # OrderedDict slot, key, tuple, list
+HIT_BYTES = 200 # SearchHit + its UUID and float
+
+
+def result_cache_key(query: str, mode: str, limit: int) -> bytes:
+    """Keyed hash of the normalised query and options: the cache holds no query text"""
+    return get_cache_key(f"{mode}\0{limit}\0{normalize_query(query)}")
+
+
+class SearchResultCache:
+    """
+    Bounded LRU of fused search results per office. Each entry records the office's search
+    generation (search_generations) it was computed at; a lookup at any other generation
+    misses and drops it. Index writes bump the generation in their own transaction, so no
+    TTL is needed: a result is served only while nothing it depends on has changed.
+    Capped by entry count and by approximate bytes.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[UUID, bytes], tuple]" = OrderedDict() # -> (generation, hits, size)
+        self._by_office: Dict[UUID, Set[bytes]] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, office_id: UUID, key: bytes, generation: int) -> Optional[list]:
+        with self._lock:
+            entry = self._entries.get((office_id, key))
+            if entry is not None and entry[0] != generation:
+                self._drop((office_id, key))
+                self.stale += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end((office_id, key))
+            self.hits += 1
+            return list(entry[1])
+
+    def set(self, office_id: UUID, key: bytes, generation: int, hits: list) -> None:
+        size = ENTRY_BYTES + HIT_BYTES * len(hits)
+        if self.max_entries <= 0 or size > self.max_bytes:
+            return
+        with self._lock:
+            if (office_id, key) in self._entries:
+                self._drop((office_id, key))
+            self._entries[(office_id, key)] = (generation, tuple(hits), size)
+            self._by_office.setdefault(office_id, set()).add(key)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate_office(self, office_id: UUID) -> None:
+        """Drop an office's entries now (after a local write) instead of at their next lookup"""
+        with self._lock:
+            for key in list(self._by_office.get(office_id, ())):
+                self._drop((office_id, key))
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_office.clear()
+            self._bytes = 0
+
+    def _drop(self, entry_key: Tuple[UUID, bytes]) -> None:
+        _, _, size = self._entries.pop(entry_key)
+        self._bytes -= size
+        office_id, key = entry_key
+        keys = self._by_office.get(office_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_office[office_id]
+
+    def stats(self) -> dict:
+        with self._lock:
+            size, nbytes, offices = len(self._entries), self._bytes, len(self._by_office)
+        lookups = self.hits + self.misses
+        return {
+            "size": size,
+            "offices": offices,
+            "bytes": nbytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "stale": self.stale,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+search_result_cache = SearchResultCache(settings.SEARCH_RESULT_CACHE_MAX_ENTRIES, settings.SEARCH_RESULT_CACHE_MAX_BYTES)
+metrics.register("search_result_cache", search_result_cache.stats)
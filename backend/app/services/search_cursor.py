@@ -0,0 +1,55 @@
+import base64
+import binascii
+import hashlib
+import hmac
+import struct
+import time
+from typing import List, Optional, Tuple
+from uuid import UUID
+
+from app.core.config import settings
+from app.core.security import get_token_mac
+from app.services.search_service import SearchHit
+
+# Search cursor: the remaining fused ranking of a search, so later pages only fetch and
+# decrypt their notes instead of re-running keyword + semantic search. Stateless (any
+# process can serve the next page), opaque to clients:
+#   base64url( version (1) | expires (4, unix seconds) | count (2)
+#              | count * (note_id (16) | score (f32) | keyword_rank (2) | semantic_rank (2), 0 = none)
+#              | mac (16) )
+# The MAC also covers the office and the query, so a cursor only resumes the search it came
+# from, for the office it came from. Notes deleted meanwhile simply drop out of their page.
+CURSOR_V1 = 0x01
+HEADER = struct.Struct(">BIH")
+ENTRY = struct.Struct(">16sfHH")
+MAC_SIZE = 16
+
+
+def _scope(tenant_id, query: str, mode: str) -> bytes:
+    return UUID(str(tenant_id)).bytes + hashlib.sha256(f"{mode}\0{query}".encode()).digest()
+
+def encode_cursor(hits: List[SearchHit], tenant_id, query: str, mode: str, expires: Optional[int] = None) -> str:
+    """Cursor for `hits` (the ranking still to be served); expires keeps a resumed cursor's deadline"""
+    if expires is None:
+        expires = int(time.time()) + settings.SEARCH_CURSOR_TTL_SECONDS
+    body = HEADER.pack(CURSOR_V1, expires, len(hits)) + b"".join(
+        ENTRY.pack(hit.note_id.bytes, hit.score, hit.keyword_rank or 0, hit.semantic_rank or 0) for hit in hits
+    )
+    return base64.urlsafe_b64encode(body + get_token_mac(_scope(tenant_id, query, mode) + body)).rstrip(b"=").decode()
+
+def decode_cursor(cursor: str, tenant_id, query: str, mode: str) -> Optional[Tuple[List[SearchHit], int]]:
+    """(remaining hits, expires), or None if the cursor is malformed, forged, expired or from another search"""
+    try:
+        data = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+    except (binascii.Error, ValueError):
+        return None
+    body, mac = data[:-MAC_SIZE], data[-MAC_SIZE:]
+    if len(body) < HEADER.size or not hmac.compare_digest(mac, get_token_mac(_scope(tenant_id, query, mode) + body)):
+        return None
+    version, expires, count = HEADER.unpack_from(body)
+    if version != CURSOR_V1 or expires < time.time() or len(body) != HEADER.size + count * ENTRY.size:
+        return None
+    hits = []
+    for note_id, score, keyword_rank, semantic_rank in ENTRY.iter_unpack(body[HEADER.size:]):
+        hits.append(SearchHit(UUID(bytes=note_id), score, keyword_rank or None, semantic_rank or None))
+    return hits, expires
@@ -1,111 +1,558 @@
-import hashlib
-import os
-from typing import List
-from uuid import UUID
+import math
+from collections import Counter
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Set, Tuple
+from uuid import UUID, uuid4
 from sqlalchemy.orm import Session
-from sqlalchemy import select, text
-from app.models import NoteEmbedding, BlindIndex, Note
+from sqlalchemy import select, delete, insert, update, func, case, cast, column, desc, bindparam, literal_column, text, true, tuple_, BigInteger, Integer
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from pgvector.sqlalchemy import BIT, HALFVEC, Vector
+from app.models import NoteEmbedding, BlindIndex, NoteTermSet, SearchTermStat, SearchOfficeStat, SearchGeneration, SearchIndexJob
+from app.core.config import settings
 from app.core.security import get_blind_index
-import openai
+from app.services.embeddings import EmbeddingProvider, get_embedding_provider
+from app.services.embedding_cache import embed_notes, embed_query, embedding_key, normalize_text, note_embedding_stats
+from app.services.search_cache import result_cache_key, search_result_cache
+from app.services.vector_memory import memory_vector_index
 
-# Configure OpenAI
-openai.api_key = os.getenv("OPENAI_API_KEY")
+# Rows per multi-row INSERT (up to 5 bind params each, well under Postgres' 32767 limit)
+INSERT_CHUNK_ROWS = 5000
+
+# BM25 term-frequency saturation. b = 0: no length normalisation (we store no note lengths,
+# and a long dictated note mentioning a term often is usually about it).
+BM25_K1 = 1.2
+
+# Reciprocal-rank fusion: score = sum over retrievers of 1 / (RRF_K + rank).
+# 60 is the usual constant; larger flattens the advantage of top ranks.
+RRF_K = 60
+# Each retriever contributes limit * RRF_CANDIDATE_FACTOR candidates to the fusion
+RRF_CANDIDATE_FACTOR = 2
+
+# HNSW index per SEARCH_VECTOR_STORAGE mode: (name, indexed expression + operator class).
+# Non-full modes index an expression of the float32 column, which stays the source of truth
+# for the exact re-rank. {dims}: column dimensions, {sub}: SEARCH_VECTOR_SUBVECTOR_DIMS.
+VECTOR_INDEXES = {
+    "full": ("ix_note_embeddings_vector_hnsw", "vector vector_cosine_ops"),
+    "halfvec": ("ix_note_embeddings_halfvec_hnsw", "(vector::halfvec({dims})) halfvec_cosine_ops"),
+    "subvector": ("ix_note_embeddings_subvector_hnsw", "(subvector(vector, 1, {sub})::vector({sub})) vector_cosine_ops"),
+    "binary": ("ix_note_embeddings_binary_hnsw", "(binary_quantize(vector)::bit({dims})) bit_hamming_ops"),
+}
+
+class SearchHit(NamedTuple):
+    note_id: UUID
+    score: float # Fused RRF score
+    keyword_rank: Optional[int] = None # 1-based, None if not retrieved by that branch
+    semantic_rank: Optional[int] = None
+
+def term_key(term_hash: str) -> int:
+    """
+    64-bit key for the array layout: first 16 hex chars of the term hash as a signed bigint.
+    Same value as Postgres' ('x' || substr(term_hash, 1, 16))::bit(64)::bigint.
+    Collisions (~n^2/2^65) are irrelevant at per-office vocabulary sizes.
+    """
+    return int.from_bytes(bytes.fromhex(term_hash[:16]), "big", signed=True)
+
+def normalize_term(word: str) -> str:
+    """Keyword form of a whitespace-separated word: lowercase, alphanumerics only ("Tooth," -> "tooth")"""
+    return "".join(c for c in word.lower() if c.isalnum())
+
+def note_lock_key(note_id: UUID) -> int:
+    """Advisory lock key of a note for SearchService.lock_notes: its first 64 bits, signed"""
+    return int.from_bytes(note_id.bytes[:8], "big", signed=True)
+
+def bm25_idf(doc_freq: int, doc_count: int) -> float:
+    """Non-negative BM25 idf (Lucene variant)"""
+    return math.log(1 + (doc_count - doc_freq + 0.5) / (doc_freq + 0.5))
+
+def enqueue_index(db: Session, note_id: UUID):
+    """Queue a note for (re)indexing; commit together with the note change"""
+    db.add(SearchIndexJob(note_id=note_id))
 
 class SearchService:
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, keyword_layout: str = None, embedder: EmbeddingProvider = None,
+                 vector_storage: str = None, vector_backend: str = None):
         self.db = db
+        self.keyword_layout = keyword_layout or settings.SEARCH_KEYWORD_LAYOUT
+        self.vector_storage = vector_storage or settings.SEARCH_VECTOR_STORAGE
+        self.vector_backend = vector_backend or settings.SEARCH_VECTOR_BACKEND
+        self._embedder = embedder
+        self._written_vectors = [] # (office_id, note_id, vector) not yet handed to the in-process index
+        self._bumped_offices = set() # Offices whose search generation this transaction bumped
 
-    def _get_embedding(self, text: str) -> List[float]:
-        """Generate embedding using OpenAI"""
-        if not text:
+    async def _get_query_embedding(self, query: str) -> List[float]:
+        """Query embedding via the in-process cache ([] on failure: keyword-only search)"""
+        if not query:
             return []
         try:
-            response = openai.embeddings.create(
-                input=text,
-                model="text-embedding-3-small"
-            )
-            return response.data[0].embedding
+            return await embed_query(self._embedder or get_embedding_provider(), query)
         except Exception as e:
             print(f"Error generating embedding: {e}")
             return []
 
-    def _tokenize_and_hash(self, text: str) -> List[str]:
-        """Split text into words and hash them for Blind Index"""
+    def _term_frequencies(self, text: str) -> Dict[str, int]:
+        """Split text into words and hash them for Blind Index: term hash -> occurrences"""
         if not text:
-            return []
+            return {}
         # Simple whitespace tokenization, cleaning punctuation
-        words = set(text.lower().split()) # Unique words
-        hashes = []
-        for word in words:
-            # Clean word
-            clean_word = "".join(c for c in word if c.isalnum())
+        counts = Counter()
+        for word in text.lower().split():
+            # Clean word ("tooth," and "tooth" are the same term)
+            clean_word = normalize_term(word)
             if clean_word:
-                # Reuse get_blind_index from security (SHA256)
-                hashes.append(get_blind_index(clean_word))
-        return hashes
-
-    async def index_note(self, note_id: UUID, content: str):
-        """Update Embeddings and Blind Index for a note"""
-        # 1. Generate & Save Vector
-        vector = self._get_embedding(content)
-        if vector:
-            # Check if exists
-            existing_emb = await self.db.execute(select(NoteEmbedding).filter(NoteEmbedding.note_id == note_id))
-            emb_obj = existing_emb.scalars().first()
-            if emb_obj:
-               emb_obj.vector = vector
-            else:
-               new_emb = NoteEmbedding(note_id=note_id, vector=vector)
-               self.db.add(new_emb)
-        
-        # 2. Generate & Save Blind Indexes
-        # Delete old indexes for this note
-        await self.db.execute(text(f"DELETE FROM blind_indexes WHERE note_id = '{note_id}'"))
-        
-        term_hashes = self._tokenize_and_hash(content)
-        for h in term_hashes:
-            self.db.add(BlindIndex(note_id=note_id, term_hash=h))
-            
+                counts[clean_word] += 1
+        # Reuse get_blind_index from security (SHA256)
+        return {get_blind_index(w): n for w, n in counts.items()}
+
+    def _tokenize_and_hash(self, text: str) -> List[str]:
+        """Unique term hashes of text"""
+        return list(self._term_frequencies(text))
+
+    async def index_note(self, note_id: UUID, content: str, office_id: Optional[UUID] = None):
+        """Update Embeddings and Blind Index (+ per-office term statistics) for a note"""
+        await self.index_notes([(note_id, content, office_id)])
         await self.db.commit()
+        self.after_commit()
 
-    async def search_notes(self, query: str, tenant_id: UUID, limit: int = 10) -> List[UUID]:
+    def after_commit(self):
+        """
+        Hand the committed writes of index_notes to this process' in-memory
+        structures (call once committed): vectors to the in-process index, and the cached
+        results of the offices written are dropped (other processes see the new generation)
+        """
+        if self._written_vectors:
+            memory_vector_index.apply(self._written_vectors)
+            self._written_vectors = []
+        for office_id in self._bumped_offices:
+            search_result_cache.invalidate_office(office_id)
+        self._bumped_offices = set()
+
+    async def lock_notes(self, note_ids: Iterable[UUID]):
+        """
+        Serialize indexing per note until commit: transaction-level advisory locks, taken in
+        key order so concurrent batches cannot deadlock. Note edits are not blocked.
+        Two indexers diffing against the same stored state would both insert every new term
+        and both apply their deltas to the term statistics. Callers should read the content
+        they index after taking the locks, or an older version could overwrite a newer one.
+        """
+        keys = sorted({note_lock_key(nid) for nid in note_ids})
+        if keys:
+            await self.db.execute(
+                text("SELECT pg_advisory_xact_lock(k) FROM unnest(CAST(:keys AS bigint[])) WITH ORDINALITY AS t(k, i) ORDER BY i"),
+                {"keys": keys}
+            )
+
+    async def index_notes(self, items: Sequence[Tuple[UUID, str, Optional[UUID]]], strict: bool = False,
+                          with_vectors: bool = True, with_keywords: bool = True):
+        """
+        Index a batch of (note_id, content, office_id): one embedding call and a few bulk
+        statements for the whole batch. Does not commit. Takes the notes' locks (lock_notes).
+        strict: raise on embedding failure (callers that retry) instead of indexing keyword-only.
+        """
+        batch = {item[0]: item for item in items} # Last write per note wins
+        await self.lock_notes(batch)
+        # office_id is copied onto every search row, so searches filter without joining notes
+        offices = {nid: office_id for nid, _, office_id in batch.values()}
+
+        # 1. Generate & Save Vectors (skipped for notes whose content did not change)
+        if with_vectors:
+            await self._update_embeddings({nid: content for nid, content, _ in batch.values()}, offices, strict)
+        if with_keywords:
+            await self._update_keywords(batch, offices)
+        await self._bump_generations(offices.values())
+
+    async def _update_keywords(self, batch: Dict[UUID, Tuple[UUID, str, Optional[UUID]]], offices: Dict[UUID, Optional[UUID]]):
+        """Keyword rows of the batch, and the per-office statistics they feed"""
+        # 2. Generate & Save Blind Indexes
+        term_freqs = {nid: self._term_frequencies(content) for nid, content, _ in batch.values()}
+        if self.keyword_layout == "array":
+            changes = await self._update_term_sets(term_freqs, offices)
+        else:
+            changes = await self._update_blind_indexes(term_freqs, offices)
+
+        # 3. Document frequencies for ranking, per office (notes without an office are never searched)
+        per_office = {}
+        for nid, _, office_id in batch.values():
+            if office_id is None:
+                continue
+            added, removed, doc_delta = per_office.setdefault(office_id, (Counter(), Counter(), [0]))
+            note_added, note_removed, had_terms = changes[nid]
+            added.update(note_added)
+            removed.update(note_removed)
+            doc_delta[0] += bool(term_freqs[nid]) - had_terms
+        for office_id in sorted(per_office, key=str):
+            added, removed, doc_delta = per_office[office_id]
+            await self._update_term_stats(office_id, added, removed, doc_delta[0])
+
+    async def _bump_generations(self, office_ids: Iterable[Optional[UUID]]):
+        """New search generation for each office (in sorted order, like the term statistics)"""
+        rows = [{"office_id": o, "generation": 1} for o in sorted({o for o in office_ids if o is not None}, key=str)]
+        if not rows:
+            return
+        stmt = pg_insert(SearchGeneration).values(rows)
+        await self.db.execute(stmt.on_conflict_do_update(
+            index_elements=[SearchGeneration.office_id],
+            set_={"generation": SearchGeneration.generation + 1}
+        ))
+        self._bumped_offices.update(r["office_id"] for r in rows)
+
+    async def _update_embeddings(self, contents: Dict[UUID, str], offices: Dict[UUID, Optional[UUID]], strict: bool = False):
+        """Upsert note vectors through the embedding cache; unchanged content is skipped"""
+        result = await self.db.execute(
+            select(NoteEmbedding.note_id, NoteEmbedding.content_key, NoteEmbedding.office_id)
+            .filter(NoteEmbedding.note_id.in_(list(contents)))
+        )
+        current = {nid: (key, office_id) for nid, key, office_id in result.all()}
+        try:
+            embedder = self._embedder or get_embedding_provider()
+            todo = []
+            for nid, content in contents.items():
+                if not content:
+                    continue
+                key, office_id = current.get(nid, (None, None))
+                if key is not None and office_id == offices[nid] and embedding_key(normalize_text(content), embedder.model) == key:
+                    note_embedding_stats.unchanged += 1
+                    continue
+                todo.append(nid)
+            if not todo:
+                return
+            embedded = await embed_notes(self.db, embedder, [contents[nid] for nid in todo])
+        except Exception as e:
+            if strict:
+                raise
+            print(f"Error generating embedding: {e}")
+            return
+
+        # Stamped with the statement's clock, not the transaction start (now()): the memory
+        # index's delta reads rely on it, see app.services.vector_memory
+        rows = [
+            {"id": uuid4(), "note_id": nid, "office_id": offices[nid], "vector": vector, "content_key": key,
+             "updated_at": func.clock_timestamp()}
+            for nid, (key, vector) in zip(todo, embedded) if vector
+        ]
+        rows.sort(key=lambda r: r["note_id"])
+        for i in range(0, len(rows), INSERT_CHUNK_ROWS):
+            stmt = pg_insert(NoteEmbedding).values(rows[i:i + INSERT_CHUNK_ROWS])
+            await self.db.execute(stmt.on_conflict_do_update(
+                index_elements=[NoteEmbedding.note_id],
+                set_={"vector": stmt.excluded.vector, "content_key": stmt.excluded.content_key,
+                      "office_id": stmt.excluded.office_id, "updated_at": stmt.excluded.updated_at}
+            ))
+        self._written_vectors.extend((offices[r["note_id"]], r["note_id"], r["vector"]) for r in rows)
+
+    async def _update_blind_indexes(self, term_freqs: Dict[UUID, Dict[str, int]],
+                                    offices: Dict[UUID, Optional[UUID]]) -> Dict[UUID, Tuple[Set[int], Set[int], bool]]:
+        """
+        Apply only the difference against the stored term hashes.
+        An edit usually changes a few words, so this touches a few rows instead of
+        rewriting all of them (no dead tuples / index churn for unchanged terms).
+        Returns note_id -> (added term keys, removed term keys, whether the note had terms before).
+        """
+        result = await self.db.execute(
+            select(BlindIndex.note_id, BlindIndex.term_hash, BlindIndex.term_freq, BlindIndex.office_id)
+            .filter(BlindIndex.note_id.in_(list(term_freqs)))
+        )
+        existing, moved = {}, set()
+        for nid, h, n, office_id in result.all():
+            existing.setdefault(nid, {})[h] = n
+            if office_id != offices[nid]: # Rows written before office_id was copied, or a moved note
+                moved.add(nid)
+
+        to_delete, changed, to_insert, changes = [], [], [], {}
+        for nid, freqs in term_freqs.items():
+            old = existing.get(nid, {})
+            removed = old.keys() - freqs.keys()
+            added = [h for h in freqs if h not in old]
+            to_delete.extend((nid, h) for h in removed)
+            changed.extend({"b_note": nid, "b_hash": h, "b_freq": n} for h, n in freqs.items() if h in old and old[h] != n)
+            to_insert.extend(
+                {"id": uuid4(), "note_id": nid, "office_id": offices[nid], "term_hash": h, "term_freq": freqs[h]}
+                for h in added
+            )
+            changes[nid] = ({term_key(h) for h in added}, {term_key(h) for h in removed}, bool(old))
+
+        for i in range(0, len(to_delete), INSERT_CHUNK_ROWS):
+            await self.db.execute(
+                delete(BlindIndex)
+                .where(tuple_(BlindIndex.note_id, BlindIndex.term_hash).in_(to_delete[i:i + INSERT_CHUNK_ROWS]))
+            )
+        # Core UPDATE on the table: through the ORM entity, a parameter list is taken as
+        # a bulk UPDATE by primary key, which these rows (keyed by note and term) do not carry
+        table = BlindIndex.__table__
+        if changed:
+            await self.db.execute(
+                update(table)
+                .where(table.c.note_id == bindparam("b_note"), table.c.term_hash == bindparam("b_hash"))
+                .values(term_freq=bindparam("b_freq")),
+                changed
+            )
+        if moved:
+            await self.db.execute(
+                update(table)
+                .where(table.c.note_id == bindparam("b_note"))
+                .values(office_id=bindparam("b_office")),
+                [{"b_note": nid, "b_office": offices[nid]} for nid in sorted(moved)]
+            )
+        for i in range(0, len(to_insert), INSERT_CHUNK_ROWS):
+            await self.db.execute(insert(BlindIndex).values(to_insert[i:i + INSERT_CHUNK_ROWS]))
+
+        return changes
+
+    async def _update_term_sets(self, term_freqs: Dict[UUID, Dict[str, int]],
+                                offices: Dict[UUID, Optional[UUID]]) -> Dict[UUID, Tuple[Set[int], Set[int], bool]]:
+        """Upsert each note's term-key array (skipped when unchanged, to avoid a dead tuple)"""
+        result = await self.db.execute(
+            select(NoteTermSet.note_id, NoteTermSet.term_keys, NoteTermSet.term_freqs, NoteTermSet.office_id)
+            .filter(NoteTermSet.note_id.in_(list(term_freqs)))
+        )
+        existing, stored_offices = {}, {}
+        for nid, keys, freqs, office_id in result.all():
+            existing[nid] = dict(zip(keys, freqs))
+            stored_offices[nid] = office_id
+
+        rows, changes = [], {}
+        for nid, freqs in term_freqs.items():
+            new = {}
+            for h, n in freqs.items():
+                key = term_key(h)
+                new[key] = min(new.get(key, 0) + n, 32767) # smallint
+            old = existing.get(nid)
+            if old is None or old != new or stored_offices[nid] != offices[nid]:
+                keys = sorted(new)
+                rows.append({"note_id": nid, "office_id": offices[nid], "term_keys": keys, "term_freqs": [new[k] for k in keys]})
+            old = old or {}
+            changes[nid] = (new.keys() - old.keys(), old.keys() - new.keys(), bool(old))
+
+        rows.sort(key=lambda r: r["note_id"])
+        for i in range(0, len(rows), INSERT_CHUNK_ROWS):
+            stmt = pg_insert(NoteTermSet).values(rows[i:i + INSERT_CHUNK_ROWS])
+            await self.db.execute(stmt.on_conflict_do_update(
+                index_elements=[NoteTermSet.note_id],
+                set_={"term_keys": stmt.excluded.term_keys, "term_freqs": stmt.excluded.term_freqs,
+                      "office_id": stmt.excluded.office_id}
+            ))
+        return changes
+
+    async def _update_term_stats(self, office_id: UUID, added: Counter, removed: Counter, doc_delta: int):
+        """
+        Apply document-frequency deltas (term key -> notes gained / lost) and the
+        document-count delta for one office.
+        Keys are locked in sorted order so concurrent indexers cannot deadlock.
+        """
+        if added:
+            rows = [{"office_id": office_id, "term_key": k, "doc_freq": added[k]} for k in sorted(added)]
+            for i in range(0, len(rows), INSERT_CHUNK_ROWS):
+                stmt = pg_insert(SearchTermStat).values(rows[i:i + INSERT_CHUNK_ROWS])
+                await self.db.execute(stmt.on_conflict_do_update(
+                    index_elements=[SearchTermStat.office_id, SearchTermStat.term_key],
+                    set_={"doc_freq": SearchTermStat.doc_freq + stmt.excluded.doc_freq}
+                ))
+        if removed:
+            table = SearchTermStat.__table__ # Core UPDATE, see _update_blind_indexes
+            await self.db.execute(
+                update(table)
+                .where(table.c.office_id == office_id, table.c.term_key == bindparam("b_key"))
+                .values(doc_freq=table.c.doc_freq - bindparam("b_count")),
+                [{"b_key": k, "b_count": removed[k]} for k in sorted(removed)]
+            )
+        if doc_delta:
+            stmt = pg_insert(SearchOfficeStat).values(office_id=office_id, doc_count=max(doc_delta, 0))
+            await self.db.execute(stmt.on_conflict_do_update(
+                index_elements=[SearchOfficeStat.office_id],
+                set_={"doc_count": SearchOfficeStat.doc_count + doc_delta}
+            ))
+
+    async def _term_weights(self, keys: List[int], tenant_id: UUID) -> Dict[int, float]:
+        """idf per query term key, from the office's statistics"""
+        doc_count = (await self.db.execute(
+            select(SearchOfficeStat.doc_count).filter(SearchOfficeStat.office_id == tenant_id)
+        )).scalar() or 0
+        result = await self.db.execute(
+            select(SearchTermStat.term_key, SearchTermStat.doc_freq)
+            .filter(SearchTermStat.office_id == tenant_id, SearchTermStat.term_key.in_(keys))
+        )
+        doc_freqs = dict(result.all())
+        return {k: bm25_idf(doc_freqs.get(k, 0), max(doc_count, doc_freqs.get(k, 0))) for k in keys}
+
+    async def _keyword_search(self, query_hashes: List[str], tenant_id: UUID, limit: int = 10, mode: str = "or") -> List[Tuple[UUID, float, int]]:
+        """
+        Top `limit` notes by BM25 score (b = 0) as (note_id, score, matched_terms).
+        mode "and" keeps only notes containing every query term, "or" any of them.
+        Scoring, filtering and the cut-off all happen in SQL.
+        """
+        keys_by_hash = {h: term_key(h) for h in query_hashes}
+        weights = await self._term_weights(sorted(set(keys_by_hash.values())), tenant_id)
+
+        if self.keyword_layout == "array":
+            # GIN-indexed overlap (&&) finds candidates, unnest scores only the query terms
+            terms = (
+                func.unnest(NoteTermSet.term_keys, NoteTermSet.term_freqs)
+                .table_valued(column("key", BigInteger), column("tf", Integer))
+                .lateral("terms")
+            )
+            note_id, key, tf = NoteTermSet.note_id, terms.c.key, terms.c.tf
+            weight = case(weights, value=key)
+            stmt = (
+                select(note_id)
+                .select_from(NoteTermSet)
+                .join(terms, true())
+                .filter(NoteTermSet.office_id == tenant_id, NoteTermSet.term_keys.overlap(sorted(weights)))
+                .filter(key.in_(sorted(weights)))
+            )
+            n_terms = len(weights)
+        else:
+            note_id, tf = BlindIndex.note_id, BlindIndex.term_freq
+            weight = case({h: weights[k] for h, k in keys_by_hash.items()}, value=BlindIndex.term_hash)
+            # One (office_id, term_hash) range per query term, index-only
+            stmt = (
+                select(note_id)
+                .filter(BlindIndex.office_id == tenant_id, BlindIndex.term_hash.in_(list(keys_by_hash)))
+            )
+            n_terms = len(keys_by_hash)
+
+        score = func.sum(weight * tf * (BM25_K1 + 1) / (tf + BM25_K1)).label("score")
+        matched = func.count().label("matched")
+        stmt = (
+            stmt.add_columns(score, matched)
+            .group_by(note_id)
+            .order_by(desc("score"), desc("matched"), note_id)
+            .limit(limit)
+        )
+        if mode == "and":
+            stmt = stmt.having(func.count() == n_terms)
+        result = await self.db.execute(stmt)
+        return [(row[0], float(row[1]), row[2]) for row in result.all()]
+
+    async def _semantic_search(self, vector: List[float], tenant_id: UUID, limit: int,
+                               generation: Optional[int] = None) -> List[UUID]:
+        """
+        Nearest notes of the tenant by cosine distance, through the HNSW index
+        (ix_note_embeddings_vector_hnsw, vector_cosine_ops).
+        A plain HNSW scan returns the ef_search nearest vectors of *all* offices and only
+        then applies the office filter, so a small office would get few or no rows back.
+        With iterative scans (pgvector >= 0.8) the index keeps scanning until `limit` rows
+        pass the filter, or hnsw.max_scan_tuples is reached.
+        With SEARCH_VECTOR_BACKEND = "memory", offices small enough are scanned exactly in
+        process instead (app.services.vector_memory); `generation` (the office's search
+        generation as read by search_notes) makes it catch up first if its copy is older.
+        """
+        if self.vector_backend == "memory":
+            found = await memory_vector_index.search(self.db, tenant_id, vector, limit, generation=generation)
+            if found is not None:
+                return found
+
+        # Non-full storage: more candidates from the compact index, exact re-rank afterwards
+        fetch = limit if self.vector_storage == "full" else limit * settings.SEARCH_VECTOR_RERANK_FACTOR
+
+        # Transaction-local settings
+        settings_sql = [func.set_config("hnsw.ef_search", str(max(settings.SEARCH_HNSW_EF_SEARCH, fetch)), True)]
+        if settings.SEARCH_HNSW_ITERATIVE_SCAN != "off": # Parameters only exist from pgvector 0.8
+            settings_sql += [
+                func.set_config("hnsw.iterative_scan", settings.SEARCH_HNSW_ITERATIVE_SCAN, True),
+                func.set_config("hnsw.max_scan_tuples", str(settings.SEARCH_HNSW_MAX_SCAN_TUPLES), True),
+            ]
+        await self.db.execute(select(*settings_sql))
+        if self.vector_storage == "full":
+            distance = NoteEmbedding.vector.cosine_distance(vector).label("distance")
+            nearest = (
+                select(NoteEmbedding.note_id, distance)
+                .filter(NoteEmbedding.office_id == tenant_id)
+                .order_by(distance)
+                .limit(limit)
+                .cte("nearest")
+                .prefix_with("MATERIALIZED")
+            )
+            # relaxed_order may return rows slightly out of order: re-sort the (small) result
+            result = await self.db.execute(select(nearest.c.note_id).order_by(nearest.c.distance))
+            return result.scalars().all()
+
+        candidates = (
+            select(NoteEmbedding.note_id, NoteEmbedding.vector)
+            .filter(NoteEmbedding.office_id == tenant_id)
+            .order_by(self._candidate_distance(vector))
+            .limit(fetch)
+            .cte("candidates")
+            .prefix_with("MATERIALIZED")
+        )
+        # Exact cosine distance on the float32 vectors of the candidates only
+        result = await self.db.execute(
+            select(candidates.c.note_id).order_by(candidates.c.vector.cosine_distance(vector)).limit(limit)
+        )
+        return result.scalars().all()
+
+    def _candidate_distance(self, vector: List[float]):
+        """
+        Approximate distance for the storage mode. Must stay the same expression as the
+        VECTOR_INDEXES entry (constants inlined, not bound) or Postgres will not use the index.
+        """
+        dims = NoteEmbedding.vector.type.dim
+        if self.vector_storage == "halfvec":
+            return cast(NoteEmbedding.vector, HALFVEC(dims)).cosine_distance(vector)
+        if self.vector_storage == "subvector":
+            sub = settings.SEARCH_VECTOR_SUBVECTOR_DIMS
+            column_sub = func.subvector(NoteEmbedding.vector, literal_column("1"), literal_column(str(sub)))
+            return cast(column_sub, Vector(sub)).cosine_distance(vector[:sub])
+        if self.vector_storage == "binary":
+            # Same bits as binary_quantize(): 1 where the component is > 0
+            bits = "".join("1" if x > 0 else "0" for x in vector)
+            return cast(func.binary_quantize(NoteEmbedding.vector), BIT(dims)).hamming_distance(bits)
+        raise ValueError(f"Unknown SEARCH_VECTOR_STORAGE {self.vector_storage!r}")
+
+    async def search_notes(self, query: str, tenant_id: UUID, limit: int = 10, mode: str = "or") -> List[SearchHit]:
         """
         Hybrid Search:
-        1. Keyword Match (Blind Index)
+        1. Keyword Match (Blind Index), BM25-ranked
         2. Semantic Match (Vector Cosine Similarity)
-        Returns list of unique Note IDs belonging to the tenant.
+        3. Reciprocal-rank fusion of both rankings
+        In mode "and" only keyword hits (notes containing every term) are returned; the
+        semantic ranking still contributes to their order.
+        Returns at most `limit` hits for notes belonging to the tenant, best first.
+        Results are cached per office until its next index write (search_result_cache).
         """
-        note_ids = set()
+        # Read before searching: a write committed meanwhile can only make the result newer
+        generation = (await self.db.execute(
+            select(SearchGeneration.generation).filter(SearchGeneration.office_id == tenant_id)
+        )).scalar() or 0
+        cache_key = result_cache_key(query, mode, limit)
+        cached = search_result_cache.get(tenant_id, cache_key, generation)
+        if cached is not None:
+            return cached
+
+        candidates = limit * RRF_CANDIDATE_FACTOR
 
         # 1. Keyword Search
+        keyword_matches = []
         query_hashes = self._tokenize_and_hash(query)
         if query_hashes:
-            # Join with Note to filter by office_id
-            stmt = (
-                select(BlindIndex.note_id)
-                .join(Note, BlindIndex.note_id == Note.id)
-                .filter(BlindIndex.term_hash.in_(query_hashes))
-                .filter(Note.office_id == tenant_id)
-            )
-            result = await self.db.execute(stmt)
-            keyword_matches = result.scalars().all()
-            for nid in keyword_matches:
-                note_ids.add(nid)
+            keyword_matches = [nid for nid, _, _ in await self._keyword_search(query_hashes, tenant_id, candidates, mode)]
 
-        # 2. Semantic Search
-        vector = self._get_embedding(query)
+        # 2. Semantic Search (nothing to rerank when "and" found no keyword hit)
+        semantic_matches = []
+        vector = []
+        keyword_only = mode == "and"
+        if not keyword_only or keyword_matches:
+            vector = await self._get_query_embedding(query)
         if vector:
-            # Join with Note to filter by office_id
-            stmt = (
-                select(NoteEmbedding.note_id)
-                .join(Note, NoteEmbedding.note_id == Note.id)
-                .filter(Note.office_id == tenant_id)
-                .order_by(NoteEmbedding.vector.cosine_distance(vector))
-                .limit(limit)
-            )
-            result = await self.db.execute(stmt)
-            semantic_matches = result.scalars().all()
-            for nid in semantic_matches:
-                note_ids.add(nid)
-        
-        return list(note_ids)
+            semantic_matches = await self._semantic_search(vector, tenant_id, candidates, generation)
+            if keyword_only:
+                keyword_set = set(keyword_matches)
+                semantic_matches = [nid for nid in semantic_matches if nid in keyword_set]
+
+        hits = fuse_rankings(keyword_matches, semantic_matches, limit)
+        if vector or not query_hashes or (keyword_only and not keyword_matches):
+            # Not a keyword-only fallback after an embedding failure: that one is retried next time
+            search_result_cache.set(tenant_id, cache_key, generation, hits)
+        return hits
+
+def fuse_rankings(keyword_matches: List[UUID], semantic_matches: List[UUID], limit: int) -> List[SearchHit]:
+    """
+    Reciprocal-rank fusion. Ties (same fused score) go to the better single-branch rank,
+    then to note id, so the order is stable across identical requests.
+    """
+    keyword_ranks = {nid: i for i, nid in enumerate(keyword_matches, 1)}
+    semantic_ranks = {nid: i for i, nid in enumerate(semantic_matches, 1)}
+    hits = []
+    for nid in keyword_ranks.keys() | semantic_ranks.keys():
+        k_rank, s_rank = keyword_ranks.get(nid), semantic_ranks.get(nid)
+        score = sum(1.0 / (RRF_K + r) for r in (k_rank, s_rank) if r is not None)
+        hits.append(SearchHit(nid, score, k_rank, s_rank))
+    hits.sort(key=lambda h: (-h.score, min(r for r in (h.keyword_rank, h.semantic_rank) if r is not None), str(h.note_id)))
+    return hits[:limit]
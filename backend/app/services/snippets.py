@@ -0,0 +1,89 @@
+import re
+from typing import Iterable, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+from app.core.security import decrypt_chunks, run_crypto_batch
+from app.services.search_service import normalize_term
+
+# Search result snippets: a window of the note around the first query term instead of the
+# whole note. Text is consumed piece by piece (security.decrypt_chunks) and reading stops
+# once the window is filled, so the rest of a long note is never decompressed or scanned.
+
+WORD = re.compile(r"\S+")
+# Share of the window shown before the first matched term
+LEADING_CONTEXT = 0.25
+
+
+class Snippet(NamedTuple):
+    text: str # Whitespace runs collapsed to single spaces
+    start: int # Offset of the window in the note (> 0: text precedes it)
+    highlights: List[Tuple[int, int]] # [start, end) of query terms within text
+    truncated: bool # The note continues after the window
+
+def query_terms(query: str) -> Set[str]:
+    """Keyword terms of a query, in the form used for matching (see normalize_term)"""
+    return {t for t in (normalize_term(w) for w in query.split()) if t}
+
+def _find_term(text: str, terms: Set[str], pos: int, final: bool) -> Tuple[Optional[int], int]:
+    """(offset of the first query term at or after pos or None, position to resume from)"""
+    for m in WORD.finditer(text, pos):
+        if m.end() == len(text) and not final:
+            return None, m.start() # The word may continue in the next piece
+        if normalize_term(m.group()) in terms:
+            return m.start(), m.end()
+    return None, len(text)
+
+def _window_start(text: str, match: int, max_chars: int) -> int:
+    start = max(0, match - int(max_chars * LEADING_CONTEXT))
+    if start > 0:
+        # Start on a word boundary
+        boundary = re.search(r"\s", text[start:match])
+        if boundary:
+            start += boundary.end()
+    return start
+
+def build_snippet(pieces: Iterable[str], terms: Set[str], max_chars: int) -> Snippet:
+    """
+    Window of at most max_chars characters around the first term of `terms` (the start of
+    the note if none matches, or if terms is empty), reading `pieces` only as far as needed.
+    """
+    text, scanned, match = "", 0, None
+    searching = bool(terms)
+    for piece in pieces:
+        text += piece
+        if searching:
+            match, scanned = _find_term(text, terms, scanned, final=False)
+            searching = match is None
+        if not searching and len(text) > _window_start(text, match or 0, max_chars) + max_chars:
+            break
+    if searching:
+        match, _ = _find_term(text, terms, scanned, final=True)
+
+    start = _window_start(text, match or 0, max_chars)
+    end = start + max_chars
+    window = text[start:end]
+    if end < len(text):
+        # End on a word boundary, as long as the matched term stays in
+        boundary = max(window.rfind(" "), window.rfind("\n"), window.rfind("\t"))
+        if boundary > (match - start if match is not None else 0):
+            window = window[:boundary]
+
+    collapsed = " ".join(window.split())
+    highlights = []
+    for m in WORD.finditer(collapsed):
+        if normalize_term(m.group()) in terms:
+            # Highlight the word itself, not the punctuation around it
+            s, e = m.start(), m.end()
+            while not collapsed[s].isalnum():
+                s += 1
+            while not collapsed[e - 1].isalnum():
+                e -= 1
+            highlights.append((s, e))
+    return Snippet(collapsed, start, highlights, end < len(text))
+
+def _snippets(items: Sequence[Tuple[bytes, Set[str], int]]) -> List[Snippet]:
+    return [build_snippet(decrypt_chunks(ciphertext), terms, max_chars) for ciphertext, terms, max_chars in items]
+
+async def snippet_batch(items: Sequence[Tuple[bytes, Set[str], int]]) -> List[Snippet]:
+    """Snippets of many (ciphertext, terms, max_chars), in order; large batches run on the crypto pool"""
+    items = list(items)
+    return await run_crypto_batch(_snippets, items, sum(len(ciphertext) for ciphertext, _, _ in items if ciphertext))
@@ -0,0 +1,337 @@
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+
+import numpy as np
+from sqlalchemy import LargeBinary, func, literal_column, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import metrics
+from app.core.config import settings
+from app.models import NoteEmbedding, SearchGeneration
+
+# In-process semantic search backend (SEARCH_VECTOR_BACKEND = "memory").
+# Each office's embeddings are one contiguous float32 matrix of unit rows, so a query is a
+# matrix-vector product plus a partial sort: exact (no recall loss) and, up to a few tens of
+# thousands of notes, cheaper than a round-trip to the HNSW index.
+# Freshness: vectors written by this process are applied once committed
+# (SearchService.after_commit); writes from other processes are read back periodically
+# from note_embeddings.updated_at, and before a search whenever the office's search
+# generation (search_generations, bumped by every index write) differs from the one read
+# with the copy's data. Deleted rows cannot be read
+# back: an office holding more rows than the table has is reloaded. A reindex --shadow
+# swap replaces the table (new OID): offices loaded from the old one are then reloaded.
+
+# Start of the oldest transaction of this database that is writing (has an xid). Rows are
+# stamped with clock_timestamp() when written, so a row our read cannot see yet was either
+# written by such a transaction (stamp >= its start) or will be written after the read.
+# The next delta read starts from the earlier of this and now(): no commit is missed,
+# however long the writer takes to commit. (xact_start is visible for sessions of our
+# own role, which is the one every index writer uses.)
+OLDEST_WRITER_START = literal_column(
+    "(SELECT min(xact_start) FROM pg_stat_activity "
+    "WHERE backend_xid IS NOT NULL AND datname = current_database())"
+)
+# Offices over SEARCH_MEMORY_INDEX_MAX_NOTES are re-counted after this long
+TOO_LARGE_RECHECK_SECONDS = 600
+# Larger matrices are scored on a worker thread (numpy releases the GIL)
+THREAD_MIN_ROWS = 10000
+# A loaded snapshot is rewritten when this share of its rows came from the delta sync
+SNAPSHOT_REWRITE_RATIO = 0.1
+
+
+def _unit(vector) -> Optional[np.ndarray]:
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = float(np.linalg.norm(vector))
+    return vector / norm if norm else None
+
+def _from_vector_send(data: bytes) -> np.ndarray:
+    """pgvector binary format: int16 dims, int16 unused, big-endian float4 values"""
+    return np.frombuffer(data, dtype=">f4", offset=4).astype(np.float32)
+
+
+class OfficeVectors:
+    """
+    One office: `base` (a RAM array, or a copy-on-write memory map of a snapshot) plus a
+    RAM tail that appends grow into, so the base never has to be reallocated.
+    """
+
+    def __init__(self, base: np.ndarray, ids: List[UUID], synced_at: datetime, table_oid: int, generation: int):
+        self.base = base
+        self.tail = np.empty((16, base.shape[1]), dtype=np.float32)
+        self.ids = ids
+        self.rows = {nid: i for i, nid in enumerate(ids)}
+        self.synced_at = synced_at # Database clock of the last read from note_embeddings
+        self.table_oid = table_oid # note_embeddings the data came from
+        self.generation = generation # Office search generation read just before the data (-1: unknown)
+        self.checked_at = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def nbytes(self) -> int:
+        return self.base.nbytes + self.tail.nbytes + len(self.ids) * 16
+
+    @property
+    def appended(self) -> int:
+        return len(self.ids) - len(self.base)
+
+    def upsert(self, note_id: UUID, vector: np.ndarray) -> None:
+        row = self.rows.get(note_id)
+        if row is None:
+            t = self.appended
+            if t == len(self.tail):
+                grown = np.empty((2 * len(self.tail), self.tail.shape[1]), dtype=np.float32)
+                grown[:t] = self.tail[:t]
+                self.tail = grown
+            self.tail[t] = vector
+            # Published after the row is written: a concurrent search only sees complete rows
+            self.rows[note_id] = len(self.ids)
+            self.ids.append(note_id)
+        elif row < len(self.base):
+            self.base[row] = vector
+        else:
+            self.tail[row - len(self.base)] = vector
+
+    def matrix(self) -> np.ndarray:
+        return np.concatenate([self.base, self.tail[:self.appended]]) if self.appended else self.base
+
+    def search(self, query: np.ndarray, limit: int) -> List[UUID]:
+        n, base, tail = len(self.ids), self.base, self.tail
+        if not n:
+            return []
+        scores = base @ query
+        if n > len(base):
+            scores = np.concatenate([scores, tail[:n - len(base)] @ query])
+        k = min(limit, n)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [self.ids[i] for i in top]
+
+
+class MemoryVectorIndex:
+    """Per-office OfficeVectors, loaded on first search, LRU-evicted above max_bytes"""
+
+    def __init__(self, max_bytes: int, max_notes: int, sync_seconds: float, directory: Optional[str] = None):
+        self.max_bytes = max_bytes
+        self.max_notes = max_notes
+        self.sync_seconds = sync_seconds
+        self.directory = directory
+        self.dims = NoteEmbedding.vector.type.dim
+        self._offices: "OrderedDict[UUID, OfficeVectors]" = OrderedDict()
+        self._too_large: Dict[UUID, float] = {} # office -> monotonic time of the next recount
+        self._loading: Dict[UUID, asyncio.Lock] = {}
+        self.hits = 0
+        self.loads = 0
+        self.snapshot_loads = 0
+        self.syncs = 0
+        self.evictions = 0
+        self.fallbacks = 0
+
+    async def search(self, db: AsyncSession, office_id: UUID, vector: List[float], limit: int,
+                     generation: Optional[int] = None) -> Optional[List[UUID]]:
+        """
+        Top `limit` note ids by cosine similarity; None if the office is left to pgvector.
+        generation: the office's current search generation; a copy read at another one syncs first.
+        """
+        office = await self._get(db, office_id, generation)
+        if office is None:
+            self.fallbacks += 1
+            return None
+        query = _unit(vector)
+        if query is None:
+            return []
+        if len(office) >= THREAD_MIN_ROWS:
+            return await asyncio.to_thread(office.search, query, limit)
+        return office.search(query, limit)
+
+    def apply(self, written: Iterable[Tuple[Optional[UUID], UUID, List[float]]]) -> None:
+        """Committed (office_id, note_id, vector) writes of this process; unloaded offices are skipped"""
+        for office_id, note_id, vector in written:
+            office = self._offices.get(office_id)
+            unit = _unit(vector) if office is not None else None
+            if unit is not None:
+                office.upsert(note_id, unit)
+        self._evict()
+
+    def clear(self) -> None:
+        self._offices.clear()
+        self._too_large.clear()
+
+    async def _get(self, db: AsyncSession, office_id: UUID, generation: Optional[int] = None) -> Optional[OfficeVectors]:
+        office = self._offices.get(office_id)
+        if office is not None:
+            self.hits += 1
+            self._offices.move_to_end(office_id)
+            if time.monotonic() - office.checked_at < self.sync_seconds and (
+                generation is None or office.generation == generation
+            ):
+                return office
+            office.checked_at = time.monotonic() # One sync at a time per office
+            if await self._sync(db, office_id, office):
+                return office
+            self._offices.pop(office_id, None) # Table replaced or rows deleted: reload below
+        if self._too_large.get(office_id, 0) > time.monotonic():
+            return None
+
+        # One load per office, however many searches arrive meanwhile
+        lock = self._loading.setdefault(office_id, asyncio.Lock())
+        async with lock:
+            office = self._offices.get(office_id)
+            if office is None:
+                office = await self._load(db, office_id)
+                if office is None:
+                    return None
+                self._offices[office_id] = office
+                self._evict(keep=office_id)
+        self._loading.pop(office_id, None)
+        return office
+
+    async def _load(self, db: AsyncSession, office_id: UUID) -> Optional[OfficeVectors]:
+        count = (await db.execute(
+            select(func.count()).select_from(NoteEmbedding).filter(NoteEmbedding.office_id == office_id)
+        )).scalar()
+        if count > self.max_notes:
+            self._too_large[office_id] = time.monotonic() + TOO_LARGE_RECHECK_SECONDS
+            return None
+        self._too_large.pop(office_id, None)
+
+        office = await asyncio.to_thread(self._read_snapshot, office_id) if self.directory else None
+        if office is not None and await self._sync(db, office_id, office):
+            self.snapshot_loads += 1
+            if office.appended > SNAPSHOT_REWRITE_RATIO * max(len(office.base), 1):
+                await asyncio.to_thread(self._write_snapshot, office_id, office)
+        else:
+            synced_at, table_oid, generation, rows = await self._fetch(db, office_id)
+            base = np.empty((len(rows), self.dims), dtype=np.float32)
+            ids = []
+            for note_id, vector in rows:
+                if vector is not None:
+                    base[len(ids)] = vector
+                    ids.append(note_id)
+            office = OfficeVectors(base[:len(ids)], ids, synced_at, table_oid, generation)
+            if self.directory:
+                await asyncio.to_thread(self._write_snapshot, office_id, office)
+        self.loads += 1
+        return office
+
+    async def _fetch(self, db: AsyncSession, office_id: UUID, since: Optional[datetime] = None):
+        """
+        (time to sync from next, table OID, office search generation, [(note_id, unit vector or None)])
+        for the office, changed since `since`. The generation is read before the rows, so
+        the rows include every write up to it.
+        """
+        synced_at, table_oid, generation = (await db.execute(
+            select(
+                func.least(func.now(), OLDEST_WRITER_START), text("'note_embeddings'::regclass::oid::bigint"),
+                func.coalesce(
+                    select(SearchGeneration.generation).filter(SearchGeneration.office_id == office_id).scalar_subquery(), 0
+                ),
+            )
+        )).one()
+        # Binary send format instead of the text form: no float parsing for thousands of rows
+        stmt = (
+            select(NoteEmbedding.note_id, func.vector_send(NoteEmbedding.vector, type_=LargeBinary))
+            .filter(NoteEmbedding.office_id == office_id, NoteEmbedding.vector.isnot(None))
+        )
+        if since is not None:
+            stmt = stmt.filter(NoteEmbedding.updated_at >= since)
+        result = await db.execute(stmt)
+        return synced_at, table_oid, generation, [(note_id, _unit(_from_vector_send(data))) for note_id, data in result.all()]
+
+    async def _sync(self, db: AsyncSession, office_id: UUID, office: OfficeVectors) -> bool:
+        """Apply rows changed since the office's last read; False if it must be reloaded"""
+        synced_at, table_oid, generation, rows = await self._fetch(db, office_id, since=office.synced_at)
+        if table_oid != office.table_oid:
+            return False
+        for note_id, vector in rows:
+            if vector is not None:
+                office.upsert(note_id, vector)
+        # Counted after the delta read: rows inserted meanwhile cannot trigger a reload
+        count = (await db.execute(
+            select(func.count()).select_from(NoteEmbedding).filter(NoteEmbedding.office_id == office_id)
+        )).scalar()
+        if len(office) > count: # Notes deleted (or moved to another office)
+            return False
+        office.synced_at = synced_at
+        office.generation = generation
+        office.checked_at = time.monotonic()
+        self.syncs += 1
+        return True
+
+    def _evict(self, keep: Optional[UUID] = None) -> None:
+        total = sum(o.nbytes for o in self._offices.values())
+        for office_id in list(self._offices):
+            if total <= self.max_bytes:
+                break
+            if office_id != keep:
+                total -= self._offices.pop(office_id).nbytes
+                self.evictions += 1
+
+    # --- Snapshots (SEARCH_MEMORY_INDEX_DIR) ---
+    # {office}.npy: matrix, {office}.ids.npy: note ids (n x 16 bytes), {office}.json: row
+    # count, database time of the data and table OID. Each file is replaced atomically and the json last;
+    # a reader that sees mismatched row counts (writer in between) ignores the snapshot.
+
+    def _paths(self, office_id: UUID) -> Tuple[str, str, str]:
+        base = os.path.join(self.directory, str(office_id))
+        return f"{base}.npy", f"{base}.ids.npy", f"{base}.json"
+
+    def _read_snapshot(self, office_id: UUID) -> Optional[OfficeVectors]:
+        matrix_path, ids_path, meta_path = self._paths(office_id)
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            # Copy-on-write map: pages stay in the (shared) page cache, updates stay private
+            matrix = np.load(matrix_path, mmap_mode="c")
+            ids = np.load(ids_path)
+        except (OSError, ValueError, KeyError):
+            return None
+        if not (len(matrix) == len(ids) == meta["rows"]) or matrix.shape[1:] != (self.dims,):
+            return None
+        return OfficeVectors(
+            matrix, [UUID(bytes=row.tobytes()) for row in ids],
+            datetime.fromisoformat(meta["synced_at"]), meta["table_oid"], -1, # Set by the sync that follows
+        )
+
+    def _write_snapshot(self, office_id: UUID, office: OfficeVectors) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        matrix = office.matrix()
+        ids = np.frombuffer(b"".join(nid.bytes for nid in office.ids[:len(matrix)]), dtype=np.uint8).reshape(-1, 16)
+        meta = {"rows": len(matrix), "synced_at": office.synced_at.isoformat(), "table_oid": office.table_oid}
+        for path, write in zip(self._paths(office_id), (
+            lambda f: np.save(f, matrix), lambda f: np.save(f, ids), lambda f: f.write(json.dumps(meta).encode())
+        )):
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                write(f)
+            os.replace(tmp, path)
+
+    def stats(self) -> dict:
+        return {
+            "offices": len(self._offices),
+            "notes": sum(len(o) for o in self._offices.values()),
+            "bytes": sum(o.nbytes for o in self._offices.values()),
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "loads": self.loads,
+            "snapshot_loads": self.snapshot_loads,
+            "syncs": self.syncs,
+            "evictions": self.evictions,
+            "pgvector_fallbacks": self.fallbacks,
+        }
+
+
+memory_vector_index = MemoryVectorIndex(
+    max_bytes=settings.SEARCH_MEMORY_INDEX_MAX_BYTES,
+    max_notes=settings.SEARCH_MEMORY_INDEX_MAX_NOTES,
+    sync_seconds=settings.SEARCH_MEMORY_INDEX_SYNC_SECONDS,
+    directory=settings.SEARCH_MEMORY_INDEX_DIR,
+)
+metrics.register("search_memory_index", memory_vector_index.stats)
@@ -0,0 +1,5 @@
+"""
+Standalone benchmark scripts. Run from the backend/ directory, e.g.
+
+    python -m benchmarks.bench_password_hashing
+"""
@@ -0,0 +1,103 @@
+"""
+Blind-index maintenance on note edits: full rewrite (old) vs diff (SearchService).
+
+Needs a migrated database (uses the app's DB settings). Creates a scratch office,
+patient and notes, indexes them, then applies N small edits per note (one sentence
+replaced, as a typical correction would) with each strategy and reports per-edit
+latency plus rows inserted/deleted and table size growth from pg_stat_user_tables.
+Scratch rows are removed at the end.
+
+    python -m benchmarks.bench_blind_index --notes 200 --edits 10
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from datetime import date
+
+from sqlalchemy import delete, text
+
+from app.db.session import SessionLocal
+from app.models import BlindIndex, Note, Office, Patient
+from app.services.search_service import SearchService
+from benchmarks.corpus import generate_notes, generate_sentence
+
+
+async def rewrite_all(service: SearchService, note, term_freqs):
+    """Previous behaviour: delete every row for the note, insert every term again"""
+    await service.db.execute(delete(BlindIndex).where(BlindIndex.note_id == note.id))
+    for h, n in term_freqs.items():
+        service.db.add(BlindIndex(note_id=note.id, office_id=note.office_id, term_hash=h, term_freq=n))
+
+
+async def diff(service: SearchService, note, term_freqs):
+    await service._update_blind_indexes({note.id: term_freqs}, {note.id: note.office_id})
+
+
+async def table_stats(db) -> dict:
+    await db.execute(text("SELECT pg_stat_clear_snapshot()"))
+    row = (await db.execute(text(
+        "SELECT n_tup_ins, n_tup_del, n_dead_tup, pg_total_relation_size('blind_indexes') "
+        "FROM pg_stat_user_tables WHERE relname = 'blind_indexes'"
+    ))).first()
+    return {"ins": row[0], "del": row[1], "dead": row[2], "bytes": row[3]}
+
+
+def edit(content: str, rng: random.Random) -> str:
+    sentences = content.split(". ")
+    sentences[rng.randrange(len(sentences))] = generate_sentence(rng).rstrip(".")
+    return ". ".join(sentences)
+
+
+async def run(args):
+    rng = random.Random(1)
+    async with SessionLocal() as db:
+        office = Office(name="bench-blind-index")
+        db.add(office)
+        await db.flush()
+        patient = Patient(first_name="Bench", last_name="Mark", last_name_hash="bench", dob=date(1990, 1, 1), office_id=office.id)
+        db.add(patient)
+        await db.flush()
+        contents = list(generate_notes(args.notes))
+        notes = [Note(patient_id=patient.id, content=c, office_id=office.id) for c in contents]
+        db.add_all(notes)
+        await db.commit()
+        service = SearchService(db)
+        await service._update_blind_indexes(
+            {n.id: service._term_frequencies(c) for n, c in zip(notes, contents)}, {n.id: office.id for n in notes}
+        )
+        await db.commit()
+
+        try:
+            for name, strategy in (("rewrite", rewrite_all), ("diff", diff)):
+                before = await table_stats(db)
+                timings = []
+                for _ in range(args.edits):
+                    for i, n in enumerate(notes):
+                        contents[i] = edit(contents[i], rng)
+                        start = time.perf_counter()
+                        await strategy(service, n, service._term_frequencies(contents[i]))
+                        await db.commit()
+                        timings.append((time.perf_counter() - start) * 1000)
+                await asyncio.sleep(1) # stats collector lag
+                after = await table_stats(db)
+                timings.sort()
+                print(f"{name:>8}: edits={len(timings)} p50={statistics.median(timings):.2f}ms "
+                      f"p95={timings[int(len(timings) * 0.95)]:.2f}ms "
+                      f"rows_inserted={after['ins'] - before['ins']} rows_deleted={after['del'] - before['del']} "
+                      f"dead_tuples={after['dead']} size_growth={(after['bytes'] - before['bytes']) / 1024:.0f}KiB")
+        finally:
+            ids = [n.id for n in notes]
+            await db.execute(delete(BlindIndex).where(BlindIndex.note_id.in_(ids)))
+            await db.execute(delete(Note).where(Note.id.in_(ids)))
+            await db.execute(delete(Patient).where(Patient.id == patient.id))
+            await db.execute(delete(Office).where(Office.id == office.id))
+            await db.commit()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--notes", type=int, default=200)
+    parser.add_argument("--edits", type=int, default=10, help="edits per note, per strategy")
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,87 @@
+"""
+Inline vs thread-pool batch decryption, to pick DECRYPT_BATCH_INLINE_MAX_BYTES.
+
+For each (note length, batch size) we time decrypt_many on the event loop thread and
+the pooled path of decrypt_batch, and report the smallest batch at which the pool wins.
+Wall time alone under-sells the pool: inline work also blocks every other request,
+so the longest event-loop stall on the pooled path is reported alongside
+(inline, the loop is stalled for the whole inline_ms).
+
+    CRYPTO_WORKERS=4 python -m benchmarks.bench_decrypt_batch
+"""
+import argparse
+import asyncio
+import time
+
+from app.core import security
+from app.core.config import settings
+
+
+def timed(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+async def pooled(values) -> float:
+    """Run the pool path; return the longest event-loop stall seen meanwhile (ms)"""
+    threshold = settings.DECRYPT_BATCH_INLINE_MAX_BYTES
+    settings.DECRYPT_BATCH_INLINE_MAX_BYTES = -1 # force the pool path
+    done = False
+    max_stall = 0.0
+
+    async def ticker():
+        nonlocal max_stall
+        last = time.perf_counter()
+        while not done:
+            await asyncio.sleep(0)
+            now = time.perf_counter()
+            max_stall = max(max_stall, now - last)
+            last = now
+
+    tick_task = asyncio.create_task(ticker())
+    try:
+        await security.decrypt_batch(values)
+    finally:
+        settings.DECRYPT_BATCH_INLINE_MAX_BYTES = threshold
+        done = True
+        await tick_task
+    return max_stall * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lengths", default="200,2000,8000", help="plaintext chars per note")
+    parser.add_argument("--batches", default="1,2,4,8,16,32,64,128,256,512")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    lengths = [int(x) for x in args.lengths.split(",")]
+    batches = [int(x) for x in args.batches.split(",")]
+    loop = asyncio.new_event_loop()
+    print(f"workers={settings.CRYPTO_WORKERS} current threshold={settings.DECRYPT_BATCH_INLINE_MAX_BYTES} bytes")
+    print(f"{'chars':>6} {'batch':>6} {'bytes':>9} {'inline_ms':>10} {'pool_ms':>9} {'pool_max_stall_ms':>18}")
+
+    for length in lengths:
+        plaintext = ("Pt presents w/ sensitivity #19 MOD, recommend crown prep. " * (length // 58 + 1))[:length]
+        crossover = None
+        for batch in batches:
+            values = [security.encrypt_data(plaintext) for _ in range(batch)]
+            total_bytes = sum(len(v) for v in values)
+            inline_ms = timed(lambda: security.decrypt_many(values), args.repeat)
+            stalls = []
+            pool_ms = timed(lambda: stalls.append(loop.run_until_complete(pooled(values))), args.repeat)
+            stall_ms = min(stalls)
+            if crossover is None and pool_ms < inline_ms:
+                crossover = total_bytes
+            print(f"{length:>6} {batch:>6} {total_bytes:>9} {inline_ms:>10.2f} {pool_ms:>9.2f} {stall_ms:>18.3f}")
+        print(f"  -> pool faster from ~{crossover} ciphertext bytes" if crossover else "  -> inline always faster")
+
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()
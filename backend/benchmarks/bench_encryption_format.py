@@ -0,0 +1,45 @@
+"""
+Legacy Fernet (base64 text) vs the v1 AES-GCM envelope (bytea).
+
+Reports encrypt/decrypt throughput and stored bytes per note for a few note sizes
+(the "aesgcm" rows use encrypt_data, so run with the default ENCRYPTION_FORMAT).
+
+    python -m benchmarks.bench_encryption_format --iterations 2000
+"""
+import argparse
+import time
+
+from app.core import security
+
+
+def throughput(fn, payloads, iterations: int) -> float:
+    """Operations per second over `iterations` calls cycling through payloads"""
+    start = time.perf_counter()
+    for i in range(iterations):
+        fn(payloads[i % len(payloads)])
+    return iterations / (time.perf_counter() - start)
+
+
+def fernet_encrypt(plaintext: str) -> bytes:
+    return security.fernet.encrypt(plaintext.encode())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="64,400,2000,8000", help="plaintext chars per note")
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{'chars':>6} {'format':>7} {'bytes':>7} {'x_plain':>8} {'enc_ops/s':>10} {'dec_ops/s':>10} {'dec_MB/s':>9}")
+    for size in (int(x) for x in args.sizes.split(",")):
+        plaintext = ("Tooth #30 MOD composite, pt tolerated well, no post-op sensitivity. " * (size // 68 + 1))[:size]
+        for name, encrypt in (("fernet", fernet_encrypt), ("aesgcm", security.encrypt_data)):
+            samples = [encrypt(plaintext) for _ in range(16)]
+            stored = len(samples[0])
+            enc = throughput(encrypt, [plaintext], args.iterations)
+            dec = throughput(security.decrypt_data, samples, args.iterations)
+            print(f"{size:>6} {name:>7} {stored:>7} {stored / size:>8.2f} {enc:>10.0f} {dec:>10.0f} {dec * size / 1e6:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Keyword index layouts: blind_indexes (row per note/term) vs note_term_sets (bigint[] + GIN).
+
+Needs a migrated database (uses the app's DB settings). Creates a scratch office,
+patient and notes, indexes them in both layouts, then reports storage growth of each
+table (heap + indexes) and per-query latency of SearchService._keyword_search for
+generated 1-3 term queries (ranked, top --limit). Both layouts must return the same notes. Scratch rows are
+removed at the end. Size numbers are only meaningful on an otherwise quiet database.
+
+    python -m benchmarks.bench_keyword_layout --notes 20000 --queries 200
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import date
+
+from sqlalchemy import delete, text
+
+from app.db.session import SessionLocal
+from app.models import BlindIndex, Note, NoteTermSet, Office, Patient, SearchGeneration, SearchOfficeStat, SearchTermStat
+from app.services.search_service import SearchService
+from benchmarks.corpus import generate_notes, generate_queries
+
+TABLES = {"rows": "blind_indexes", "array": "note_term_sets"}
+
+
+async def table_sizes(db) -> dict:
+    sizes = {}
+    for layout, table in TABLES.items():
+        row = (await db.execute(text(
+            "SELECT pg_relation_size(:t), pg_indexes_size(:t)"
+        ), {"t": table})).first()
+        sizes[layout] = {"heap": row[0], "index": row[1]}
+    return sizes
+
+
+async def run(args):
+    async with SessionLocal() as db:
+        office = Office(name="bench-keyword-layout")
+        db.add(office)
+        await db.flush()
+        patient = Patient(first_name="Bench", last_name="Mark", last_name_hash="bench", dob=date(1990, 1, 1), office_id=office.id)
+        db.add(patient)
+        await db.flush()
+        contents = list(generate_notes(args.notes))
+        notes = [Note(patient_id=patient.id, content=c, office_id=office.id) for c in contents]
+        db.add_all(notes)
+        await db.commit()
+
+        services = {layout: SearchService(db, keyword_layout=layout) for layout in TABLES}
+        try:
+            before = await table_sizes(db)
+            for layout, service in services.items():
+                start = time.perf_counter()
+                # Office term statistics are shared by both layouts: each layout rebuilds them
+                await db.execute(delete(SearchTermStat).where(SearchTermStat.office_id == office.id))
+                await db.execute(delete(SearchOfficeStat).where(SearchOfficeStat.office_id == office.id))
+                for i in range(0, len(notes), 500):
+                    batch = [(n.id, c, office.id) for n, c in zip(notes[i:i + 500], contents[i:i + 500])]
+                    await service.index_notes(batch, with_vectors=False)
+                    await db.commit()
+                print(f"{layout:>6}: indexed {len(notes)} notes in {time.perf_counter() - start:.1f}s")
+            await db.execute(text("ANALYZE blind_indexes"))
+            await db.execute(text("ANALYZE note_term_sets"))
+            after = await table_sizes(db)
+
+            print(f"{'layout':>6} {'heap_MB':>8} {'index_MB':>9} {'B/note':>7} {'q_p50_ms':>9} {'q_p95_ms':>9} {'hits/q':>7}")
+            queries = generate_queries(args.queries)
+            results = {}
+            for layout, service in services.items():
+                timings, hits = [], []
+                for q in queries:
+                    query_hashes = service._tokenize_and_hash(q)
+                    start = time.perf_counter()
+                    found = await service._keyword_search(query_hashes, office.id, limit=args.limit, mode=args.mode)
+                    timings.append((time.perf_counter() - start) * 1000)
+                    hits.append(len(found))
+                    results.setdefault(q, {})[layout] = [nid for nid, _, _ in found]
+                timings.sort()
+                heap = after[layout]["heap"] - before[layout]["heap"]
+                index = after[layout]["index"] - before[layout]["index"]
+                print(f"{layout:>6} {heap / 1e6:>8.2f} {index / 1e6:>9.2f} {(heap + index) // len(notes):>7} "
+                      f"{statistics.median(timings):>9.2f} {timings[int(len(timings) * 0.95)]:>9.2f} "
+                      f"{statistics.mean(hits):>7.0f}")
+            mismatches = sum(1 for r in results.values() if r["rows"] != r["array"])
+            print(f"result mismatches between layouts: {mismatches}/{len(queries)}")
+        finally:
+            ids = [n.id for n in notes]
+            await db.execute(delete(BlindIndex).where(BlindIndex.note_id.in_(ids)))
+            await db.execute(delete(NoteTermSet).where(NoteTermSet.note_id.in_(ids)))
+            await db.execute(delete(SearchTermStat).where(SearchTermStat.office_id == office.id))
+            await db.execute(delete(SearchOfficeStat).where(SearchOfficeStat.office_id == office.id))
+            await db.execute(delete(SearchGeneration).where(SearchGeneration.office_id == office.id))
+            await db.execute(delete(Note).where(Note.id.in_(ids)))
+            await db.execute(delete(Patient).where(Patient.id == patient.id))
+            await db.execute(delete(Office).where(Office.id == office.id))
+            await db.commit()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--notes", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--mode", choices=["or", "and"], default="or")
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,107 @@
+"""
+Semantic search of one office: pgvector (HNSW, SearchService._semantic_search) vs the
+in-process matrix of app.services.vector_memory.
+
+Needs a migrated database (uses the app's DB settings). Creates a scratch office, patient
+and --notes notes, embeds them with the offline hash provider, then reports:
+  - cold load of the office into memory (from Postgres, and from a snapshot with --dir)
+  - per-query latency of both backends (embedding time excluded), warm
+  - overlap@limit of the HNSW results with the exact in-memory ranking
+Scratch rows are removed at the end.
+
+    python -m benchmarks.bench_memory_vectors --notes 20000 --queries 200
+    python -m benchmarks.bench_memory_vectors --notes 50000 --dir /tmp/vector-snapshots
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import date
+
+from sqlalchemy import delete, select, text
+
+from app.db.session import SessionLocal
+from app.models import EmbeddingCacheEntry, Note, NoteEmbedding, Office, Patient, SearchGeneration
+from app.services.embeddings import HashEmbeddingProvider
+from app.services.search_service import SearchService
+from app.services.vector_memory import MemoryVectorIndex
+from benchmarks.corpus import generate_notes, generate_queries
+
+
+def summary(timings) -> str:
+    timings = sorted(timings)
+    return f"p50 {statistics.median(timings):.2f} ms, p95 {timings[int(len(timings) * 0.95)]:.2f} ms"
+
+
+async def run(args):
+    embedder = HashEmbeddingProvider(1536)
+    async with SessionLocal() as db:
+        office = Office(name="bench-memory-vectors")
+        db.add(office)
+        await db.flush()
+        patient = Patient(first_name="Bench", last_name="Mark", last_name_hash="bench", dob=date(1990, 1, 1), office_id=office.id)
+        db.add(patient)
+        await db.flush()
+        contents = list(generate_notes(args.notes))
+        notes = [Note(patient_id=patient.id, content=c, office_id=office.id) for c in contents]
+        db.add_all(notes)
+        await db.commit()
+
+        service = SearchService(db, embedder=embedder, vector_backend="pgvector")
+        try:
+            start = time.perf_counter()
+            for i in range(0, len(notes), 500):
+                batch = [(n.id, c, office.id) for n, c in zip(notes[i:i + 500], contents[i:i + 500])]
+                await service.index_notes(batch, with_keywords=False)
+                await db.commit()
+            await db.execute(text("ANALYZE note_embeddings"))
+            print(f"embedded and stored {len(notes)} notes in {time.perf_counter() - start:.1f}s")
+
+            index = MemoryVectorIndex(max_bytes=8 << 30, max_notes=10 ** 9, sync_seconds=3600, directory=args.dir)
+            start = time.perf_counter()
+            await index.search(db, office.id, [1.0] * 1536, 1)
+            stats = index.stats()
+            print(f"memory: cold load {time.perf_counter() - start:.2f}s, {stats['bytes'] / 1e6:.0f} MB")
+            if args.dir:
+                index.clear()
+                start = time.perf_counter()
+                await index.search(db, office.id, [1.0] * 1536, 1)
+                print(f"memory: load from snapshot (memory-mapped) {time.perf_counter() - start:.2f}s")
+
+            queries = generate_queries(args.queries)
+            vectors = await embedder.embed(queries)
+            timings = {"pgvector": [], "memory": []}
+            overlap = []
+            for vector in vectors:
+                if not vector:
+                    continue
+                start = time.perf_counter()
+                exact = await index.search(db, office.id, vector, args.limit)
+                timings["memory"].append((time.perf_counter() - start) * 1000)
+                start = time.perf_counter()
+                ann = await service._semantic_search(vector, office.id, args.limit)
+                timings["pgvector"].append((time.perf_counter() - start) * 1000)
+                await db.commit() # set_config(..., true) is transaction-local
+                overlap.append(len(set(ann) & set(exact)) / max(len(exact), 1))
+            for backend, values in timings.items():
+                print(f"{backend:>9}: {summary(values)}")
+            print(f"pgvector overlap@{args.limit} with the exact ranking: {statistics.mean(overlap):.3f}")
+        finally:
+            ids = [n.id for n in notes]
+            keys = select(NoteEmbedding.content_key).filter(NoteEmbedding.note_id.in_(ids))
+            await db.execute(delete(EmbeddingCacheEntry).where(EmbeddingCacheEntry.key.in_(keys)))
+            await db.execute(delete(NoteEmbedding).where(NoteEmbedding.note_id.in_(ids)))
+            await db.execute(delete(SearchGeneration).where(SearchGeneration.office_id == office.id))
+            await db.execute(delete(Note).where(Note.id.in_(ids)))
+            await db.execute(delete(Patient).where(Patient.id == patient.id))
+            await db.execute(delete(Office).where(Office.id == office.id))
+            await db.commit()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--notes", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=20, help="results per query (search_notes asks for limit * 2)")
+    parser.add_argument("--dir", help="also measure loading from a memory-mapped snapshot in this directory")
+    asyncio.run(run(parser.parse_args()))
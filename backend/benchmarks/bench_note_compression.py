@@ -0,0 +1,74 @@
+"""
+Compress-then-encrypt for note bodies on a synthetic corpus.
+
+Compares stored bytes (what the notes.content column holds) and per-note
+decrypt(+decompress) latency for:
+  fernet        legacy base64 Fernet token
+  envelope      v1 AES-GCM, no compression
+  zlib          v1 + zlib, no dictionary
+  zlib+dict     v1 + zlib with the dental preset dictionary (what EncryptedText(compress=True) writes)
+
+    python -m benchmarks.bench_note_compression --notes 5000
+"""
+import argparse
+import statistics
+import time
+import zlib
+
+from app.core import compression, security
+from app.core.config import settings
+from benchmarks.corpus import generate_notes
+
+
+def zlib_no_dict(text: str) -> bytes:
+    # Same envelope as encrypt_data(compress=True), but without the preset dictionary
+    compressor = zlib.compressobj(level=6, wbits=-15)
+    payload = compressor.compress(text.encode()) + compressor.flush()
+    codec = compression.CODEC_ZLIB
+    if len(text) < settings.COMPRESSION_MIN_BYTES or len(payload) >= len(text.encode()):
+        payload, codec = text.encode(), compression.CODEC_NONE
+    nonce = b"\0" * 12 # size-only comparison, never stored
+    header = bytes((security.ENVELOPE_V1, codec)) + security.AES_KEY_ID
+    return header + nonce + security.aesgcm.encrypt(nonce, payload, header)
+
+
+FORMATS = {
+    "fernet": lambda text: security.fernet.encrypt(text.encode()),
+    "envelope": lambda text: security.encrypt_data(text),
+    "zlib": zlib_no_dict,
+    "zlib+dict": lambda text: security.encrypt_data(text, compress=True),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--notes", type=int, default=5000)
+    parser.add_argument("--median-chars", type=int, default=450)
+    args = parser.parse_args()
+
+    notes = list(generate_notes(args.notes, median_chars=args.median_chars))
+    plain_bytes = sum(len(n.encode()) for n in notes)
+    print(f"{len(notes)} notes, plaintext {plain_bytes / 1e6:.2f} MB, "
+          f"median {int(statistics.median(len(n) for n in notes))} chars, max {max(len(n) for n in notes)}")
+    print(f"{'format':>10} {'stored_MB':>10} {'x_plain':>8} {'B/note':>7} {'dec_us_p50':>11} {'dec_us_p99':>11}")
+
+    for name, encrypt in FORMATS.items():
+        blobs = [encrypt(n) for n in notes]
+        stored = sum(len(b) for b in blobs)
+        timings = []
+        for blob in blobs:
+            start = time.perf_counter()
+            if name == "zlib":
+                # decrypt_data cannot tell the no-dictionary variant apart; decode by hand
+                payload = security.aesgcm.decrypt(blob[6:18], blob[18:], blob[:6])
+                compression.decompress(payload, blob[1] & 0x0F, 0)
+            else:
+                security.decrypt_data(blob)
+            timings.append((time.perf_counter() - start) * 1e6)
+        timings.sort()
+        print(f"{name:>10} {stored / 1e6:>10.2f} {stored / plain_bytes:>8.2f} {stored // len(notes):>7} "
+              f"{timings[len(timings) // 2]:>11.1f} {timings[int(len(timings) * 0.99)]:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Latency of an unrelated endpoint while logins run concurrently.
+
+Compares bcrypt called inline in the async handler (old behaviour) with the
+bounded PasswordHashPool. No database needed: a minimal app mounts a login-like
+endpoint that verifies a real bcrypt hash, plus a trivial /ping endpoint that we
+probe continuously and report p50/p99 for.
+
+    python -m benchmarks.bench_password_hashing --logins 40 --concurrency 20
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+from fastapi import FastAPI, HTTPException
+
+from app.core import security
+
+
+def build_app(mode: str) -> FastAPI:
+    app = FastAPI()
+    hashed = security.get_password_hash("correct horse battery staple")
+
+    @app.post("/login")
+    async def login():
+        if mode == "inline":
+            ok = security.verify_password("correct horse battery staple", hashed)
+        else:
+            try:
+                ok = await security.verify_password_async("correct horse battery staple", hashed)
+            except security.HashingPoolBusy:
+                raise HTTPException(status_code=503)
+        return {"ok": ok}
+
+    @app.get("/ping")
+    async def ping():
+        return {"status": "ok"}
+
+    return app
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def run(mode: str, logins: int, concurrency: int, probe_interval: float) -> dict:
+    transport = httpx.ASGITransport(app=build_app(mode))
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.get("/ping") # warm up
+        done = asyncio.Event()
+        ping_latencies = []
+        statuses = []
+
+        async def prober():
+            # Latency is measured from when the probe *should* have been sent, so time
+            # spent waiting for a blocked event loop counts (as it would for a client).
+            while not done.is_set():
+                intended = time.perf_counter() + probe_interval
+                await asyncio.sleep(probe_interval)
+                await client.get("/ping")
+                ping_latencies.append((time.perf_counter() - intended) * 1000)
+
+        sem = asyncio.Semaphore(concurrency)
+
+        async def one_login():
+            async with sem:
+                r = await client.post("/login")
+                statuses.append(r.status_code)
+
+        probe_task = asyncio.create_task(prober())
+        await asyncio.sleep(0) # let the prober schedule its first probe
+        start = time.perf_counter()
+        await asyncio.gather(*(one_login() for _ in range(logins)))
+        elapsed = time.perf_counter() - start
+        done.set()
+        await probe_task
+
+    return {
+        "mode": mode,
+        "logins": logins,
+        "login_wall_s": round(elapsed, 2),
+        "rejected_503": statuses.count(503),
+        "ping_samples": len(ping_latencies),
+        "ping_p50_ms": round(statistics.median(ping_latencies), 2),
+        "ping_p99_ms": round(percentile(ping_latencies, 99), 2),
+        "ping_max_ms": round(max(ping_latencies), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--probe-interval", type=float, default=0.005, help="seconds between /ping probes")
+    args = parser.parse_args()
+
+    print(f"pool: {security.password_hash_pool.stats()}")
+    for mode in ("inline", "pool"):
+        print(asyncio.run(run(mode, args.logins, args.concurrency, args.probe_interval)))
+
+
+if __name__ == "__main__":
+    main()
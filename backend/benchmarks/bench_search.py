@@ -0,0 +1,211 @@
+"""
+End-to-end search benchmark: SearchService indexing and query latency at increasing scale.
+
+Needs a migrated database (uses the app's DB settings). Grows one synthetic corpus
+(benchmarks.corpus: clinical vocabulary, log-normal note lengths) across --offices scratch
+offices with Zipf-like sizes, and at each --scales checkpoint (total notes) reports:
+  - index throughput of SearchService.index_notes for the notes added since the last
+    checkpoint (offline hash embeddings through the embedding cache, keyword rows, term
+    statistics; content is already in hand, so no decryption)
+  - query latency p50/p95/p99: search_notes end to end with an empty result cache, the
+    same query again (cached), and the keyword and semantic branches on their own
+  - recall against brute force: the semantic candidates vs an exact scan of the office,
+    and the fused top --limit vs fusion over that exact ranking (keyword search is exact)
+  - growth of the search tables and each of their indexes
+Queries are spread over offices by size, like the notes. Scratch rows are removed at the end.
+
+    python -m benchmarks.bench_search --scales 10000,100000
+    python -m benchmarks.bench_search --scales 10000,100000,1000000 --offices 500 --recall-queries 20
+
+1M notes are ~6 GB of vectors plus the HNSW index and several GB of keyword rows: run it
+on a dedicated database sized accordingly. Size numbers are only meaningful on an
+otherwise quiet database.
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from datetime import date
+
+from sqlalchemy import delete, insert, select, text
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models import (
+    BlindIndex, EmbeddingCacheEntry, Note, NoteEmbedding, NoteTermSet, Office, Patient,
+    SearchGeneration, SearchOfficeStat, SearchTermStat,
+)
+from app.services.embeddings import HashEmbeddingProvider
+from app.services.search_cache import search_result_cache
+from app.services.search_service import RRF_CANDIDATE_FACTOR, SearchService, fuse_rankings
+from benchmarks.corpus import assign_offices, generate_notes, generate_queries
+
+TABLES = ["notes", "note_embeddings", "blind_indexes", "note_term_sets", "search_term_stats", "embedding_cache"]
+
+
+def percentiles(timings) -> str:
+    timings = sorted(timings)
+    if not timings:
+        return f"{'-':>8} {'-':>8} {'-':>8}"
+    at = lambda p: timings[min(int(len(timings) * p), len(timings) - 1)]
+    return f"{at(0.50):>8.2f} {at(0.95):>8.2f} {at(0.99):>8.2f}"
+
+
+async def relation_sizes(db) -> dict:
+    """Heap and index sizes (bytes) of the search tables, by relation name"""
+    sizes = dict((await db.execute(text(
+        "SELECT relname, pg_relation_size(relid) FROM pg_stat_user_tables WHERE relname = ANY(:t)"
+    ), {"t": TABLES})).all())
+    sizes.update((await db.execute(text(
+        "SELECT indexrelname, pg_relation_size(indexrelid) FROM pg_stat_user_indexes WHERE relname = ANY(:t)"
+    ), {"t": TABLES})).all())
+    return sizes
+
+
+async def add_notes(db, service, notes, offices, office_of_note, patients, start: int, end: int, batch_size: int) -> float:
+    """Insert and index notes [start, end); returns seconds spent indexing"""
+    indexing = 0.0
+    for i in range(start, end, batch_size):
+        batch = []
+        for j in range(i, min(i + batch_size, end)):
+            office = office_of_note[j]
+            batch.append((uuid.uuid4(), next(notes), offices[office], patients[office]))
+        # Core insert: "content" is encrypted (and compressed) by the column type
+        await db.execute(insert(Note.__table__).values([
+            {"id": nid, "content": content, "office_id": office_id, "patient_id": patient_id, "author_id": "bench"}
+            for nid, content, office_id, patient_id in batch
+        ]))
+        await db.commit()
+        started = time.perf_counter()
+        await service.index_notes([(nid, content, office_id) for nid, content, office_id, _ in batch])
+        await db.commit()
+        service.after_commit()
+        indexing += time.perf_counter() - started
+    return indexing
+
+
+async def measure_queries(db, service, queries, args):
+    timings = {"cold": [], "cached": [], "keyword": [], "semantic": [], "exact": []}
+    semantic_recall, fused_recall = [], []
+    candidates = args.limit * RRF_CANDIDATE_FACTOR
+    for n, (query, office_id) in enumerate(queries):
+        search_result_cache.clear()
+        started = time.perf_counter()
+        await service.search_notes(query, office_id, limit=args.limit, mode=args.mode)
+        timings["cold"].append((time.perf_counter() - started) * 1000)
+        started = time.perf_counter()
+        await service.search_notes(query, office_id, limit=args.limit, mode=args.mode)
+        timings["cached"].append((time.perf_counter() - started) * 1000)
+        await db.commit()
+
+        started = time.perf_counter()
+        keyword = await service._keyword_search(service._tokenize_and_hash(query), office_id, candidates, args.mode)
+        timings["keyword"].append((time.perf_counter() - started) * 1000)
+        keyword = [nid for nid, _, _ in keyword]
+        vector = await service._get_query_embedding(query)
+        started = time.perf_counter()
+        semantic = await service._semantic_search(vector, office_id, candidates)
+        timings["semantic"].append((time.perf_counter() - started) * 1000)
+        await db.commit() # set_config(..., true) is transaction-local
+
+        if n < args.recall_queries:
+            # "+ 0": same ranking, not an index-orderable expression -> exact scan of the office
+            started = time.perf_counter()
+            exact = (await db.execute(
+                select(NoteEmbedding.note_id)
+                .filter(NoteEmbedding.office_id == office_id)
+                .order_by(NoteEmbedding.vector.cosine_distance(vector) + 0)
+                .limit(candidates)
+            )).scalars().all()
+            timings["exact"].append((time.perf_counter() - started) * 1000)
+            if exact:
+                semantic_recall.append(len(set(semantic) & set(exact)) / len(exact))
+            truth = [h.note_id for h in fuse_rankings(keyword, exact, args.limit)]
+            found = [h.note_id for h in fuse_rankings(keyword, semantic, args.limit)]
+            if truth:
+                fused_recall.append(len(set(found) & set(truth)) / len(truth))
+            await db.commit()
+    return timings, semantic_recall, fused_recall
+
+
+async def run(args):
+    scales = sorted(int(s) for s in args.scales.split(","))
+    office_of_note = assign_offices(scales[-1], args.offices, seed=args.seed, skew=args.skew)
+    notes = generate_notes(scales[-1], seed=args.seed)
+    queries = generate_queries(args.queries, seed=args.seed + 1)
+    query_offices = assign_offices(args.queries, args.offices, seed=args.seed + 2, skew=args.skew)
+    embedder = HashEmbeddingProvider(settings.EMBEDDING_DIMENSIONS)
+
+    async with SessionLocal() as db:
+        office_rows = [Office(name=f"bench-search-{i}") for i in range(args.offices)]
+        db.add_all(office_rows)
+        await db.flush()
+        patient_rows = [
+            Patient(first_name="Bench", last_name="Mark", last_name_hash="bench", dob=date(1990, 1, 1), office_id=o.id)
+            for o in office_rows
+        ]
+        db.add_all(patient_rows)
+        await db.commit()
+        offices = [o.id for o in office_rows]
+        patients = [p.id for p in patient_rows]
+
+        service = SearchService(db, keyword_layout=args.keyword_layout, embedder=embedder, vector_backend=args.vector_backend)
+        print(f"keyword layout {service.keyword_layout}, vector storage {service.vector_storage}, "
+              f"backend {service.vector_backend}, {args.offices} offices, limit {args.limit}, mode {args.mode}")
+        try:
+            baseline = await relation_sizes(db)
+            loaded = 0
+            for scale in scales:
+                seconds = await add_notes(db, service, notes, offices, office_of_note, patients, loaded, scale, args.batch_size)
+                added, loaded = scale - loaded, scale
+                for table in TABLES:
+                    await db.execute(text(f"ANALYZE {table}"))
+                await db.commit()
+                largest = office_of_note[:scale].count(0)
+                print(f"\n== {scale} notes (largest office {largest}) ==")
+                print(f"indexed {added} notes in {seconds:.1f}s: {added / seconds:.0f} notes/s")
+
+                timings, semantic_recall, fused_recall = await measure_queries(
+                    db, service, [(q, offices[o]) for q, o in zip(queries, query_offices)], args
+                )
+                print(f"{'latency_ms':>22} {'p50':>8} {'p95':>8} {'p99':>8}")
+                for name, label in (("cold", "search_notes"), ("cached", "search_notes (cached)"),
+                                    ("keyword", "keyword branch"), ("semantic", "semantic branch"),
+                                    ("exact", "brute-force semantic")):
+                    print(f"{label:>22} {percentiles(timings[name])}")
+                if semantic_recall:
+                    print(f"semantic recall@{args.limit * RRF_CANDIDATE_FACTOR} vs brute force: "
+                          f"{sum(semantic_recall) / len(semantic_recall):.3f}")
+                if fused_recall:
+                    print(f"fused recall@{args.limit} vs brute force: {sum(fused_recall) / len(fused_recall):.3f}")
+
+                sizes = await relation_sizes(db)
+                print(f"{'relation':>44} {'growth_MB':>10} {'B/note':>7}")
+                for name in sorted(sizes):
+                    growth = sizes[name] - baseline.get(name, 0)
+                    if growth > 0:
+                        print(f"{name:>44} {growth / 1e6:>10.1f} {growth // scale:>7}")
+        finally:
+            # Content-addressed cache entries of the scratch notes, then everything by office
+            keys = select(NoteEmbedding.content_key).filter(NoteEmbedding.office_id.in_(offices))
+            await db.execute(delete(EmbeddingCacheEntry).where(EmbeddingCacheEntry.key.in_(keys)))
+            for model in (NoteEmbedding, BlindIndex, NoteTermSet, SearchTermStat, SearchOfficeStat, SearchGeneration, Note, Patient):
+                await db.execute(delete(model).where(model.office_id.in_(offices)))
+            await db.execute(delete(Office).where(Office.id.in_(offices)))
+            await db.commit()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", default="10000,100000,1000000", help="total notes at each checkpoint")
+    parser.add_argument("--offices", type=int, default=200)
+    parser.add_argument("--skew", type=float, default=1.0, help="Zipf exponent of office sizes")
+    parser.add_argument("--queries", type=int, default=200, help="queries per checkpoint")
+    parser.add_argument("--recall-queries", type=int, default=50, help="of which compared against a brute-force scan")
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--mode", choices=["or", "and"], default="or")
+    parser.add_argument("--batch-size", type=int, default=500, help="notes per index_notes call")
+    parser.add_argument("--keyword-layout", choices=["rows", "array"], default=None)
+    parser.add_argument("--vector-backend", choices=["pgvector", "memory"], default=None)
+    parser.add_argument("--seed", type=int, default=42)
+    asyncio.run(run(parser.parse_args()))
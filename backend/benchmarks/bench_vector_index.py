@@ -0,0 +1,194 @@
+"""
+HNSW recall / latency / index size per vector storage mode (SEARCH_VECTOR_STORAGE),
+unfiltered and filtered by office.
+
+Needs a database with pgvector >= 0.7 (uses the app's DB settings) and numpy. Loads
+synthetic clustered unit vectors (a mixture of Gaussians, closer to real embeddings than
+uniform noise) into an UNLOGGED scratch table, then for each storage mode builds the same
+index as app.jobs.vector_index and, for each ef_search / iterative-scan setting, runs the
+query shape of SearchService._semantic_search (candidates from the mode's index, exact
+re-rank for non-full modes) and compares it with the exact answer (same query, ordered
+by an expression the index cannot serve).
+
+    python -m benchmarks.bench_vector_index --vectors 100000
+    python -m benchmarks.bench_vector_index --vectors 1000000 --queries 50 --storage full,halfvec,binary
+
+At 1536 dimensions 1M vectors are ~6 GB of heap plus the index: size the database
+accordingly (or pass --dim to scale down). The table is dropped afterwards unless --keep.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import numpy as np
+from pgvector.asyncpg import register_vector
+
+from app.db.session import engine
+from app.services.search_service import VECTOR_INDEXES
+
+TABLE = "bench_vectors"
+CHUNK = 20000
+
+ANN_QUERY = f"""
+WITH nearest AS MATERIALIZED (
+    SELECT id, vector <=> $1 AS distance FROM {TABLE}
+    WHERE ($2::int IS NULL OR office = $2) ORDER BY distance LIMIT $3
+) SELECT id FROM nearest ORDER BY distance
+"""
+# Non-full modes: $4 candidates by the indexed expression, exact re-rank to $3
+RERANK_QUERY = f"""
+WITH candidates AS MATERIALIZED (
+    SELECT id, vector FROM {TABLE}
+    WHERE ($2::int IS NULL OR office = $2) ORDER BY {{indexed}} {{op}} {{query}} LIMIT $4
+) SELECT id FROM candidates ORDER BY vector <=> $1::vector LIMIT $3
+"""
+# Query-side counterpart of each indexed expression
+QUERY_EXPRESSIONS = {
+    "halfvec": "$1::vector::halfvec({dims})",
+    "subvector": "subvector($1::vector, 1, {sub})::vector({sub})",
+    "binary": "binary_quantize($1::vector)::bit({dims})",
+}
+# "+ 0": same ranking, but not an index-orderable expression -> exact scan
+EXACT_QUERY = f"""
+SELECT id FROM {TABLE} WHERE ($2::int IS NULL OR office = $2)
+ORDER BY (vector <=> $1) + 0 LIMIT $3
+"""
+
+
+def make_vectors(rng: np.random.Generator, centers: np.ndarray, n: int, spread: float) -> np.ndarray:
+    assign = rng.integers(len(centers), size=n)
+    vectors = centers[assign] + spread * rng.standard_normal((n, centers.shape[1]), dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+async def load(conn, args, centers) -> None:
+    await conn.execute(f"DROP TABLE IF EXISTS {TABLE}")
+    await conn.execute(f"CREATE UNLOGGED TABLE {TABLE} (id bigint PRIMARY KEY, office int NOT NULL, vector vector({args.dim}) NOT NULL)")
+    started = time.perf_counter()
+    for start in range(0, args.vectors, CHUNK):
+        rng = np.random.default_rng(args.seed + start) # chunk-wise: never holds the whole set in memory
+        n = min(CHUNK, args.vectors - start)
+        vectors = make_vectors(rng, centers, n, args.spread)
+        offices = rng.integers(args.offices, size=n)
+        await conn.copy_records_to_table(
+            TABLE, columns=["id", "office", "vector"],
+            records=[(start + i, int(offices[i]), vectors[i]) for i in range(n)],
+        )
+    await conn.execute(f"CREATE INDEX ON {TABLE} (office)")
+    await conn.execute(f"ANALYZE {TABLE}")
+    heap = await conn.fetchval(f"SELECT pg_total_relation_size('{TABLE}')")
+    print(f"loaded {args.vectors} x {args.dim}d vectors in {time.perf_counter() - started:.0f}s, "
+          f"table {heap / 1e6:.0f} MB")
+
+
+async def build_index(conn, args, storage: str) -> str:
+    name, expression = VECTOR_INDEXES[storage]
+    name = name.replace("ix_note_embeddings", TABLE)
+    expression = expression.format(dims=args.dim, sub=args.sub_dims)
+    started = time.perf_counter()
+    await conn.execute("SET maintenance_work_mem = '2GB'")
+    await conn.execute(
+        f"CREATE INDEX {name} ON {TABLE} USING hnsw ({expression}) "
+        f"WITH (m = {args.m}, ef_construction = {args.ef_construction})"
+    )
+    size = await conn.fetchval(f"SELECT pg_relation_size('{name}')")
+    print(f"{storage}: hnsw build {time.perf_counter() - started:.0f}s, index {size / 1e6:.0f} MB "
+          f"({size // args.vectors} B/vector)")
+    return name
+
+
+def query_for(storage: str, args) -> str:
+    if storage == "full":
+        return ANN_QUERY
+    _, expression = VECTOR_INDEXES[storage]
+    indexed = expression.format(dims=args.dim, sub=args.sub_dims).rsplit(" ", 1)[0] # Without the opclass
+    return RERANK_QUERY.format(
+        indexed=indexed, op="<~>" if storage == "binary" else "<=>",
+        query=QUERY_EXPRESSIONS[storage].format(dims=args.dim, sub=args.sub_dims),
+    )
+
+
+async def run_queries(conn, query_sql, queries, k, ef=None, iterative=None, fetch=None):
+    results, timings = [], []
+    for vector, office in queries:
+        async with conn.transaction():
+            if ef is not None:
+                await conn.execute(f"SET LOCAL hnsw.ef_search = {max(ef, fetch or k)}")
+                await conn.execute(f"SET LOCAL hnsw.iterative_scan = {iterative}")
+            params = (vector, office, k) if fetch is None else (vector, office, k, fetch)
+            start = time.perf_counter()
+            rows = await conn.fetch(query_sql, *params)
+            timings.append((time.perf_counter() - start) * 1000)
+        results.append([r["id"] for r in rows])
+    timings.sort()
+    return results, timings
+
+
+async def run(args):
+    rng = np.random.default_rng(args.seed)
+    centers = rng.standard_normal((args.clusters, args.dim), dtype=np.float32)
+    async with engine.connect() as sa_conn:
+        raw = await sa_conn.get_raw_connection()
+        conn = raw.driver_connection
+        await register_vector(conn)
+        try:
+            if not args.reuse:
+                await load(conn, args, centers)
+            qrng = np.random.default_rng(args.seed - 1)
+            qvecs = make_vectors(qrng, centers, args.queries, args.spread)
+            scenarios = {
+                "global": [(v, None) for v in qvecs],
+                f"office(1/{args.offices})": [(v, int(o)) for v, o in zip(qvecs, qrng.integers(args.offices, size=args.queries))],
+            }
+            truths = {}
+            for name, queries in scenarios.items():
+                truths[name], timings = await run_queries(conn, EXACT_QUERY, queries, args.k)
+                print(f"{name}: exact p50 {statistics.median(timings):.1f} ms, "
+                      f"p95 {timings[int(len(timings) * 0.95)]:.1f} ms")
+
+            for storage in args.storage.split(","):
+                index = await build_index(conn, args, storage)
+                query_sql = query_for(storage, args)
+                fetch = None if storage == "full" else args.k * args.rerank_factor
+                print(f"{'storage':>10} {'scenario':>14} {'ef':>5} {'iterative':>13} {'p50_ms':>8} {'p95_ms':>8} "
+                      f"{'recall@k':>9} {'rows/k':>7}")
+                for name, queries in scenarios.items():
+                    for iterative in args.iterative.split(","):
+                        for ef in (int(e) for e in args.ef.split(",")):
+                            found, timings = await run_queries(conn, query_sql, queries, args.k, ef, iterative, fetch)
+                            recall = statistics.mean(
+                                len(set(f) & set(t)) / max(len(t), 1) for f, t in zip(found, truths[name])
+                            )
+                            fill = statistics.mean(len(f) / args.k for f in found)
+                            print(f"{storage:>10} {name:>14} {ef:>5} {iterative:>13} {statistics.median(timings):>8.1f} "
+                                  f"{timings[int(len(timings) * 0.95)]:>8.1f} {recall:>9.3f} {fill:>7.2f}")
+                await conn.execute(f"DROP INDEX {index}")
+        finally:
+            if not args.keep:
+                await conn.execute(f"DROP TABLE IF EXISTS {TABLE}")
+            # The connection now has a binary vector codec: don't hand it back to the pool
+            await sa_conn.invalidate()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--offices", type=int, default=200)
+    parser.add_argument("--clusters", type=int, default=500)
+    parser.add_argument("--spread", type=float, default=0.08, help="cluster noise (per dimension)")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=20, help="results per query (search_notes asks for limit * 2)")
+    parser.add_argument("--storage", default=",".join(VECTOR_INDEXES), help="storage modes to compare")
+    parser.add_argument("--rerank-factor", type=int, default=4, help="candidates per result for non-full modes")
+    parser.add_argument("--sub-dims", type=int, default=512, help="dimensions kept by the subvector mode")
+    parser.add_argument("--ef", default="40,100,200", help="hnsw.ef_search values")
+    parser.add_argument("--iterative", default="off,relaxed_order", help="hnsw.iterative_scan modes (pgvector >= 0.8)")
+    parser.add_argument("--m", type=int, default=16)
+    parser.add_argument("--ef-construction", type=int, default=64)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--reuse", action="store_true", help="reuse a table kept by --keep (its indexes are rebuilt)")
+    parser.add_argument("--keep", action="store_true", help="keep the table for another run")
+    asyncio.run(run(parser.parse_args()))
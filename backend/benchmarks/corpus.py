@@ -0,0 +1,107 @@
+"""
+Deterministic synthetic dental-notes corpus for benchmarks.
+
+Notes are assembled from clinical sentence templates with realistic vocabulary
+(tooth numbers, surfaces, procedures, anesthetics, findings), and lengths follow a
+log-normal distribution (most notes are a few sentences, a long tail of dictated
+notes runs to several thousand characters). Same seed -> same corpus.
+"""
+import random
+from typing import Iterator, List
+
+TEETH = [str(n) for n in range(1, 33)]
+SURFACES = ["M", "O", "D", "B", "L", "MO", "DO", "MOD", "OL", "DL", "MODB", "F", "I"]
+MATERIALS = ["composite", "amalgam", "zirconia crown", "PFM crown", "e.max onlay", "glass ionomer"]
+ANESTHETICS = [
+    "2% lidocaine with 1:100,000 epinephrine",
+    "4% articaine with 1:100,000 epinephrine",
+    "3% mepivacaine plain",
+]
+INJECTIONS = ["IANB", "buccal infiltration", "PSA block", "palatal infiltration", "mental block"]
+DIAGNOSES = [
+    "irreversible pulpitis", "reversible pulpitis", "necrotic pulp", "symptomatic apical periodontitis",
+    "recurrent caries", "cracked tooth syndrome", "localized moderate periodontitis",
+    "generalized gingivitis", "acute periapical abscess", "fractured cusp",
+]
+COMPLAINTS = [
+    "sensitivity to cold", "lingering pain to hot", "pain when biting", "food impaction",
+    "swelling on the gums", "a chipped tooth", "bleeding when brushing", "jaw soreness in the morning",
+]
+MEDS = ["amoxicillin 500mg TID x7d", "ibuprofen 600mg q6h prn", "chlorhexidine 0.12% rinse BID", "acetaminophen 500mg prn"]
+FINDINGS = [
+    "probing depths 4-5mm with BOP", "widened PDL on PA", "periapical radiolucency", "open contact",
+    "mobility grade I", "recession 2mm facial", "TTP positive", "cold test lingering 15s",
+]
+
+TEMPLATES = [
+    "Pt presents with {complaint} on #{tooth}.",
+    "Chief complaint: {complaint}, started about {days} days ago.",
+    "Medical history reviewed, no changes. BP {sys}/{dia}.",
+    "Clinical exam: {finding} on #{tooth}.",
+    "Radiographs: PA and BWX taken, {finding}.",
+    "Diagnosis: {diagnosis} #{tooth}.",
+    "Anesthesia: {anesthetic}, {carpules} carpules via {injection}.",
+    "Placed {material} #{tooth} {surface}, occlusion adjusted, polished.",
+    "Crown prep #{tooth}, final impression taken, temporary crown cemented with TempBond.",
+    "Root canal therapy #{tooth}: access, working length established, cleaned and shaped, obturated with gutta percha.",
+    "Scaling and root planing {quadrant} quadrant, {finding}.",
+    "Extraction #{tooth}, sectioned and elevated, socket irrigated, 4-0 chromic gut sutures placed.",
+    "Rx: {med}.",
+    "Treatment plan discussed including risks, benefits and alternatives; pt consented.",
+    "Post-op instructions given verbally and in writing. Pt tolerated procedure well.",
+    "RTC in {weeks} weeks for {next}.",
+]
+QUADRANTS = ["UR", "UL", "LR", "LL"]
+NEXT_VISITS = ["crown seat", "post-op check", "SRP other side", "periodic exam", "implant consult", "final restoration"]
+
+# Vocabulary available for query generation (single clinically meaningful terms)
+QUERY_TERMS = [
+    "pulpitis", "crown", "prep", "extraction", "sensitivity", "abscess", "composite", "amalgam",
+    "root", "canal", "caries", "periodontitis", "gingivitis", "lidocaine", "articaine", "impression",
+    "sutures", "amoxicillin", "radiolucency", "mobility", "recession", "cracked", "necrotic", "swelling",
+]
+
+
+def generate_sentence(rng: random.Random) -> str:
+    return rng.choice(TEMPLATES).format(
+        complaint=rng.choice(COMPLAINTS), tooth=rng.choice(TEETH), days=rng.randint(1, 30),
+        sys=rng.randint(105, 150), dia=rng.randint(65, 95), finding=rng.choice(FINDINGS),
+        diagnosis=rng.choice(DIAGNOSES), anesthetic=rng.choice(ANESTHETICS), carpules=rng.randint(1, 3),
+        injection=rng.choice(INJECTIONS), material=rng.choice(MATERIALS), surface=rng.choice(SURFACES),
+        quadrant=rng.choice(QUADRANTS), med=rng.choice(MEDS), weeks=rng.randint(1, 6),
+        next=rng.choice(NEXT_VISITS),
+    )
+
+
+def generate_note(rng: random.Random, median_chars: int = 450) -> str:
+    # Log-normal length: median ~median_chars, long tail of dictated notes
+    target = max(40, int(rng.lognormvariate(0, 0.8) * median_chars))
+    sentences = []
+    length = 0
+    while length < target:
+        sentence = generate_sentence(rng)
+        sentences.append(sentence)
+        length += len(sentence) + 1
+    return " ".join(sentences)
+
+
+def generate_notes(count: int, seed: int = 42, median_chars: int = 450) -> Iterator[str]:
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield generate_note(rng, median_chars)
+
+
+def generate_queries(count: int, seed: int = 7, max_terms: int = 3) -> List[str]:
+    rng = random.Random(seed)
+    return [" ".join(rng.sample(QUERY_TERMS, rng.randint(1, max_terms))) for _ in range(count)]
+
+
+def office_weights(offices: int, skew: float = 1.0) -> List[float]:
+    # Zipf-like practice sizes: a few large group practices, a long tail of small offices
+    return [1.0 / (rank ** skew) for rank in range(1, offices + 1)]
+
+
+def assign_offices(count: int, offices: int, seed: int = 11, skew: float = 1.0) -> List[int]:
+    """Office index (0 = largest) of each of `count` notes or queries, weighted by office size"""
+    rng = random.Random(seed)
+    return rng.choices(range(offices), weights=office_weights(offices, skew), k=count)
@@ -0,0 +1,34 @@
+"""
+Offline tests: no Postgres here, so the search index statements run against an
+in-memory SQLite database through a sync Session. The ORM handles a statement
+(e.g. bulk UPDATE rules) before it reaches the dialect, exactly as on Postgres.
+Only dialect-neutral code paths can be exercised this way (no pg_insert upserts).
+"""
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.models.search import BlindIndex, SearchTermStat
+
+
+class SyncSessionAdapter:
+    """The part of AsyncSession that SearchService uses, over a sync Session"""
+
+    def __init__(self, session: Session):
+        self.session = session
+
+    async def execute(self, statement, params=None):
+        return self.session.execute(statement, params)
+
+    async def commit(self):
+        self.session.commit()
+
+
+@pytest.fixture
+def search_db():
+    engine = create_engine("sqlite://")
+    for table in (BlindIndex.__table__, SearchTermStat.__table__):
+        table.create(engine)
+    with Session(engine) as session:
+        yield SyncSessionAdapter(session)
+    engine.dispose()
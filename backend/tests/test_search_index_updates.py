@@ -0,0 +1,68 @@
+import asyncio
+import uuid
+from collections import Counter
+
+from sqlalchemy import insert, select
+
+from app.models.search import BlindIndex, SearchTermStat
+from app.services.search_service import SearchService
+
+
+def _index(service, note_id, office_id, content):
+    term_freqs = {note_id: service._term_frequencies(content)}
+    return asyncio.run(service._update_blind_indexes(term_freqs, {note_id: office_id}))
+
+
+def _stored(db, note_id):
+    rows = db.session.execute(
+        select(BlindIndex.term_hash, BlindIndex.term_freq).filter(BlindIndex.note_id == note_id)
+    ).all()
+    return dict(rows)
+
+
+def test_reindex_updates_changed_term_frequency(search_db):
+    service = SearchService(search_db, keyword_layout="rows")
+    note_id, office_id = uuid.uuid4(), uuid.uuid4()
+
+    _index(service, note_id, office_id, "crown on tooth 14")
+    changes = _index(service, note_id, office_id, "crown on tooth 14, second crown")
+
+    expected = service._term_frequencies("crown on tooth 14, second crown")
+    assert _stored(search_db, note_id) == expected
+    assert expected[service._tokenize_and_hash("crown")[0]] == 2
+    added, removed, had_terms = changes[note_id]
+    assert len(added) == 1 and not removed and had_terms
+
+
+def test_removed_terms_decrement_document_frequency(search_db):
+    service = SearchService(search_db, keyword_layout="rows")
+    office_id = uuid.uuid4()
+    search_db.session.execute(insert(SearchTermStat), [
+        {"office_id": office_id, "term_key": 11, "doc_freq": 3},
+        {"office_id": office_id, "term_key": 12, "doc_freq": 1},
+        {"office_id": uuid.uuid4(), "term_key": 11, "doc_freq": 5},
+    ])
+
+    asyncio.run(service._update_term_stats(office_id, Counter(), Counter({11: 2, 12: 1}), 0))
+
+    rows = search_db.session.execute(
+        select(SearchTermStat.term_key, SearchTermStat.doc_freq).filter(SearchTermStat.office_id == office_id)
+    ).all()
+    assert dict(rows) == {11: 1, 12: 0}
+    other = search_db.session.execute(
+        select(SearchTermStat.doc_freq).filter(SearchTermStat.office_id != office_id)
+    ).scalar()
+    assert other == 5
+
+
+def test_reindex_moves_rows_to_the_note_office(search_db):
+    service = SearchService(search_db, keyword_layout="rows")
+    note_id, old_office, new_office = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+
+    _index(service, note_id, old_office, "crown on tooth 14")
+    _index(service, note_id, new_office, "crown on tooth 14")
+
+    offices = search_db.session.execute(
+        select(BlindIndex.office_id).filter(BlindIndex.note_id == note_id).distinct()
+    ).scalars().all()
+    assert offices == [new_office]